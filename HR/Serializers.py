@@ -9,7 +9,7 @@ from .models import (
 from master.models import LeaveMaster
 from master.serializers import LeaveMasterSerializer
 from User.models import AppUser
-from HR.utils.attendance_penalties import calculate_monthly_penalties
+from HR.utils.penalty_cache import get_monthly_penalties, get_monthly_penalties_bulk
 
 
 # ========== LEAVE REQUEST SERIALIZERS ==========
@@ -361,11 +361,33 @@ class AttendanceSerializer(serializers.ModelSerializer):
             'updated_at'
         ]
 
+    def _prefill_penalty_cache(self, cache, obj):
+        """
+        When serializing a list, compute penalties for every user in the page
+        sharing this row's month in one bulk call.
+        """
+        siblings = getattr(self.parent, 'instance', None) if self.parent is not None else None
+        if siblings is None or isinstance(siblings, Attendance):
+            return
+
+        year, month = obj.date.year, obj.date.month
+        users = {}
+        for att in siblings:
+            if att.date.year == year and att.date.month == month and (att.user_id, year, month) not in cache:
+                users.setdefault(att.user_id, att.user)
+        if len(users) < 2:
+            return
+
+        for user_id, penalty_data in get_monthly_penalties_bulk(users.values(), year, month).items():
+            cache[(user_id, year, month)] = penalty_data
+
     def get_attendance_penalty(self, obj):
         cache = self.context.setdefault('_penalty_cache', {})
         key = (obj.user_id, obj.date.year, obj.date.month)
         if key not in cache:
-            cache[key] = calculate_monthly_penalties(obj.user, obj.date.year, obj.date.month)
+            self._prefill_penalty_cache(cache, obj)
+        if key not in cache:
+            cache[key] = get_monthly_penalties(obj.user, obj.date.year, obj.date.month)
 
         per_date = cache[key].get('per_date', {})
         return per_date.get(obj.date, {
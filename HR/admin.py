@@ -1,6 +1,6 @@
 # HR/admin.py - Complete Clean Admin Configuration
 from django.contrib import admin
-from .models import Attendance, Holiday, LeaveRequest, LateRequest, EarlyRequest, PunchRecord
+from .models import Attendance, Holiday, LeaveRequest, LateRequest, EarlyRequest, PenaltyDecision, PunchRecord
 
 
 class PunchRecordInline(admin.TabularInline):
@@ -24,7 +24,11 @@ class AttendanceAdmin(admin.ModelAdmin):
     ]
     list_filter = ['status', 'verification_status', 'date', 'is_currently_on_break']
     search_fields = ['user__name', 'user__email']
-    readonly_fields = ['total_working_hours', 'total_break_hours', 'is_currently_on_break', 'created_at', 'updated_at']
+    readonly_fields = [
+        'total_working_hours', 'total_break_hours', 'is_currently_on_break',
+        'work_seconds', 'break_seconds', 'open_punch_in_time', 'last_punch_type',
+        'created_at', 'updated_at'
+    ]
     date_hierarchy = 'date'
     inlines = [PunchRecordInline]
 
@@ -47,6 +51,10 @@ class AttendanceAdmin(admin.ModelAdmin):
         ('Calculated Times', {
             'fields': ('total_working_hours', 'total_break_hours', 'is_currently_on_break')
         }),
+        ('Punch Accounting', {
+            'fields': ('work_seconds', 'break_seconds', 'open_punch_in_time', 'last_punch_type'),
+            'classes': ('collapse',)
+        }),
         ('Notes', {
             'fields': ('note', 'admin_note')
         }),
@@ -80,6 +88,21 @@ class PunchRecordAdmin(admin.ModelAdmin):
         }),
     )
 
+    def _recalculate_attendance(self, attendance):
+        # Admin edits can reorder punches, so rebuild totals from scratch
+        attendance.calculate_times()
+        attendance.update_status()
+        attendance.save()
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        self._recalculate_attendance(obj.attendance)
+
+    def delete_model(self, request, obj):
+        attendance = obj.attendance
+        super().delete_model(request, obj)
+        self._recalculate_attendance(attendance)
+
 
 @admin.register(Holiday)
 class HolidayAdmin(admin.ModelAdmin):
@@ -165,6 +188,15 @@ class EarlyRequestAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(PenaltyDecision)
+class PenaltyDecisionAdmin(admin.ModelAdmin):
+    list_display = ['user', 'date', 'penalty_type', 'action', 'actor', 'created_at']
+    list_filter = ['penalty_type', 'action', 'date']
+    search_fields = ['user__name', 'user__email']
+    date_hierarchy = 'date'
+    raw_id_fields = ['user', 'actor']
+
+
 
 
 # HR/admin.py - Add this to your existing admin.py
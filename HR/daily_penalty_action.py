@@ -7,7 +7,7 @@ from django.db import transaction
 from datetime import datetime
 from employee_management.models import Employee
 from User.models import AppUser
-from .models import LateRequest, EarlyRequest, Attendance, PunchRecord
+from .models import LateRequest, EarlyRequest, Attendance, PenaltyDecision, PunchRecord
 import logging
 
 logger = logging.getLogger('django')
@@ -174,6 +174,8 @@ def apply_daily_penalty_action(request):
                                     note='Auto-filled by admin during missed punch waiver'
                                 )
 
+                            # Punches were rebuilt, so re-derive the running totals
+                            attendance.calculate_times()
                             _stamp_admin_note(attendance, admin_punch_note)
 
                     if action == 'waive':
@@ -216,6 +218,8 @@ def apply_daily_penalty_action(request):
                                 punch_time=last_out,
                                 note='Auto-filled by admin during missed punch waiver'
                             )
+                        attendance.calculate_times()
+                        attendance.save()
                     else:
                         # Create a placeholder attendance row so the review action is persisted
                         # and the frontend can show the reviewed missed punch on reload.
@@ -226,6 +230,16 @@ def apply_daily_penalty_action(request):
                             admin_note=f'Missed punch penalty deducted on {timezone.now().strftime("%Y-%m-%d")}')
                     updated_count = 1
                     message = f'Created and {action}d missed punch penalty for {date_str}'
+
+            if updated_count:
+                # Structured record of the decision; payroll counts these
+                PenaltyDecision.objects.create(
+                    user=user,
+                    date=penalty_date,
+                    penalty_type=penalty_type,
+                    action=action,
+                    actor=request.user if request.user.is_authenticated else None,
+                )
         
         return Response({
             'success': True,
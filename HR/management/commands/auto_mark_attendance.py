@@ -3,22 +3,36 @@
 Management command to automatically mark attendance for:
 1. Holidays (paid/unpaid)
 2. Approved leaves
-3. Missing punch-ins (as auto leave)
+3. Missing punch-ins (as absent, pending verification)
+
+Works set-based: one query each for users, existing attendance and leave
+requests over the whole date range (holidays come from the shared holiday
+calendar), then bulk inserts in chunks.
 
 Run this command daily via cron:
 0 23 * * * python manage.py auto_mark_attendance
 """
 
+from collections import Counter
+from datetime import datetime, timedelta
+
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from django.utils import timezone
-from datetime import datetime, timedelta
-from HR.models import Attendance, Holiday, LeaveRequest
+from HR.models import Attendance, LeaveRequest
+from HR.utils.holiday_calendar import get_holidays_between
+from HR.utils.penalty_cache import invalidate_penalty_cache
+from payroll.preview_cache import invalidate_payroll_previews
 from User.models import AppUser
 
 
+# Marks rows created for missing punch-ins so an approved leave can replace them
+AUTO_ABSENT_NOTE = 'Automatically marked absent due to missing attendance. Please verify.'
+
+
 class Command(BaseCommand):
     help = 'Automatically mark attendance for holidays, approved leaves, and missing punch-ins'
-    
+
     def add_arguments(self, parser):
         parser.add_argument(
             '--date',
@@ -36,10 +50,16 @@ class Command(BaseCommand):
             action='store_true',
             help='Simulate without making changes',
         )
-    
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Rows per bulk insert (default: 500)',
+        )
+
     def handle(self, *args, **options):
         dry_run = options['dry_run']
-        
+
         if options['date']:
             # Process specific date
             try:
@@ -53,172 +73,171 @@ class Command(BaseCommand):
             days_back = options['days_back']
             today = timezone.now().date()
             dates_to_process = [today - timedelta(days=i) for i in range(1, days_back + 1)]
-        
+
         self.stdout.write(self.style.SUCCESS(f'Processing {len(dates_to_process)} date(s)...'))
-        
-        for process_date in dates_to_process:
-            self.stdout.write(f'\n--- Processing {process_date} ---')
-            
-            # Skip Sundays
-            if process_date.weekday() == 6:
-                self.stdout.write(self.style.WARNING(f'  Skipping {process_date} (Sunday)'))
-                continue
-            
-            # 1. Mark holidays for all active users
-            self.mark_holidays(process_date, dry_run)
-            
-            # 2. Apply approved leaves to attendance
-            self.apply_approved_leaves(process_date, dry_run)
-            
-            # 3. Auto-mark missing punch-ins as leave
-            self.auto_mark_missing_attendance(process_date, dry_run)
-        
-        self.stdout.write(self.style.SUCCESS('\n✓ Auto-marking completed!'))
-    
-    def mark_holidays(self, date, dry_run=False):
-        """Mark holidays for all active users"""
-        holidays = Holiday.objects.filter(date=date, is_active=True)
-        
-        if not holidays.exists():
-            self.stdout.write(f'  No holidays found for {date}')
-            return
-        
-        holiday = holidays.first()
-        self.stdout.write(self.style.WARNING(f'  Found holiday: {holiday.name} ({holiday.get_holiday_type_display()})'))
-        
-        active_users = AppUser.objects.filter(is_active=True)
-        marked_count = 0
-        skipped_count = 0
-        
-        for user in active_users:
-            # Skip if attendance already exists
-            if Attendance.objects.filter(user=user, date=date).exists():
-                skipped_count += 1
-                continue
-            
-            if not dry_run:
-                Attendance.objects.create(
-                    user=user,
-                    date=date,
-                    status='holiday',
-                    verification_status='auto_verified',
-                    is_auto_marked=True,
-                    auto_mark_reason=f'Holiday: {holiday.name}',
-                    admin_note=f'Auto-marked for {holiday.get_holiday_type_display()} - {holiday.name}',
-                    verified_at=timezone.now(),
-                )
-            marked_count += 1
-        
-        self.stdout.write(self.style.SUCCESS(
-            f'  ✓ Holiday marked for {marked_count} users (skipped {skipped_count} existing records)'
-        ))
-    
-    def apply_approved_leaves(self, date, dry_run=False):
-        """Apply approved leaves to attendance"""
-        # Find approved leaves that cover this date
-        approved_leaves = LeaveRequest.objects.filter(
-            status='approved',
-            from_date__lte=date,
-            to_date__gte=date,
-            is_applied_to_attendance=False,
-        )
-        
-        if not approved_leaves.exists():
-            self.stdout.write(f'  No approved leaves for {date}')
+
+        # Skip Sundays
+        dates_to_process = sorted(d for d in dates_to_process if d.weekday() != 6)
+        if not dates_to_process:
+            self.stdout.write(self.style.WARNING('  Nothing to process (Sundays only)'))
             return
-        
-        marked_count = 0
-        
-        for leave in approved_leaves:
-            # Skip if it's a holiday
-            if Holiday.objects.filter(date=date, is_active=True).exists():
-                continue
-            
-            # Skip if attendance already exists and is not auto-marked
-            existing = Attendance.objects.filter(user=leave.user, date=date).first()
-            if existing and not existing.is_auto_marked:
-                self.stdout.write(
-                    f'  ⚠ Skipping {leave.user.name} - manual attendance exists'
+
+        new_rows, upgraded_rows, counts = self.plan(dates_to_process)
+
+        if not dry_run:
+            with transaction.atomic():
+                # ignore_conflicts: a punch may have created the row meanwhile
+                Attendance.objects.bulk_create(
+                    new_rows,
+                    batch_size=options['batch_size'],
+                    ignore_conflicts=True,
                 )
-                continue
-            
-            if not dry_run:
-                Attendance.objects.update_or_create(
-                    user=leave.user,
-                    date=date,
-                    defaults={
-                        'status': 'leave',
-                        'verification_status': 'auto_verified',
-                        'is_auto_marked': True,
-                        'auto_mark_reason': f'Approved {leave.get_leave_type_display()}',
-                        'admin_note': f'Auto-marked from leave request #{leave.id}',
-                        'verified_by': leave.reviewed_by,
-                        'verified_at': leave.reviewed_at or timezone.now(),
-                    }
+                Attendance.objects.bulk_update(
+                    upgraded_rows,
+                    ['status', 'verification_status', 'is_leave', 'leave_request', 'leave_master',
+                     'is_paid_day', 'admin_note', 'verified_by', 'verified_at'],
+                    batch_size=options['batch_size'],
                 )
-            marked_count += 1
-            
+            # Bulk writes skip the model signals
+            invalidate_penalty_cache(from_date=dates_to_process[0], to_date=dates_to_process[-1])
+            invalidate_payroll_previews()
+
+        for process_date in dates_to_process:
+            day = counts[process_date]
             self.stdout.write(
-                f'  ✓ Applied leave for {leave.user.name} ({leave.get_leave_type_display()})'
+                f'  {process_date}: holiday {day["holiday"]}, leave {day["leave"]}, '
+                f'absent {day["absent"]}, pending leave skipped {day["pending"]}, '
+                f'existing {day["existing"]}'
             )
-        
-        if marked_count > 0:
-            self.stdout.write(self.style.SUCCESS(
-                f'  ✓ Applied {marked_count} approved leave(s)'
+
+        totals = sum(counts.values(), Counter())
+        prefix = '[DRY RUN] Would mark' if dry_run else '✓ Marked'
+        self.stdout.write(self.style.SUCCESS(
+            f'\n{prefix} {totals["holiday"]} holiday, {totals["leave"]} leave and '
+            f'{totals["absent"]} absent record(s) across {len(dates_to_process)} date(s)'
+        ))
+        if totals['absent']:
+            self.stdout.write(self.style.WARNING(
+                f'  ⚠ {totals["absent"]} missing attendance(s) marked absent (needs verification)'
             ))
-    
-    def auto_mark_missing_attendance(self, date, dry_run=False):
+        self.stdout.write(self.style.SUCCESS('✓ Auto-marking completed!'))
+
+    def plan(self, dates):
         """
-        Auto-mark missing attendance as leave for users who:
-        - Have no attendance record for the date
-        - Date is not a holiday
-        - Date is not a Sunday
-        - User is active
+        Work out the rows to insert/update for `dates` without touching the DB.
+
+        Returns (new Attendance objects, auto-absent rows upgraded to leave,
+        {date: Counter}).
         """
-        # Skip if it's a holiday
-        if Holiday.objects.filter(date=date, is_active=True).exists():
-            self.stdout.write(f'  Skipping auto-mark (holiday)')
-            return
-        
-        active_users = AppUser.objects.filter(is_active=True)
-        marked_count = 0
-        
-        for user in active_users:
-            # Skip if attendance exists
-            if Attendance.objects.filter(user=user, date=date).exists():
-                continue
-            
-            # Skip if there's a pending leave request for this date
-            has_pending_leave = LeaveRequest.objects.filter(
-                user=user,
-                status='pending',
-                from_date__lte=date,
-                to_date__gte=date,
-            ).exists()
-            
-            if has_pending_leave:
-                self.stdout.write(
-                    f'  ⏳ Skipping {user.name} - pending leave request exists'
-                )
+        start, end = dates[0], dates[-1]
+        date_set = set(dates)
+        now = timezone.now()
+
+        active_user_ids = list(AppUser.objects.filter(is_active=True).values_list('id', flat=True))
+
+        existing = {}
+        for row in Attendance.objects.filter(date__gte=start, date__lte=end).only(
+            'id', 'user_id', 'date', 'status', 'first_punch_in_time', 'admin_note'
+        ):
+            if row.date in date_set:
+                existing[(row.user_id, row.date)] = row
+
+        holidays = get_holidays_between(start, end)
+
+        # Approved leave per date/user and users with a pending request
+        approved = {}
+        pending = set()
+        leaves = LeaveRequest.objects.filter(
+            status__in=['approved', 'pending'],
+            from_date__lte=end,
+            to_date__gte=start,
+        ).select_related('leave_master')
+        for leave in leaves:
+            day = max(leave.from_date, start)
+            while day <= min(leave.to_date, end):
+                if day in date_set:
+                    if leave.status == 'approved':
+                        approved.setdefault(day, {}).setdefault(leave.user_id, leave)
+                    else:
+                        pending.add((leave.user_id, day))
+                day += timedelta(days=1)
+
+        new_rows = []
+        upgraded_rows = []
+        counts = {day: Counter() for day in dates}
+
+        for day in dates:
+            holiday = holidays.get(day)
+            if holiday:
+                # 1. Holidays for all active users
+                for user_id in active_user_ids:
+                    if (user_id, day) in existing:
+                        counts[day]['existing'] += 1
+                        continue
+                    new_rows.append(Attendance(
+                        user_id=user_id,
+                        date=day,
+                        status='holiday',
+                        verification_status='verified',
+                        is_holiday=True,
+                        holiday_id=holiday.id,
+                        is_paid_day=holiday.is_paid,
+                        admin_note=f'Auto-marked for {holiday.holiday_type_display} - {holiday.name}',
+                        verified_at=now,
+                    ))
+                    counts[day]['holiday'] += 1
                 continue
-            
-            if not dry_run:
-                Attendance.objects.create(
-                    user=user,
-                    date=date,
-                    status='auto_leave',
+
+            # 2. Approved leaves (any user with an approved request)
+            for user_id, leave in approved.get(day, {}).items():
+                row = existing.get((user_id, day))
+                if row and not self._is_auto_absent(row):
+                    # Manual attendance wins
+                    continue
+                attendance = row or Attendance(user_id=user_id, date=day)
+                self._apply_leave(attendance, leave, now)
+                if row:
+                    upgraded_rows.append(attendance)
+                else:
+                    new_rows.append(attendance)
+                    existing[(user_id, day)] = attendance
+                counts[day]['leave'] += 1
+
+            # 3. Missing punch-ins for active users
+            on_leave = approved.get(day, {})
+            for user_id in active_user_ids:
+                if (user_id, day) in existing:
+                    if user_id not in on_leave:
+                        counts[day]['existing'] += 1
+                    continue
+                if (user_id, day) in pending:
+                    counts[day]['pending'] += 1
+                    continue
+                new_rows.append(Attendance(
+                    user_id=user_id,
+                    date=day,
+                    status='absent',
                     verification_status='unverified',
-                    is_auto_marked=True,
-                    auto_mark_reason='No punch-in detected - Auto-marked as leave',
-                    admin_note='Automatically marked as leave due to missing attendance. Please verify.',
-                )
-            marked_count += 1
-            
-            self.stdout.write(
-                f'  🔴 Auto-marked leave for {user.name} (no punch-in)'
-            )
-        
-        if marked_count > 0:
-            self.stdout.write(self.style.WARNING(
-                f'  ⚠ Auto-marked {marked_count} missing attendance(s) as leave (needs verification)'
-            ))
\ No newline at end of file
+                    is_paid_day=False,
+                    admin_note=AUTO_ABSENT_NOTE,
+                ))
+                counts[day]['absent'] += 1
+
+        return new_rows, upgraded_rows, counts
+
+    @staticmethod
+    def _is_auto_absent(row):
+        return row.status == 'absent' and not row.first_punch_in_time and row.admin_note == AUTO_ABSENT_NOTE
+
+    @staticmethod
+    def _apply_leave(attendance, leave, now):
+        leave_master = leave.leave_master
+        attendance.status = 'leave'
+        attendance.verification_status = 'verified'
+        attendance.is_leave = True
+        attendance.leave_request = leave
+        attendance.leave_master = leave_master
+        attendance.is_paid_day = leave_master.payment_status == 'paid' if leave_master else leave.is_paid
+        attendance.admin_note = f'Auto-marked from leave request #{leave.id}'
+        attendance.verified_by_id = leave.reviewed_by_id
+        attendance.verified_at = leave.reviewed_at or now
@@ -0,0 +1,32 @@
+# HR/management/commands/purge_punch_idempotency_keys.py
+"""
+Management command to delete old punch idempotency keys.
+
+Clients only retry within minutes, so stored punch responses are not needed
+after a couple of days. Run nightly:
+
+0 2 * * * python manage.py purge_punch_idempotency_keys
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from HR.models import PunchIdempotencyKey
+
+
+class Command(BaseCommand):
+    help = 'Delete punch idempotency keys older than --days (default 2)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=2,
+            help='Keep keys created within this many days',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        deleted, _ = PunchIdempotencyKey.objects.filter(created_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f'✓ Deleted {deleted} punch idempotency key(s)'))
@@ -0,0 +1,107 @@
+# HR/management/commands/recompute_attendance_totals.py
+"""
+Management command to repair stale attendance totals.
+
+Recalculates working/break hours and status from punch records and saves
+only the rows whose stored values changed. The monthly grid no longer does
+this on every GET, so run it after admin edits / back-fills or nightly:
+
+0 1 * * * python manage.py recompute_attendance_totals
+"""
+
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from HR.models import Attendance
+
+
+TRACKED_FIELDS = [
+    'total_working_hours',
+    'total_break_hours',
+    'first_punch_in_time',
+    'first_punch_in_location',
+    'first_punch_in_latitude',
+    'first_punch_in_longitude',
+    'last_punch_out_time',
+    'last_punch_out_location',
+    'last_punch_out_latitude',
+    'last_punch_out_longitude',
+    'is_currently_on_break',
+    'status',
+]
+
+
+def _snapshot(attendance):
+    # calculate_times() assigns rounded floats while stored hours are Decimals
+    values = []
+    for field in TRACKED_FIELDS:
+        value = getattr(attendance, field)
+        values.append(Decimal(str(value)) if isinstance(value, float) else value)
+    return values
+
+
+class Command(BaseCommand):
+    help = 'Recalculate attendance hours/status from punch records and save rows that changed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--month',
+            type=int,
+            help='Month to process (1-12). Defaults to the current month.',
+        )
+        parser.add_argument(
+            '--year',
+            type=int,
+            help='Year to process. Defaults to the current year.',
+        )
+        parser.add_argument(
+            '--user-id',
+            type=int,
+            help='Only process attendance for this user',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report stale rows without saving',
+        )
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        month = options['month'] or today.month
+        year = options['year'] or today.year
+        dry_run = options['dry_run']
+
+        attendances = Attendance.objects.filter(
+            date__year=year,
+            date__month=month,
+            punch_records__isnull=False,
+        ).distinct().order_by('date')
+
+        if options['user_id']:
+            attendances = attendances.filter(user_id=options['user_id'])
+
+        self.stdout.write(self.style.SUCCESS(f'Recomputing attendance totals for {month}/{year}...'))
+
+        checked = 0
+        repaired = 0
+
+        for attendance in attendances.iterator():
+            checked += 1
+            before = _snapshot(attendance)
+
+            attendance.calculate_times()
+            attendance.update_status()
+
+            after = _snapshot(attendance)
+            if before == after:
+                continue
+
+            repaired += 1
+            if not dry_run:
+                attendance.save()
+
+        verb = 'Would repair' if dry_run else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Checked {checked} attendance record(s). {verb} {repaired} stale record(s).'
+        ))
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:27
+
+from django.db import migrations, models
+
+
+def backfill_punch_counters(apps, schema_editor):
+    """Seed the running counters from existing punch records"""
+    Attendance = apps.get_model('HR', 'Attendance')
+
+    attendances = Attendance.objects.filter(
+        punch_records__isnull=False
+    ).distinct().prefetch_related('punch_records')
+
+    batch = []
+    for attendance in attendances.iterator(chunk_size=500):
+        work_seconds = 0
+        break_seconds = 0
+        last_in = None
+        last_type = ''
+        for punch in sorted(attendance.punch_records.all(), key=lambda p: p.punch_time):
+            if punch.punch_type == 'in':
+                last_in = punch.punch_time
+            elif punch.punch_type == 'out' and last_in:
+                duration = int((punch.punch_time - last_in).total_seconds())
+                if not work_seconds:
+                    work_seconds += duration
+                else:
+                    break_seconds += duration
+                last_in = None
+            last_type = punch.punch_type
+
+        attendance.work_seconds = max(work_seconds, 0)
+        attendance.break_seconds = max(break_seconds, 0)
+        attendance.open_punch_in_time = last_in
+        attendance.last_punch_type = last_type
+        batch.append(attendance)
+
+        if len(batch) >= 500:
+            Attendance.objects.bulk_update(
+                batch, ['work_seconds', 'break_seconds', 'open_punch_in_time', 'last_punch_type']
+            )
+            batch = []
+
+    if batch:
+        Attendance.objects.bulk_update(
+            batch, ['work_seconds', 'break_seconds', 'open_punch_in_time', 'last_punch_type']
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HR', '0019_add_target_dept_keys_dept_params_to_parameter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='break_seconds',
+            field=models.PositiveIntegerField(default=0, help_text='Seconds in later punch sessions'),
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='last_punch_type',
+            field=models.CharField(blank=True, default='', help_text='Type of the latest punch record (in/out)', max_length=3),
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='open_punch_in_time',
+            field=models.DateTimeField(blank=True, help_text='Punch-in time of the session that has not been punched out yet', null=True),
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='work_seconds',
+            field=models.PositiveIntegerField(default=0, help_text='Seconds in the first completed punch session'),
+        ),
+        migrations.RunPython(backfill_punch_counters, migrations.RunPython.noop),
+    ]
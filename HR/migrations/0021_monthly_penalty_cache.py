@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HR', '0020_attendance_punch_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyPenaltyCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('version', models.PositiveIntegerField(help_text='Penalty engine version the result was computed with')),
+                ('period_end', models.DateField(help_text='Last day covered; earlier than month end while the month is open')),
+                ('duty_time_start', models.TimeField(blank=True, null=True)),
+                ('duty_time_end', models.TimeField(blank=True, null=True)),
+                ('result', models.JSONField(default=dict)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='penalty_cache_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Monthly Penalty Cache',
+                'verbose_name_plural': 'Monthly Penalty Cache',
+                'db_table': 'hr_monthly_penalty_cache',
+                'indexes': [models.Index(fields=['year', 'month'], name='hr_monthly__year_1d5b6e_idx')],
+                'unique_together': {('user', 'year', 'month')},
+            },
+        ),
+    ]
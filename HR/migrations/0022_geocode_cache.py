@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HR', '0021_monthly_penalty_cache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeocodeCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(max_length=50)),
+                ('lat_bucket', models.DecimalField(decimal_places=7, max_digits=10)),
+                ('lon_bucket', models.DecimalField(decimal_places=7, max_digits=10)),
+                ('address', models.TextField()),
+                ('details', models.JSONField(blank=True, default=dict)),
+                ('fetched_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Geocode Cache Entry',
+                'verbose_name_plural': 'Geocode Cache Entries',
+                'db_table': 'hr_geocode_cache',
+                'unique_together': {('provider', 'lat_bucket', 'lon_bucket')},
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:34
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HR', '0022_geocode_cache'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PunchIdempotencyKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64)),
+                ('punch_type', models.CharField(choices=[('in', 'Punch In'), ('out', 'Punch Out')], max_length=3)),
+                ('status_code', models.PositiveSmallIntegerField(default=200)),
+                ('response', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('punch_record', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='idempotency_keys', to='HR.punchrecord')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='punch_idempotency_keys', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Punch Idempotency Key',
+                'verbose_name_plural': 'Punch Idempotency Keys',
+                'db_table': 'hr_punch_idempotency_key',
+                'unique_together': {('user', 'key')},
+            },
+        ),
+    ]
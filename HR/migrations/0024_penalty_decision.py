@@ -0,0 +1,105 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:50
+
+import re
+from datetime import datetime
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Q
+from django.utils import timezone
+
+DECIDED_ON = re.compile(r'\bon (\d{4}-\d{2}-\d{2})')
+STAMPED_AT = re.compile(r'^\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2})\]')
+
+
+def parse_penalty_note_line(line):
+    """(penalty_type, action) recorded by one admin_note line, or None"""
+    text = line.lower()
+    if text.lstrip('[0123456789-: ]').startswith('auto-filled'):
+        return None
+    if 'late penalty' in text:
+        penalty_type = 'late'
+    elif 'early exit penalty' in text:
+        penalty_type = 'early'
+    elif 'missed punch' in text:
+        penalty_type = 'missed'
+    else:
+        return None
+    if 'deduct' in text or 'applied' in text:
+        return penalty_type, 'deduct'
+    if 'waive' in text:
+        return penalty_type, 'waive'
+    return None
+
+
+def decided_at(line, fallback):
+    stamped = STAMPED_AT.search(line.strip())
+    if stamped:
+        return timezone.make_aware(datetime.strptime(stamped.group(1), '%Y-%m-%d %H:%M'))
+    decided_on = DECIDED_ON.search(line)
+    if decided_on:
+        return timezone.make_aware(datetime.strptime(decided_on.group(1), '%Y-%m-%d'))
+    return fallback
+
+
+def backfill_penalty_decisions(apps, schema_editor):
+    """Turn the waive/deduct lines appended to Attendance.admin_note into decisions"""
+    Attendance = apps.get_model('HR', 'Attendance')
+    PenaltyDecision = apps.get_model('HR', 'PenaltyDecision')
+
+    attendances = Attendance.objects.filter(
+        Q(admin_note__icontains='penalty') | Q(admin_note__icontains='missed punch')
+    ).values_list('user_id', 'date', 'admin_note', 'updated_at')
+
+    batch = []
+    for user_id, date, admin_note, updated_at in attendances.iterator(chunk_size=500):
+        for line in admin_note.splitlines():
+            decision = parse_penalty_note_line(line)
+            if not decision:
+                continue
+            batch.append(PenaltyDecision(
+                user_id=user_id,
+                date=date,
+                penalty_type=decision[0],
+                action=decision[1],
+                created_at=decided_at(line, updated_at),
+            ))
+        if len(batch) >= 500:
+            PenaltyDecision.objects.bulk_create(batch)
+            batch = []
+
+    if batch:
+        PenaltyDecision.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HR', '0023_punch_idempotency_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PenaltyDecision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('penalty_type', models.CharField(choices=[('late', 'Late Arrival'), ('early', 'Early Exit'), ('missed', 'Missed Punch')], max_length=10)),
+                ('action', models.CharField(choices=[('waive', 'Waive'), ('deduct', 'Deduct')], max_length=10)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='penalty_decisions_made', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='penalty_decisions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Penalty Decision',
+                'verbose_name_plural': 'Penalty Decisions',
+                'db_table': 'hr_penalty_decision',
+                'ordering': ['-date', '-created_at'],
+                'indexes': [models.Index(fields=['user', 'date', 'penalty_type'], name='hr_penalty_user_date_idx'), models.Index(fields=['date', 'penalty_type', 'action'], name='hr_penalty_date_type_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_penalty_decisions, migrations.RunPython.noop),
+    ]
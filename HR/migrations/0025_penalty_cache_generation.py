@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('HR', '0024_penalty_decision'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PenaltyCacheGeneration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=40, unique=True)),
+                ('generation', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Penalty Cache Generation',
+                'verbose_name_plural': 'Penalty Cache Generations',
+                'db_table': 'hr_penalty_cache_generation',
+            },
+        ),
+        migrations.AddField(
+            model_name='monthlypenaltycache',
+            name='generation',
+            field=models.PositiveIntegerField(default=0, help_text='PenaltyCacheGeneration total of the user/month read before computing'),
+        ),
+    ]
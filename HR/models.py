@@ -2,6 +2,7 @@
 
 from django.db import models
 from django.utils import timezone
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator, MaxValueValidator
 from User.models import AppUser
 from decimal import Decimal
@@ -327,6 +328,27 @@ class Attendance(models.Model):
     
     is_currently_on_break = models.BooleanField(default=False)
     
+    # Running punch accounting (updated per punch by apply_punch)
+    work_seconds = models.PositiveIntegerField(
+        default=0,
+        help_text='Seconds in the first completed punch session'
+    )
+    break_seconds = models.PositiveIntegerField(
+        default=0,
+        help_text='Seconds in later punch sessions'
+    )
+    open_punch_in_time = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='Punch-in time of the session that has not been punched out yet'
+    )
+    last_punch_type = models.CharField(
+        max_length=3,
+        blank=True,
+        default='',
+        help_text='Type of the latest punch record (in/out)'
+    )
+    
     # Status
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='half')
     verification_status = models.CharField(max_length=15, choices=VERIFICATION_CHOICES, default='unverified')
@@ -414,18 +436,18 @@ class Attendance(models.Model):
                 self.is_paid_day = True
                 self.verification_status = 'verified'
         
-        # Check if this date is a holiday
+        # Check if this date is a holiday (in-memory calendar, no query)
         if self.date:
-            try:
-                holiday = Holiday.objects.get(date=self.date, is_active=True)
+            from HR.utils.holiday_calendar import get_holiday
+
+            holiday = get_holiday(self.date)
+            if holiday:
                 self.is_holiday = True
-                self.holiday = holiday
+                self.holiday_id = holiday.id
                 if not self.first_punch_in_time:
                     self.status = 'holiday'
                     self.is_paid_day = holiday.is_paid
                     self.verification_status = 'verified'
-            except Holiday.DoesNotExist:
-                pass
         
         # Set is_paid_day from leave_master if on leave
         if self.leave_master:
@@ -433,53 +455,97 @@ class Attendance(models.Model):
         
         super().save(*args, **kwargs)
     
+    def _accumulate_punch(self, punch_type, punch_time):
+        """Fold one punch (in time order) into the running work/break counters"""
+        if punch_type == 'in':
+            self.open_punch_in_time = punch_time
+        elif punch_type == 'out' and self.open_punch_in_time:
+            # An out punch earlier than the open in (e.g. admin-edited times) adds nothing
+            duration = max(0, int((punch_time - self.open_punch_in_time).total_seconds()))
+            # First completed session is work time, later sessions count as break
+            if not self.work_seconds:
+                self.work_seconds += duration
+            else:
+                self.break_seconds += duration
+            self.open_punch_in_time = None
+        self.last_punch_type = punch_type
+
+    def _sync_hours(self):
+        self.total_working_hours = round(self.work_seconds / 3600, 2)
+        self.total_break_hours = round(self.break_seconds / 3600, 2)
+
+    def reset_punch_totals(self):
+        """Clear hours and running counters (used when punch records are deleted)"""
+        self.work_seconds = 0
+        self.break_seconds = 0
+        self.open_punch_in_time = None
+        self.last_punch_type = ''
+        self.total_working_hours = 0
+        self.total_break_hours = 0
+        self.is_currently_on_break = False
+
+    def apply_punch(self, punch):
+        """
+        O(1) update for a punch appended at the end of the day's punch list.
+        Used by the punch in/out endpoints instead of rescanning all punches.
+        """
+        self._accumulate_punch(punch.punch_type, punch.punch_time)
+        self._sync_hours()
+
+        if punch.punch_type == 'in':
+            if not self.first_punch_in_time:
+                self.first_punch_in_time = punch.punch_time
+                self.first_punch_in_location = punch.location
+                self.first_punch_in_latitude = punch.latitude
+                self.first_punch_in_longitude = punch.longitude
+        else:
+            self.last_punch_out_time = punch.punch_time
+            self.last_punch_out_location = punch.location
+            self.last_punch_out_latitude = punch.latitude
+            self.last_punch_out_longitude = punch.longitude
+            self.is_currently_on_break = False
+
     def calculate_times(self):
-        """Calculate total working hours and break hours from punch records"""
-        punches = self.punch_records.all().order_by('punch_time')
-        
-        if not punches.exists():
+        """
+        Full recompute of hours and punch summary from punch records.
+        Used for admin edits, back-fills and the recompute_attendance_totals job;
+        the punch endpoints use apply_punch() instead.
+        """
+        # Sorted in Python so a prefetch_related('punch_records') is reused
+        punches = sorted(self.punch_records.all(), key=lambda punch: punch.punch_time)
+
+        self.work_seconds = 0
+        self.break_seconds = 0
+        self.open_punch_in_time = None
+        self.last_punch_type = ''
+
+        if not punches:
             self.total_working_hours = 0
             self.total_break_hours = 0
             return
-        
-        total_work_seconds = 0
-        total_break_seconds = 0
-        last_in = None
-        
+
         for punch in punches:
-            if punch.punch_type == 'in':
-                last_in = punch.punch_time
-            elif punch.punch_type == 'out' and last_in:
-                duration = (punch.punch_time - last_in).total_seconds()
-                if not total_work_seconds:
-                    total_work_seconds += duration
-                else:
-                    total_break_seconds += duration
-                last_in = None
-        
-        self.total_working_hours = round(total_work_seconds / 3600, 2)
-        self.total_break_hours = round(total_break_seconds / 3600, 2)
-        
+            self._accumulate_punch(punch.punch_type, punch.punch_time)
+        self._sync_hours()
+
         # Update first and last punch times
-        first_punch = punches.filter(punch_type='in').first()
-        last_punch = punches.filter(punch_type='out').last()
-        
+        first_punch = next((punch for punch in punches if punch.punch_type == 'in'), None)
+        last_punch = next((punch for punch in reversed(punches) if punch.punch_type == 'out'), None)
+
         if first_punch:
             self.first_punch_in_time = first_punch.punch_time
             self.first_punch_in_location = first_punch.location
             self.first_punch_in_latitude = first_punch.latitude
             self.first_punch_in_longitude = first_punch.longitude
-        
+
         if last_punch:
             self.last_punch_out_time = last_punch.punch_time
             self.last_punch_out_location = last_punch.location
             self.last_punch_out_latitude = last_punch.latitude
             self.last_punch_out_longitude = last_punch.longitude
             self.is_currently_on_break = False
-        else:
-            last_punch_any = punches.last()
-            if last_punch_any and last_punch_any.punch_type == 'in':
-                self.is_currently_on_break = True
+        elif punches[-1].punch_type == 'in':
+            self.is_currently_on_break = True
     
     def update_status(self):
         """Update attendance status based on working hours"""
@@ -524,6 +590,41 @@ class PunchRecord(models.Model):
         return f"{self.attendance.user.name} - {self.get_punch_type_display()} - {self.punch_time}"
 
 
+class PunchIdempotencyKey(models.Model):
+    """
+    Response of a successful punch in/out keyed by the client's idempotency key.
+
+    Retries carrying the same key get the stored response back instead of
+    creating another punch (and another round of notifications).
+    """
+    user = models.ForeignKey(
+        AppUser,
+        on_delete=models.CASCADE,
+        related_name='punch_idempotency_keys'
+    )
+    key = models.CharField(max_length=64)
+    punch_type = models.CharField(max_length=3, choices=PunchRecord.PUNCH_TYPE_CHOICES)
+    punch_record = models.ForeignKey(
+        PunchRecord,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='idempotency_keys'
+    )
+    status_code = models.PositiveSmallIntegerField(default=200)
+    response = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        db_table = 'hr_punch_idempotency_key'
+        verbose_name = 'Punch Idempotency Key'
+        verbose_name_plural = 'Punch Idempotency Keys'
+        unique_together = ['user', 'key']
+
+    def __str__(self):
+        return f"{self.user_id} - {self.key} ({self.punch_type})"
+
+
 
 
 
@@ -540,7 +641,8 @@ from User.models import AppUser
 class OfficeLocation(models.Model):
     """
     Office location configuration for geofence validation.
-    Should have only ONE active record at a time.
+    Only ONE record is active at a time unless
+    settings.OFFICE_GEOFENCE_MULTI_OFFICE is enabled for branch offices.
     """
     name = models.CharField(
         max_length=200,
@@ -626,8 +728,10 @@ class OfficeLocation(models.Model):
         return f"{self.name} ({status}) - {self.geofence_radius_meters}m radius"
     
     def save(self, *args, **kwargs):
-        """Ensure only one office location is active at a time"""
-        if self.is_active:
+        """Ensure only one office location is active at a time (single-office mode)"""
+        from django.conf import settings
+
+        if self.is_active and not getattr(settings, 'OFFICE_GEOFENCE_MULTI_OFFICE', False):
             # Deactivate all other office locations
             OfficeLocation.objects.filter(is_active=True).exclude(pk=self.pk).update(is_active=False)
         super().save(*args, **kwargs)
@@ -751,3 +855,136 @@ class ParameterDepartment(models.Model):
     
     def __str__(self):
         return f"{self.parameter.name} - {self.department.name}"
+
+
+class MonthlyPenaltyCache(models.Model):
+    """
+    Stored result of calculate_monthly_penalties() for one user/month.
+
+    Rows are ignored once a signal bumps a PenaltyCacheGeneration covering
+    their user/month (attendance, punches, leave/late/early requests,
+    holidays, automation rules) or when `version` or the user's duty times
+    no longer match.
+    """
+    user = models.ForeignKey(
+        AppUser,
+        on_delete=models.CASCADE,
+        related_name='penalty_cache_entries'
+    )
+    year = models.PositiveIntegerField()
+    month = models.PositiveSmallIntegerField()
+    version = models.PositiveIntegerField(help_text='Penalty engine version the result was computed with')
+    period_end = models.DateField(help_text='Last day covered; earlier than month end while the month is open')
+    duty_time_start = models.TimeField(null=True, blank=True)
+    duty_time_end = models.TimeField(null=True, blank=True)
+    generation = models.PositiveIntegerField(
+        default=0,
+        help_text='PenaltyCacheGeneration total of the user/month read before computing'
+    )
+    result = models.JSONField(default=dict)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'hr_monthly_penalty_cache'
+        verbose_name = 'Monthly Penalty Cache'
+        verbose_name_plural = 'Monthly Penalty Cache'
+        unique_together = ['user', 'year', 'month']
+        indexes = [
+            models.Index(fields=['year', 'month']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.month}/{self.year} (v{self.version})"
+
+
+class PenaltyCacheGeneration(models.Model):
+    """
+    Counter bumped, in the writer's transaction, whenever penalty inputs
+    change within `scope`: one user's month ('<user>:<year>-<month>'), all of
+    a user's months ('<user>:*'), everyone's month ('*:<year>-<month>') or
+    everything ('*').
+    """
+    scope = models.CharField(max_length=40, unique=True)
+    generation = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'hr_penalty_cache_generation'
+        verbose_name = 'Penalty Cache Generation'
+        verbose_name_plural = 'Penalty Cache Generations'
+
+    def __str__(self):
+        return f"{self.scope} (g{self.generation})"
+
+
+class GeocodeCacheEntry(models.Model):
+    """
+    Reverse-geocode result for a lat/lon bucket from one provider.
+
+    Coordinates are rounded to settings.GEOCODE_CACHE_PRECISION decimal places
+    so nearby punches share an entry; rows older than the TTL are refreshed.
+    """
+    provider = models.CharField(max_length=50)
+    lat_bucket = models.DecimalField(max_digits=10, decimal_places=7)
+    lon_bucket = models.DecimalField(max_digits=10, decimal_places=7)
+    address = models.TextField()
+    details = models.JSONField(default=dict, blank=True)
+    fetched_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'hr_geocode_cache'
+        verbose_name = 'Geocode Cache Entry'
+        verbose_name_plural = 'Geocode Cache Entries'
+        unique_together = ['provider', 'lat_bucket', 'lon_bucket']
+
+    def __str__(self):
+        return f"{self.provider} ({self.lat_bucket}, {self.lon_bucket}) - {self.address[:50]}"
+
+
+class PenaltyDecision(models.Model):
+    """
+    One waive/deduct decision on a day's late, early or missed-punch penalty.
+
+    Append-only ledger written by apply_daily_penalty_action; payroll counts
+    reviewed and deducted days from it instead of parsing Attendance.admin_note.
+    Rows from before the ledger existed were back-filled from those notes
+    (actor is then unknown).
+    """
+    PENALTY_TYPE_CHOICES = [
+        ('late', 'Late Arrival'),
+        ('early', 'Early Exit'),
+        ('missed', 'Missed Punch'),
+    ]
+    ACTION_CHOICES = [
+        ('waive', 'Waive'),
+        ('deduct', 'Deduct'),
+    ]
+
+    user = models.ForeignKey(
+        AppUser,
+        on_delete=models.CASCADE,
+        related_name='penalty_decisions'
+    )
+    date = models.DateField()
+    penalty_type = models.CharField(max_length=10, choices=PENALTY_TYPE_CHOICES)
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    actor = models.ForeignKey(
+        AppUser,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='penalty_decisions_made'
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'hr_penalty_decision'
+        verbose_name = 'Penalty Decision'
+        verbose_name_plural = 'Penalty Decisions'
+        ordering = ['-date', '-created_at']
+        indexes = [
+            models.Index(fields=['user', 'date', 'penalty_type'], name='hr_penalty_user_date_idx'),
+            models.Index(fields=['date', 'penalty_type', 'action'], name='hr_penalty_date_type_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.date} - {self.penalty_type} {self.action}"
@@ -5,14 +5,21 @@ HR Signals — WhatsApp Notifications (Database-Driven)
 Punch in/out  → notify EMPLOYEE + HR/Managers
 Leave/Late/Early requests → notify HR/Managers
 Leave/Late/Early approvals → notify EMPLOYEE
+
+Penalty inputs changed → drop cached monthly penalty results
+Office locations changed → reload the geofence office index
+Holidays changed → reload the shared holiday calendar
 """
 
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.db import transaction
 import logging
 
-from .models import Attendance, LeaveRequest, LateRequest, EarlyRequest
+from .models import Attendance, Holiday, LeaveRequest, LateRequest, EarlyRequest, OfficeLocation, PunchRecord
+from .utils.holiday_calendar import invalidate_holiday_calendar
+from .utils.office_index import invalidate_office_index
+from .utils.penalty_cache import invalidate_penalty_cache
 
 logger = logging.getLogger(__name__)
 
@@ -336,4 +343,98 @@ def _send_early_notifications(instance, created, kwargs):
         logger.exception(f"[EARLY] Error: {e}")
     finally:
         if hasattr(instance, '_signal_processing'):
-            delattr(instance, '_signal_processing')
\ No newline at end of file
+            delattr(instance, '_signal_processing')
+
+
+# ============================================================================
+# PENALTY CACHE INVALIDATION
+# ============================================================================
+# Bulk operations (queryset.update / bulk_create) bypass these signals;
+# callers doing those must call invalidate_penalty_cache() themselves.
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+@receiver(post_save, sender=LateRequest)
+@receiver(post_delete, sender=LateRequest)
+@receiver(post_save, sender=EarlyRequest)
+@receiver(post_delete, sender=EarlyRequest)
+def invalidate_penalties_for_day(sender, instance, **kwargs):
+    invalidate_penalty_cache(user_id=instance.user_id, from_date=instance.date)
+
+
+@receiver(post_save, sender=PunchRecord)
+@receiver(post_delete, sender=PunchRecord)
+def invalidate_penalties_for_punch(sender, instance, **kwargs):
+    try:
+        attendance = instance.attendance
+    except Attendance.DoesNotExist:
+        # Cascade delete; the Attendance delete already invalidated
+        return
+    invalidate_penalty_cache(user_id=attendance.user_id, from_date=attendance.date)
+
+
+@receiver(pre_save, sender=LeaveRequest)
+def store_old_leave_dates(sender, instance, **kwargs):
+    """Remember the previous range so moving a leave clears both months."""
+    instance._old_leave_range = None
+    if instance.pk:
+        instance._old_leave_range = LeaveRequest.objects.filter(
+            pk=instance.pk
+        ).values_list('from_date', 'to_date').first()
+
+
+@receiver(post_save, sender=LeaveRequest)
+@receiver(post_delete, sender=LeaveRequest)
+def invalidate_penalties_for_leave(sender, instance, **kwargs):
+    invalidate_penalty_cache(user_id=instance.user_id, from_date=instance.from_date, to_date=instance.to_date)
+    old_range = getattr(instance, '_old_leave_range', None)
+    if old_range and old_range != (instance.from_date, instance.to_date):
+        invalidate_penalty_cache(user_id=instance.user_id, from_date=old_range[0], to_date=old_range[1])
+
+
+@receiver(pre_save, sender=Holiday)
+def store_old_holiday_date(sender, instance, **kwargs):
+    instance._old_holiday_date = None
+    if instance.pk:
+        instance._old_holiday_date = Holiday.objects.filter(
+            pk=instance.pk
+        ).values_list('date', flat=True).first()
+
+
+@receiver(post_save, sender=Holiday)
+@receiver(post_delete, sender=Holiday)
+def invalidate_penalties_for_holiday(sender, instance, **kwargs):
+    # Holidays apply to everyone
+    invalidate_penalty_cache(from_date=instance.date)
+    old_date = getattr(instance, '_old_holiday_date', None)
+    if old_date and old_date != instance.date:
+        invalidate_penalty_cache(from_date=old_date)
+
+
+@receiver(post_save, sender='payroll.AutomationRule')
+@receiver(post_delete, sender='payroll.AutomationRule')
+def invalidate_penalties_for_rules(sender, instance, **kwargs):
+    invalidate_penalty_cache()
+
+
+# ============================================================================
+# OFFICE GEOFENCE INDEX
+# ============================================================================
+
+@receiver(post_save, sender=OfficeLocation)
+@receiver(post_delete, sender=OfficeLocation)
+def refresh_office_index(sender, instance, **kwargs):
+    # Reload after commit so other workers read the committed offices
+    transaction.on_commit(invalidate_office_index)
+
+
+# ============================================================================
+# HOLIDAY CALENDAR
+# ============================================================================
+
+@receiver(post_save, sender=Holiday)
+@receiver(post_delete, sender=Holiday)
+def refresh_holiday_calendar(sender, instance, **kwargs):
+    # Drop now for this connection, and again after commit for everyone else
+    invalidate_holiday_calendar()
+    transaction.on_commit(invalidate_holiday_calendar)
@@ -0,0 +1,80 @@
+import calendar
+from datetime import date
+
+from HR.models import Attendance
+from HR.utils.holiday_calendar import get_holidays_in_month
+
+
+# Cell values understood by the admin grid
+VERIFIED_CELL = {'full': 'verified', 'half': 'half-verified', 'leave': 'verified-leave'}
+UNVERIFIED_CELL = {'full': 'full', 'half': 'half', 'leave': 'leave'}
+
+
+def attendance_cell_status(status, verification_status, first_punch_in_time):
+    """Map one stored attendance row to its grid cell value."""
+    if not first_punch_in_time:
+        return 'not-marked'
+    if verification_status == 'verified':
+        return VERIFIED_CELL.get(status, 'verified')
+    return UNVERIFIED_CELL.get(status, 'full')
+
+
+def build_monthly_grid(users, year, month):
+    """
+    Read-only monthly attendance grid.
+
+    Uses the shared holiday calendar and one month-range attendance query for
+    the whole cohort, reading only the stored columns it needs. Nothing is recalculated
+    or saved here; stale totals are repaired by the
+    `recompute_attendance_totals` management command.
+    """
+    users = list(users)
+    days_in_month = calendar.monthrange(year, month)[1]
+    month_start = date(year, month, 1)
+    month_end = date(year, month, days_in_month)
+
+    holidays = set(get_holidays_in_month(year, month))
+
+    # Day template shared by every user: Sundays and holidays win over attendance
+    base_row = []
+    for day in range(1, days_in_month + 1):
+        current_date = date(year, month, day)
+        if current_date.weekday() == 6:
+            base_row.append('sunday')
+        elif current_date in holidays:
+            base_row.append('holiday')
+        else:
+            base_row.append('not-marked')
+    open_days = [i for i, cell in enumerate(base_row) if cell == 'not-marked']
+
+    cells_by_user = {}
+    rows = Attendance.objects.filter(
+        user_id__in=[user.id for user in users],
+        date__gte=month_start,
+        date__lte=month_end,
+    ).order_by().values_list('user_id', 'date', 'status', 'verification_status', 'first_punch_in_time')
+
+    for user_id, att_date, att_status, verification_status, first_in in rows.iterator():
+        cells_by_user.setdefault(user_id, {})[att_date.day - 1] = attendance_cell_status(
+            att_status, verification_status, first_in
+        )
+
+    result = []
+    for user in users:
+        attendance_array = list(base_row)
+        user_cells = cells_by_user.get(user.id)
+        if user_cells:
+            for index in open_days:
+                if index in user_cells:
+                    attendance_array[index] = user_cells[index]
+
+        result.append({
+            'user_id': user.id,
+            'user_name': user.name,
+            'user_email': user.email,
+            'duty_start': user.duty_time_start.strftime('%H:%M') if user.duty_time_start else '09:00',
+            'duty_end': user.duty_time_end.strftime('%H:%M') if user.duty_time_end else '18:00',
+            'attendance': attendance_array,
+        })
+
+    return result
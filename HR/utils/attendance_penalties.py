@@ -2,6 +2,7 @@ from datetime import datetime, timedelta
 from django.utils import timezone
 
 from HR.models import Attendance, LeaveRequest
+from HR.utils.holiday_calendar import get_holidays_between
 
 
 def _get_month_bounds(year, month):
@@ -46,45 +47,87 @@ def calculate_monthly_penalties(user, year, month):
     - Missed punch (missing in or out): allowed once. After that, 0.5 day each.
     - Early exit >= 30 mins: allowed once. After that, 0.5 day each.
     """
+    return calculate_monthly_penalties_bulk([user], year, month)[user.id]
+
+
+def _expand_leave_dates(leave, start_date, end_date, target):
+    overlap_start = max(leave.from_date, start_date)
+    overlap_end = min(leave.to_date, end_date)
+    day_cursor = overlap_start
+    while day_cursor <= overlap_end:
+        target.add(day_cursor)
+        day_cursor += timedelta(days=1)
+
+
+def calculate_monthly_penalties_bulk(users, year, month):
+    """
+    Calculate monthly attendance penalties for many users at once.
+
+    Loads attendance and leave requests for the whole cohort with two range
+    queries (holidays come from the shared holiday calendar), then runs the same per-user grace rules as
+    `calculate_monthly_penalties` in memory.
+
+    Returns {user_id: {'per_date': ..., 'summary': ...}} with an entry for
+    every user passed in.
+    """
+    users = [user for user in users if user is not None]
+    if not users:
+        return {}
+
     start_date, end_date = _get_month_bounds(year, month)
+    user_ids = [user.id for user in users]
 
+    attendances_by_user = {}
     attendances = Attendance.objects.filter(
-        user=user,
+        user_id__in=user_ids,
         date__gte=start_date,
         date__lte=end_date
     ).order_by('date')
+    for att in attendances:
+        attendances_by_user.setdefault(att.user_id, {})[att.date] = att
 
-    approved_leaves = LeaveRequest.objects.filter(
-        user=user,
-        status='approved',
+    # One query covers both approved leaves and any leave request in range
+    approved_leave_dates_by_user = {}
+    leave_request_dates_by_user = {}
+    leave_requests = LeaveRequest.objects.filter(
+        user_id__in=user_ids,
         from_date__lte=end_date,
         to_date__gte=start_date,
-    ).only('from_date', 'to_date')
+    ).only('user_id', 'from_date', 'to_date', 'status')
+    for leave in leave_requests:
+        _expand_leave_dates(
+            leave, start_date, end_date,
+            leave_request_dates_by_user.setdefault(leave.user_id, set())
+        )
+        if leave.status == 'approved':
+            _expand_leave_dates(
+                leave, start_date, end_date,
+                approved_leave_dates_by_user.setdefault(leave.user_id, set())
+            )
 
-    approved_leave_dates = set()
-    for leave in approved_leaves:
-        overlap_start = max(leave.from_date, start_date)
-        overlap_end = min(leave.to_date, end_date)
-        day_cursor = overlap_start
-        while day_cursor <= overlap_end:
-            approved_leave_dates.add(day_cursor)
-            day_cursor += timedelta(days=1)
+    # Company holidays in range from the shared calendar
+    try:
+        holidays = set(get_holidays_between(start_date, end_date))
+    except Exception:
+        holidays = set()
 
-    leave_requests = LeaveRequest.objects.filter(
-        user=user,
-        from_date__lte=end_date,
-        to_date__gte=start_date,
-    ).only('from_date', 'to_date', 'status')
+    return {
+        user.id: _calculate_user_penalties(
+            user,
+            start_date,
+            end_date,
+            attendances_by_user.get(user.id, {}),
+            approved_leave_dates_by_user.get(user.id, set()),
+            leave_request_dates_by_user.get(user.id, set()),
+            holidays,
+        )
+        for user in users
+    }
 
-    leave_request_dates = set()
-    for leave in leave_requests:
-        overlap_start = max(leave.from_date, start_date)
-        overlap_end = min(leave.to_date, end_date)
-        day_cursor = overlap_start
-        while day_cursor <= overlap_end:
-            leave_request_dates.add(day_cursor)
-            day_cursor += timedelta(days=1)
 
+def _calculate_user_penalties(user, start_date, end_date, attendances_by_date,
+                              approved_leave_dates, leave_request_dates, holidays):
+    """Run the late/missed/early grace rules over one user's preloaded month."""
     per_date = {}
 
     late_grace_used = 0
@@ -105,16 +148,6 @@ def calculate_monthly_penalties(user, year, month):
 
     total_deduction_days = 0.0
 
-    # Pre-fetch company holidays in range
-    try:
-        from HR.models import Holiday
-        holidays = set(Holiday.objects.filter(date__gte=start_date, date__lte=end_date, is_active=True).values_list('date', flat=True))
-    except Exception:
-        holidays = set()
-
-    # Build a map of date->Attendance for quick lookup
-    attendances_by_date = {a.date: a for a in attendances}
-
     day = start_date
     while day <= end_date:
         att = attendances_by_date.get(day)
@@ -130,8 +163,8 @@ def calculate_monthly_penalties(user, year, month):
                 day += timedelta(days=1)
                 continue
 
-        duty_start = getattr(att.user, 'duty_time_start', None) if att else getattr(user, 'duty_time_start', None)
-        duty_end = getattr(att.user, 'duty_time_end', None) if att else getattr(user, 'duty_time_end', None)
+        duty_start = getattr(user, 'duty_time_start', None)
+        duty_end = getattr(user, 'duty_time_end', None)
 
         first_in = att.first_punch_in_time if att else None
         last_out = att.last_punch_out_time if att else None
@@ -0,0 +1,124 @@
+import calendar
+
+from django.db.models import Count, Q, Sum
+
+from HR.models import Attendance
+from HR.utils.holiday_calendar import get_holidays_in_month
+
+
+def count_sundays(year, month):
+    """Count the number of Sundays in a given month"""
+    days_in_month = calendar.monthrange(year, month)[1]
+    first_weekday = calendar.weekday(year, month, 1)
+    # Days until the first Sunday (weekday 6), then one every 7 days
+    first_sunday = 1 + (6 - first_weekday) % 7
+    return (days_in_month - first_sunday) // 7 + 1
+
+
+def get_month_calendar_counts(year, month):
+    """Return (days_in_month, holidays, sundays) for a month."""
+    days_in_month = calendar.monthrange(year, month)[1]
+    holidays = len(get_holidays_in_month(year, month))
+    return days_in_month, holidays, count_sundays(year, month)
+
+
+def summarize_attendance_by_user(year, month, users=None):
+    """
+    Aggregate a month of attendance per user with ONE grouped query.
+
+    `users` may be a queryset, an iterable of AppUser objects or ids, or None
+    for every user with attendance in the month.
+
+    Returns {user_id: counters}. Users without any attendance rows are absent
+    from the result; use `empty_counters()` for them.
+    """
+    qs = Attendance.objects.filter(date__year=year, date__month=month)
+
+    if users is not None:
+        if hasattr(users, 'values'):
+            qs = qs.filter(user_id__in=users.values('id'))
+        else:
+            qs = qs.filter(user_id__in=[getattr(u, 'pk', u) for u in users])
+
+    rows = qs.order_by().values('user_id').annotate(
+        full_days=Count('id', filter=Q(status='full')),
+        full_days_unverified=Count('id', filter=Q(status='full', verification_status='unverified')),
+        verified_full_days=Count('id', filter=Q(status='full', verification_status='verified')),
+        half_days=Count('id', filter=Q(status='half')),
+        half_days_unverified=Count('id', filter=Q(status='half', verification_status='unverified')),
+        verified_half_days=Count('id', filter=Q(status='half', verification_status='verified')),
+        leaves=Count('id', filter=Q(status='leave')),
+        total_working_hours=Sum('total_working_hours'),
+        total_break_hours=Sum('total_break_hours'),
+        marked_days=Count('id'),
+    )
+
+    result = {}
+    for row in rows:
+        user_id = row.pop('user_id')
+        row['total_working_hours'] = row['total_working_hours'] or 0
+        row['total_break_hours'] = row['total_break_hours'] or 0
+        result[user_id] = row
+    return result
+
+
+def empty_counters():
+    return {
+        'full_days': 0,
+        'full_days_unverified': 0,
+        'verified_full_days': 0,
+        'half_days': 0,
+        'half_days_unverified': 0,
+        'verified_half_days': 0,
+        'leaves': 0,
+        'total_working_hours': 0,
+        'total_break_hours': 0,
+        'marked_days': 0,
+    }
+
+
+def build_summary_row(user, year, month, counters, calendar_counts):
+    """Build the summary payload shared by `summary` and `summary-all`."""
+    days_in_month, holidays, sundays = calendar_counts
+    counters = counters or empty_counters()
+    not_marked = days_in_month - counters['marked_days'] - holidays - sundays
+
+    return {
+        'user_id': user.id,
+        'user_name': user.name,
+        'user_email': user.email,
+        'month': month,
+        'year': year,
+        'total_days': days_in_month,
+        'full_days_unverified': counters['full_days_unverified'],
+        'verified_full_days': counters['verified_full_days'],
+        'half_days_unverified': counters['half_days_unverified'],
+        'verified_half_days': counters['verified_half_days'],
+        'leaves': counters['leaves'],
+        'not_marked': not_marked,
+        'total_working_hours': round(float(counters['total_working_hours']), 2),
+        'total_break_hours': round(float(counters['total_break_hours']), 2),
+        'holidays': holidays,
+        'sundays': sundays,
+    }
+
+
+def get_monthly_summaries(users, year, month):
+    """
+    Summary rows for every user in `users` (in iteration order) for a month.
+    Runs one user query and one grouped attendance query; holidays come from
+    the shared holiday calendar.
+    """
+    users = list(users)
+    calendar_counts = get_month_calendar_counts(year, month)
+    counters_by_user = summarize_attendance_by_user(year, month, users)
+
+    return [
+        build_summary_row(user, year, month, counters_by_user.get(user.id), calendar_counts)
+        for user in users
+    ]
+
+
+def get_user_monthly_counters(user, year, month):
+    """Counters for a single user, falling back to zeros when nothing is marked."""
+    return summarize_attendance_by_user(year, month, [user]).get(user.id) or empty_counters()
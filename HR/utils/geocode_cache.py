@@ -0,0 +1,212 @@
+# HR/utils/geocode_cache.py
+"""
+Reverse-geocode cache shared by the reverse_geocode endpoints.
+
+Coordinates are bucketed to GEOCODE_CACHE_PRECISION decimal places (4 ≈ 11 m)
+and looked up in an in-process LRU, then in the hr_geocode_cache table, and
+only then fetched from the upstream provider. Entries older than
+GEOCODE_CACHE_TTL_SECONDS are refreshed; if the refresh fails the stale
+address is served instead of the raw coordinates.
+
+Providers are callables `provider(latitude, longitude)` returning
+{'address': ..., 'details': {...}} or None when the upstream has no answer.
+They are registered by name and can be swapped via settings.GEOCODE_PROVIDERS
+(e.g. a local stand-in for tests and benchmarks).
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+import requests
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+def nominatim_provider(latitude, longitude):
+    response = requests.get(
+        f'https://nominatim.openstreetmap.org/reverse',
+        params={
+            'format': 'json',
+            'lat': latitude,
+            'lon': longitude,
+            'zoom': 18,
+            'addressdetails': 1
+        },
+        headers={
+            'User-Agent': 'AttendanceApp/1.0 (your-email@example.com)'
+        },
+        timeout=10
+    )
+    if response.status_code != 200:
+        return None
+
+    data = response.json()
+    return {
+        'address': data.get('display_name', f'{latitude}, {longitude}'),
+        'details': data.get('address', {}),
+    }
+
+
+def bigdatacloud_provider(latitude, longitude):
+    response = requests.get(
+        'https://api.bigdatacloud.net/data/reverse-geocode-client',
+        params={
+            'latitude': latitude,
+            'longitude': longitude,
+            'localityLanguage': 'en'
+        },
+        timeout=10
+    )
+    if response.status_code != 200:
+        return None
+
+    data = response.json()
+
+    # Build address from components
+    components = []
+    if data.get('locality'):
+        components.append(data['locality'])
+    if data.get('city'):
+        components.append(data['city'])
+    if data.get('principalSubdivision'):
+        components.append(data['principalSubdivision'])
+    if data.get('countryName'):
+        components.append(data['countryName'])
+
+    return {
+        'address': ', '.join(components) if components else f'{latitude}, {longitude}',
+        'details': data,
+    }
+
+
+DEFAULT_PROVIDERS = {
+    'nominatim': 'HR.utils.geocode_cache.nominatim_provider',
+    'bigdatacloud': 'HR.utils.geocode_cache.bigdatacloud_provider',
+}
+
+
+def get_provider(name):
+    providers = {**DEFAULT_PROVIDERS, **getattr(settings, 'GEOCODE_PROVIDERS', {})}
+    provider = providers[name]
+    return import_string(provider) if isinstance(provider, str) else provider
+
+
+def bucket_coordinates(latitude, longitude):
+    """
+    Round coordinates to the configured cache precision.
+
+    Raises ValueError (or decimal.InvalidOperation for non-numbers) unless
+    latitude is within ±90 and longitude within ±180.
+    """
+    precision = getattr(settings, 'GEOCODE_CACHE_PRECISION', 4)
+    quantum = Decimal(1).scaleb(-precision)
+    latitude, longitude = Decimal(str(latitude)), Decimal(str(longitude))
+    if not (latitude.is_finite() and longitude.is_finite()) or abs(latitude) > 90 or abs(longitude) > 180:
+        raise ValueError('Latitude must be within ±90 and longitude within ±180')
+    return (
+        latitude.quantize(quantum, rounding=ROUND_HALF_UP),
+        longitude.quantize(quantum, rounding=ROUND_HALF_UP),
+    )
+
+
+class _LRU:
+    """Small thread-safe LRU of (provider, lat, lon) -> (result, fetched_epoch)."""
+
+    def __init__(self):
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        max_size = getattr(settings, 'GEOCODE_CACHE_LRU_SIZE', 2048)
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_lru = _LRU()
+
+
+def clear_geocode_lru():
+    _lru.clear()
+
+
+def _ttl_seconds():
+    return getattr(settings, 'GEOCODE_CACHE_TTL_SECONDS', 30 * 24 * 3600)
+
+
+def reverse_geocode_cached(provider_name, latitude, longitude):
+    """
+    Cached reverse geocode.
+
+    Returns {'address': ..., 'details': {...}} or None when the provider has
+    no answer and nothing is cached. Raises requests.RequestException when
+    the provider fails and nothing (not even a stale entry) is cached.
+    """
+    from HR.models import GeocodeCacheEntry
+
+    lat_bucket, lon_bucket = bucket_coordinates(latitude, longitude)
+    key = (provider_name, lat_bucket, lon_bucket)
+    ttl = _ttl_seconds()
+
+    cached = _lru.get(key)
+    if cached and time.time() - cached[1] < ttl:
+        return cached[0]
+
+    entry = GeocodeCacheEntry.objects.filter(
+        provider=provider_name,
+        lat_bucket=lat_bucket,
+        lon_bucket=lon_bucket,
+    ).first()
+    if entry and timezone.now() - entry.fetched_at < timedelta(seconds=ttl):
+        result = {'address': entry.address, 'details': entry.details}
+        _lru.set(key, (result, entry.fetched_at.timestamp()))
+        return result
+
+    # Miss or expired: ask the provider with the bucket centre so every
+    # caller in the bucket gets the same answer
+    try:
+        result = get_provider(provider_name)(str(lat_bucket), str(lon_bucket))
+    except requests.exceptions.RequestException:
+        if entry:
+            logger.warning(f"[GEOCODE] {provider_name} refresh failed, serving stale entry for {lat_bucket},{lon_bucket}")
+            return {'address': entry.address, 'details': entry.details}
+        raise
+
+    if result is None:
+        if entry:
+            return {'address': entry.address, 'details': entry.details}
+        return None
+
+    fetched_at = timezone.now()
+    GeocodeCacheEntry.objects.update_or_create(
+        provider=provider_name,
+        lat_bucket=lat_bucket,
+        lon_bucket=lon_bucket,
+        defaults={
+            'address': result['address'],
+            'details': result.get('details') or {},
+            'fetched_at': fetched_at,
+        },
+    )
+    _lru.set(key, (result, fetched_at.timestamp()))
+    return result
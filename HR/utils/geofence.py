@@ -31,7 +31,7 @@ def haversine_distance(lat1, lon1, lat2, lon2):
 
 def validate_office_geofence(user_lat, user_lon, user=None):
     """
-    Validates if user is within office geofence radius.
+    Validates if user is within the geofence radius of any active office.
     Out-house employees are exempt from geofence validation.
 
     Args:
@@ -40,9 +40,23 @@ def validate_office_geofence(user_lat, user_lon, user=None):
         user (AppUser, optional): User object for logging
 
     Returns:
-        tuple: (allowed: bool, distance_in_meters: float)
+        tuple: (allowed: bool, distance_in_meters: float) where the distance
+        is to the matched office, or to the nearest office when rejected
     """
-    from HR.models import OfficeLocation
+    allowed, distance, _ = check_office_geofence(user_lat, user_lon, user=user)
+    return allowed, distance
+
+
+def check_office_geofence(user_lat, user_lon, user=None):
+    """
+    validate_office_geofence() that also returns the office the distance was
+    measured to, as a get_office_info()-style dict (None when no office was
+    compared, e.g. invalid or missing coordinates).
+
+    Returns:
+        tuple: (allowed: bool, distance_in_meters: float, office_info: dict or None)
+    """
+    from HR.utils.office_index import get_office_index
 
     # ✅ Out-house employees can punch in/out from anywhere
     if user is not None:
@@ -54,67 +68,70 @@ def validate_office_geofence(user_lat, user_lon, user=None):
                     float(user_lat), float(user_lon),
                     float(user_lat), float(user_lon)  # distance = 0
                 ) if user_lat and user_lon else 0
-                return True, 0
+                return True, 0, None
         except Exception:
             pass  # No employee profile — fall through to normal check
     
-    # Get active office configuration from database
-    office = OfficeLocation.get_active_office()
+    # Active offices come from the in-memory index (no query per punch)
+    index = get_office_index()
     
-    if not office:
+    if not index.offices:
         logger.error("[GEOFENCE] ❌ No active office location configured in database!")
         logger.error("[GEOFENCE] Please configure office location in Django Admin.")
         # Fallback to settings.py if available
-        return _validate_from_settings(user_lat, user_lon, user)
+        allowed, distance = _validate_from_settings(user_lat, user_lon, user)
+        return allowed, distance, get_office_info()
     
     # Validate and convert coordinates
     try:
         user_lat = float(user_lat) if user_lat is not None else None
         user_lon = float(user_lon) if user_lon is not None else None
-        office_lat = float(office.latitude)
-        office_lon = float(office.longitude)
-        allowed_radius = float(office.geofence_radius_meters)
     except (TypeError, ValueError) as e:
         logger.error(f"[GEOFENCE] ❌ Invalid coordinates: {e}")
-        return False, 0
+        return False, 0, None
     
     # Handle case where user coordinates are not provided
     if user_lat is None or user_lon is None:
         logger.warning("[GEOFENCE] ⚠️ User coordinates not provided. Skipping distance check.")
         # Depending on policy, you might want to allow or deny this.
         # Allowing it for now, but you could return False, 0 to deny.
-        return True, 0
+        return True, 0, None
     
     # Validate coordinate ranges
     if not (-90 <= user_lat <= 90) or not (-180 <= user_lon <= 180):
         logger.error(f"[GEOFENCE] ❌ Invalid coordinates range")
-        return False, 0
+        return False, 0, None
     
-    # Calculate actual distance from office
-    distance = haversine_distance(user_lat, user_lon, office_lat, office_lon)
-    distance = round(distance, 2)
+    # Nearest office whose geofence contains the user (or nearest overall)
+    match = index.resolve(user_lat, user_lon)
+    office = match.office
+    office_lat = office.latitude
+    office_lon = office.longitude
+    allowed_radius = office.radius
+    
+    distance = round(match.distance, 2)
     
     # Log validation attempt
     user_info = f"User {user.email}" if user else "Unknown user"
     logger.info(f"[GEOFENCE] {'='*60}")
     logger.info(f"[GEOFENCE] Validating: {user_info}")
-    logger.info(f"[GEOFENCE] Office: {office.name}")
+    logger.info(f"[GEOFENCE] Office: {office.name} ({len(index.offices)} active)")
     logger.info(f"[GEOFENCE] User: ({user_lat:.6f}, {user_lon:.6f})")
     logger.info(f"[GEOFENCE] Office: ({office_lat:.6f}, {office_lon:.6f})")
     logger.info(f"[GEOFENCE] Distance: {distance}m | Allowed: {allowed_radius}m")
     logger.info(f"[GEOFENCE] {'='*60}")
     
     # STRICT VALIDATION
-    if distance > allowed_radius:
+    if not match.allowed:
         logger.warning(f"[GEOFENCE] ❌ REJECTED - {user_info}")
         logger.warning(f"[GEOFENCE] Distance {distance}m EXCEEDS {allowed_radius}m")
         logger.warning(f"[GEOFENCE] Excess: {distance - allowed_radius:.2f}m")
-        return False, distance
+        return False, distance, _indexed_office_info(office)
     
     # SUCCESS
     logger.info(f"[GEOFENCE] ✅ ALLOWED - {user_info}")
     logger.info(f"[GEOFENCE] Buffer remaining: {allowed_radius - distance:.2f}m")
-    return True, distance
+    return True, distance, _indexed_office_info(office)
 
 
 def _validate_from_settings(user_lat, user_lon, user=None):
@@ -156,24 +173,28 @@ def _validate_from_settings(user_lat, user_lon, user=None):
     return True, distance
 
 
+def _indexed_office_info(office):
+    return {
+        'latitude': office.latitude,
+        'longitude': office.longitude,
+        'radius': office.radius,
+        'address': office.address,
+        'name': office.name,
+        'source': 'database'
+    }
+
+
 def get_office_info():
     """
     Returns office location information for frontend display.
     Prioritizes database configuration over settings.py
     """
-    from HR.models import OfficeLocation
+    from HR.utils.office_index import get_office_index
     
-    office = OfficeLocation.get_active_office()
+    office = get_office_index().primary
     
     if office:
-        return {
-            'latitude': float(office.latitude),
-            'longitude': float(office.longitude),
-            'radius': float(office.geofence_radius_meters),
-            'address': office.address,
-            'name': office.name,
-            'source': 'database'
-        }
+        return _indexed_office_info(office)
     
     # Fallback to settings.py
     if all([
@@ -0,0 +1,118 @@
+# HR/utils/holiday_calendar.py
+"""
+Shared, read-only calendar of active holidays.
+
+Each year's active holidays are loaded with one query into an immutable
+date-keyed mapping and kept in-process. Holiday save/delete bumps the
+calendar version (locally and in the shared cache), and
+HOLIDAY_CALENDAR_TTL_SECONDS bounds staleness for workers without a shared
+cache backend.
+"""
+
+import threading
+import time
+from collections import namedtuple
+from datetime import date
+from types import MappingProxyType
+
+from django.conf import settings
+from django.core.cache import cache
+
+VERSION_CACHE_KEY = 'hr:holiday_calendar:version'
+
+HolidayInfo = namedtuple(
+    'HolidayInfo',
+    ['id', 'date', 'name', 'holiday_type', 'holiday_type_display', 'is_paid'],
+)
+
+_calendars = {}
+_local_version = 0
+_lock = threading.Lock()
+
+
+class HolidayCalendar:
+    """Immutable {date: HolidayInfo} for one year."""
+
+    def __init__(self, year, holidays, version):
+        self.year = year
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.by_date = MappingProxyType({holiday.date: holiday for holiday in holidays})
+
+    @classmethod
+    def load(cls, year, version):
+        from HR.models import Holiday
+
+        type_labels = dict(Holiday.HOLIDAY_TYPE_CHOICES)
+        rows = Holiday.objects.filter(
+            date__gte=date(year, 1, 1),
+            date__lte=date(year, 12, 31),
+            is_active=True,
+        ).values_list('id', 'date', 'name', 'holiday_type', 'is_paid')
+
+        holidays = [
+            HolidayInfo(pk, day, name, holiday_type, type_labels.get(holiday_type, holiday_type), is_paid)
+            for pk, day, name, holiday_type, is_paid in rows
+        ]
+        return cls(year, holidays, version)
+
+    def get(self, day):
+        return self.by_date.get(day)
+
+    def in_month(self, month):
+        return {day: holiday for day, holiday in self.by_date.items() if day.month == month}
+
+
+def _shared_version():
+    try:
+        return cache.get(VERSION_CACHE_KEY, 0)
+    except Exception:
+        return 0
+
+
+def get_holiday_calendar(year):
+    """Calendar for `year`, reloading it when the holiday version changed."""
+    ttl = getattr(settings, 'HOLIDAY_CALENDAR_TTL_SECONDS', 300)
+    version = (_local_version, _shared_version())
+    calendar = _calendars.get(year)
+    if calendar is not None and calendar.version == version and time.monotonic() - calendar.loaded_at < ttl:
+        return calendar
+
+    with _lock:
+        calendar = HolidayCalendar.load(year, version)
+        _calendars[year] = calendar
+    return calendar
+
+
+def get_holiday(day):
+    """Active holiday on `day`, or None."""
+    return get_holiday_calendar(day.year).get(day)
+
+
+def get_holidays_between(start_date, end_date):
+    """{date: HolidayInfo} for active holidays in start_date..end_date (inclusive)."""
+    result = {}
+    for year in range(start_date.year, end_date.year + 1):
+        for day, holiday in get_holiday_calendar(year).by_date.items():
+            if start_date <= day <= end_date:
+                result[day] = holiday
+    return result
+
+
+def get_holidays_in_month(year, month):
+    """{date: HolidayInfo} for active holidays in a month."""
+    return get_holiday_calendar(year).in_month(month)
+
+
+def invalidate_holiday_calendar():
+    """Force every process to reload holiday calendars on next use."""
+    global _local_version
+    with _lock:
+        _local_version += 1
+        _calendars.clear()
+    try:
+        cache.incr(VERSION_CACHE_KEY)
+    except ValueError:
+        cache.set(VERSION_CACHE_KEY, 1, None)
+    except Exception:
+        pass
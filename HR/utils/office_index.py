@@ -0,0 +1,160 @@
+# HR/utils/office_index.py
+"""
+In-process spatial index of active office locations.
+
+Punch in/out validates against every active office without a database query:
+offices are loaded once into a lat/lon grid and reloaded only when the
+index version changes (OfficeLocation save/delete) or the TTL expires.
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from HR.utils.geofence import haversine_distance
+
+logger = logging.getLogger(__name__)
+
+# Shared version key so other worker processes notice office changes when a
+# shared cache backend is configured; the TTL covers per-process caches.
+VERSION_CACHE_KEY = 'hr:office_geofence_index:version'
+
+# ~1.1 km of latitude per cell; offices are registered in every cell their
+# radius touches, so a lookup only inspects a single cell.
+GRID_CELL_DEGREES = 0.01
+METERS_PER_DEGREE_LAT = 111320.0
+
+IndexedOffice = namedtuple(
+    'IndexedOffice',
+    ['id', 'name', 'address', 'latitude', 'longitude', 'radius', 'configured_at'],
+)
+
+GeofenceMatch = namedtuple('GeofenceMatch', ['allowed', 'office', 'distance'])
+
+
+def _cell(lat, lon):
+    return (math.floor(lat / GRID_CELL_DEGREES), math.floor(lon / GRID_CELL_DEGREES))
+
+
+def _covered_cells(office):
+    """Grid cells overlapped by the office's geofence bounding box."""
+    lat_span = office.radius / METERS_PER_DEGREE_LAT
+    cos_lat = max(math.cos(math.radians(office.latitude)), 1e-6)
+    lon_span = office.radius / (METERS_PER_DEGREE_LAT * cos_lat)
+
+    min_lat, min_lon = _cell(office.latitude - lat_span, office.longitude - lon_span)
+    max_lat, max_lon = _cell(office.latitude + lat_span, office.longitude + lon_span)
+    for lat_cell in range(min_lat, max_lat + 1):
+        for lon_cell in range(min_lon, max_lon + 1):
+            yield (lat_cell, lon_cell)
+
+
+class OfficeGeofenceIndex:
+    """Immutable snapshot of the active offices keyed by grid cell."""
+
+    def __init__(self, offices, version):
+        self.offices = tuple(offices)
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.grid = {}
+        for office in self.offices:
+            for cell in _covered_cells(office):
+                self.grid.setdefault(cell, []).append(office)
+
+    @classmethod
+    def load(cls, version):
+        from HR.models import OfficeLocation
+
+        offices = [
+            IndexedOffice(
+                id=office.pk,
+                name=office.name,
+                address=office.address,
+                latitude=float(office.latitude),
+                longitude=float(office.longitude),
+                radius=float(office.geofence_radius_meters),
+                configured_at=office.configured_at,
+            )
+            for office in OfficeLocation.objects.filter(is_active=True).order_by('-configured_at')
+        ]
+        return cls(offices, version)
+
+    @property
+    def primary(self):
+        """Most recently configured active office (same as get_active_office)."""
+        return self.offices[0] if self.offices else None
+
+    def resolve(self, lat, lon):
+        """
+        Nearest office whose geofence contains (lat, lon).
+
+        Falls back to the nearest office overall (allowed=False) when the
+        point is outside every geofence. Returns None with no active offices.
+        """
+        if not self.offices:
+            return None
+
+        best = None
+        for office in self.grid.get(_cell(lat, lon), ()):
+            distance = haversine_distance(lat, lon, office.latitude, office.longitude)
+            if distance <= office.radius and (best is None or distance < best.distance):
+                best = GeofenceMatch(True, office, distance)
+        if best:
+            return best
+
+        # Rejections are rare and office counts small, so scan for the message
+        nearest = min(
+            self.offices,
+            key=lambda office: haversine_distance(lat, lon, office.latitude, office.longitude),
+        )
+        distance = haversine_distance(lat, lon, nearest.latitude, nearest.longitude)
+        return GeofenceMatch(False, nearest, distance)
+
+
+_index = None
+_local_version = 0
+_lock = threading.Lock()
+
+
+def _shared_version():
+    try:
+        return cache.get(VERSION_CACHE_KEY, 0)
+    except Exception:
+        return 0
+
+
+def get_office_index():
+    """Return the current index, rebuilding it if stale."""
+    global _index
+
+    ttl = getattr(settings, 'OFFICE_GEOFENCE_INDEX_TTL_SECONDS', 300)
+    version = (_local_version, _shared_version())
+    index = _index
+    if index is not None and index.version == version and time.monotonic() - index.loaded_at < ttl:
+        return index
+
+    with _lock:
+        index = _index
+        if index is None or index.version != version or time.monotonic() - index.loaded_at >= ttl:
+            index = OfficeGeofenceIndex.load(version)
+            _index = index
+            logger.info(f"[GEOFENCE] Office index loaded: {len(index.offices)} active office(s)")
+    return index
+
+
+def invalidate_office_index():
+    """Force every process to reload offices on its next lookup."""
+    global _local_version
+    with _lock:
+        _local_version += 1
+    try:
+        cache.incr(VERSION_CACHE_KEY)
+    except ValueError:
+        cache.set(VERSION_CACHE_KEY, 1, None)
+    except Exception:
+        logger.exception('[GEOFENCE] Failed to bump shared office index version')
@@ -0,0 +1,198 @@
+import logging
+from datetime import date
+
+from django.db import transaction
+from django.db.models import F
+
+from HR.models import MonthlyPenaltyCache, PenaltyCacheGeneration
+from HR.utils.attendance_penalties import _get_month_bounds, calculate_monthly_penalties_bulk
+
+logger = logging.getLogger(__name__)
+
+
+# Bump whenever the rules in calculate_monthly_penalties change so stored
+# results computed by the old rules are ignored.
+PENALTY_CACHE_VERSION = 1
+
+# PenaltyCacheGeneration scope covering everything
+ALL_SCOPE = '*'
+
+
+def _user_month_scope(user_id, year, month):
+    return f'{user_id}:{year}-{month}'
+
+
+def _user_scope(user_id):
+    return f'{user_id}:*'
+
+
+def _month_scope(year, month):
+    return f'*:{year}-{month}'
+
+
+def _serialize_result(result):
+    return {
+        'per_date': {day.isoformat(): detail for day, detail in result['per_date'].items()},
+        'summary': result['summary'],
+    }
+
+
+def _deserialize_result(payload):
+    return {
+        'per_date': {date.fromisoformat(day): detail for day, detail in payload['per_date'].items()},
+        'summary': payload['summary'],
+    }
+
+
+def _current_generations(user_ids, year, month):
+    """{user_id: sum of the PenaltyCacheGeneration counters covering the user's month}"""
+    scopes = {
+        user_id: (_user_month_scope(user_id, year, month), _user_scope(user_id))
+        for user_id in user_ids
+    }
+    shared_scopes = (_month_scope(year, month), ALL_SCOPE)
+    counters = dict(
+        PenaltyCacheGeneration.objects.filter(
+            scope__in=[scope for pair in scopes.values() for scope in pair] + list(shared_scopes)
+        ).values_list('scope', 'generation')
+    )
+    shared = sum(counters.get(scope, 0) for scope in shared_scopes)
+    return {
+        user_id: shared + sum(counters.get(scope, 0) for scope in pair)
+        for user_id, pair in scopes.items()
+    }
+
+
+def _is_fresh(entry, user, period_end, generation):
+    # The open month grows by one day every day, so only today's row is valid
+    return (
+        entry.version == PENALTY_CACHE_VERSION
+        and entry.generation == generation
+        and entry.period_end == period_end
+        and entry.duty_time_start == getattr(user, 'duty_time_start', None)
+        and entry.duty_time_end == getattr(user, 'duty_time_end', None)
+    )
+
+
+def get_monthly_penalties_bulk(users, year, month):
+    """
+    Cached calculate_monthly_penalties_bulk().
+
+    Serves stored results for users whose month has not changed and computes
+    the rest in one bulk pass, storing them for the next caller. Closed months
+    stay cached until a signal invalidates them.
+
+    Each stored row records the generation read before computing, so a result
+    computed from data a concurrent writer was replacing is stale as soon as
+    that writer's bump commits.
+
+    Returns {user_id: {'per_date': ..., 'summary': ...}}.
+    """
+    users = [user for user in users if user is not None]
+    if not users:
+        return {}
+
+    _, period_end = _get_month_bounds(year, month)
+    results = {}
+
+    try:
+        # Read before computing: a bump committed later makes the stored row stale
+        generations = _current_generations([user.id for user in users], year, month)
+        entries = MonthlyPenaltyCache.objects.filter(
+            user_id__in=[user.id for user in users],
+            year=year,
+            month=month,
+        )
+        entries_by_user = {entry.user_id: entry for entry in entries}
+    except Exception:
+        logger.exception('Failed to read penalty cache for %s/%s', month, year)
+        generations = None
+        entries_by_user = {}
+
+    missing = []
+    for user in users:
+        entry = entries_by_user.get(user.id)
+        if entry and _is_fresh(entry, user, period_end, generations[user.id]):
+            results[user.id] = _deserialize_result(entry.result)
+        else:
+            missing.append(user)
+
+    if not missing:
+        return results
+
+    computed = calculate_monthly_penalties_bulk(missing, year, month)
+    results.update(computed)
+    if generations is None:
+        return results
+
+    try:
+        # Savepoint so a failed write cannot break the caller's transaction
+        with transaction.atomic():
+            MonthlyPenaltyCache.objects.bulk_create(
+                [
+                    MonthlyPenaltyCache(
+                        user=user,
+                        year=year,
+                        month=month,
+                        version=PENALTY_CACHE_VERSION,
+                        generation=generations[user.id],
+                        period_end=period_end,
+                        duty_time_start=getattr(user, 'duty_time_start', None),
+                        duty_time_end=getattr(user, 'duty_time_end', None),
+                        result=_serialize_result(computed[user.id]),
+                    )
+                    for user in missing
+                ],
+                update_conflicts=True,
+                unique_fields=['user', 'year', 'month'],
+                update_fields=['version', 'generation', 'period_end', 'duty_time_start', 'duty_time_end', 'result', 'computed_at'],
+            )
+    except Exception:
+        logger.exception('Failed to store penalty cache for %s/%s', month, year)
+
+    return results
+
+
+def get_monthly_penalties(user, year, month):
+    """Cached calculate_monthly_penalties() for a single user."""
+    return get_monthly_penalties_bulk([user], year, month)[user.id]
+
+
+def _months_between(from_date, to_date):
+    year, month = from_date.year, from_date.month
+    while (year, month) <= (to_date.year, to_date.month):
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def invalidate_penalty_cache(user_id=None, from_date=None, to_date=None):
+    """
+    Mark stored penalty results stale.
+
+    Limits to one user when `user_id` is given and to the months touched by
+    `from_date`..`to_date` when given (`to_date` defaults to `from_date`).
+    With no arguments the whole cache is invalidated.
+
+    Bumps the PenaltyCacheGeneration counters of that scope inside the
+    caller's transaction. Readers compare a row's stored generation with the
+    current one, so a result computed from the old data, even one stored
+    after this commits, is never served.
+    """
+    if from_date is None:
+        scopes = [ALL_SCOPE if user_id is None else _user_scope(user_id)]
+    else:
+        months = _months_between(from_date, to_date or from_date)
+        if user_id is None:
+            scopes = [_month_scope(year, month) for year, month in months]
+        else:
+            scopes = [_user_month_scope(user_id, year, month) for year, month in months]
+
+    try:
+        with transaction.atomic():
+            PenaltyCacheGeneration.objects.bulk_create(
+                [PenaltyCacheGeneration(scope=scope) for scope in scopes],
+                ignore_conflicts=True,
+            )
+            PenaltyCacheGeneration.objects.filter(scope__in=scopes).update(generation=F('generation') + 1)
+    except Exception:
+        logger.exception('Failed to invalidate penalty cache')
@@ -11,16 +11,23 @@ from django.conf import settings
 from master.models import LeaveMaster  # ✅ CORRECT - Import from master app
 from .models import LeaveRequest  # ✅ LeaveRequest is in HR.models
 from master.serializers import LeaveMasterCreateSerializer
-from payroll.models import AutomationRule  # For grace period configuration
 
 import calendar
 import requests
 
-from HR.utils.geofence import validate_office_geofence
-from HR.utils.attendance_penalties import calculate_monthly_penalties
+from HR.utils.geofence import check_office_geofence
+from HR.utils.geocode_cache import bucket_coordinates, reverse_geocode_cached
+from HR.utils.penalty_cache import get_monthly_penalties, get_monthly_penalties_bulk
+from payroll.rule_set import get_rule_set
+from payroll.services import EMPTY_PENALTY_COUNTS, PayrollCalculationService
+from HR.utils.attendance_grid import build_monthly_grid
+from HR.utils.attendance_summary import (
+    build_summary_row, count_sundays, get_month_calendar_counts,
+    get_monthly_summaries, get_user_monthly_counters,
+)
 from .models import (
     Attendance, Holiday, LeaveRequest, LateRequest,
-    EarlyRequest, PunchRecord
+    EarlyRequest, PunchRecord, PunchIdempotencyKey
 )
 from .serializers import (
     AttendanceSerializer, PunchInSerializer, PunchOutSerializer,
@@ -385,6 +392,48 @@ class AttendanceViewSet(viewsets.ModelViewSet):
 
         return qs.order_by('-date', '-first_punch_in_time')
 
+    def _get_idempotency_key(self, request):
+        """Client retry key from the Idempotency-Key header or request body."""
+        key = request.headers.get('Idempotency-Key') or request.data.get('idempotency_key')
+        return str(key).strip() if key else None
+
+    def _replay_punch(self, user, key, punch_type):
+        """Stored response for an already processed key, or None."""
+        stored = PunchIdempotencyKey.objects.filter(user=user, key=key).first()
+        if not stored:
+            return None
+        if stored.punch_type != punch_type:
+            return Response({
+                'error': f'Idempotency key was already used for punch {stored.punch_type}'
+            }, status=status.HTTP_409_CONFLICT)
+
+        response = Response(stored.response, status=stored.status_code)
+        response['Idempotent-Replayed'] = 'true'
+        return response
+
+    def _punch_response(self, request, attendance, punch, key, extra):
+        """
+        Serialize the attendance plus only the punch just recorded; the full
+        day's list is included only with ?include_punches=true.
+        """
+        data = AttendanceSerializer(attendance, context={'request': request}).data
+        data['punch_record'] = PunchRecordSerializer(punch).data
+        if str(request.query_params.get('include_punches', '')).lower() in ('1', 'true', 'yes'):
+            punches = attendance.punch_records.all().order_by('punch_time')
+            data['punch_records'] = PunchRecordSerializer(punches, many=True).data
+        data.update(extra)
+
+        if key:
+            PunchIdempotencyKey.objects.create(
+                user=attendance.user,
+                key=key,
+                punch_type=punch.punch_type,
+                punch_record=punch,
+                status_code=status.HTTP_200_OK,
+                response=data,
+            )
+        return Response(data, status=status.HTTP_200_OK)
+
     @action(detail=False, methods=['post'], url_path='punch_in')
     @transaction.atomic
     def punch_in(self, request):
@@ -394,6 +443,15 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         user = request.user
         today = timezone.now().date()
 
+        # Retried request: answer from the stored response without re-running
+        idempotency_key = self._get_idempotency_key(request)
+        if idempotency_key:
+            if len(idempotency_key) > 64:
+                return Response({'error': 'Idempotency key must be at most 64 characters'}, status=status.HTTP_400_BAD_REQUEST)
+            replay = self._replay_punch(user, idempotency_key, 'in')
+            if replay:
+                return replay
+
         lat = serializer.validated_data.get('latitude')
         lon = serializer.validated_data.get('longitude')
 
@@ -434,7 +492,9 @@ class AttendanceViewSet(viewsets.ModelViewSet):
 
         # ✅ VALIDATE GEOFENCE (only for in_house/office employees)
         if enforce_geofence:
-            allowed, distance = validate_office_geofence(lat, lon, user=user)
+            allowed, distance, matched_office = check_office_geofence(lat, lon, user=user)
+            # Report the office the distance was measured to (nearest one), not the primary
+            office_info = matched_office or office_info
             print(f"🎯 Geofence Result: allowed={allowed}, distance={distance}m")
         else:
             # Out-house employees don't need geofence validation
@@ -443,7 +503,7 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         print("=" * 80)
 
         if not allowed:
-            excess_distance = distance - office_info['radius']
+            excess_distance = max(0, distance - office_info['radius'])
             
             print(f"❌ PUNCH IN REJECTED!")
             print(f"Distance: {distance}m")
@@ -472,7 +532,8 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         print("=" * 80)
 
         # ✅ FIX: Explicitly set is_paid_day when creating attendance
-        attendance, created = Attendance.objects.get_or_create(
+        # Row lock serializes concurrent retries for the same user/day
+        attendance, created = Attendance.objects.select_for_update().get_or_create(
             user=user,
             date=today,
             defaults={
@@ -482,8 +543,13 @@ class AttendanceViewSet(viewsets.ModelViewSet):
             }
         )
 
-        last_punch = attendance.punch_records.order_by('-punch_time').first()
-        if last_punch and last_punch.punch_type == 'in':
+        if idempotency_key and not created:
+            # A concurrent request with the same key may have committed first
+            replay = self._replay_punch(user, idempotency_key, 'in')
+            if replay:
+                return replay
+
+        if attendance.last_punch_type == 'in':
             return Response({
                 'error': 'You are already punched in'
             }, status=status.HTTP_400_BAD_REQUEST)
@@ -498,23 +564,15 @@ class AttendanceViewSet(viewsets.ModelViewSet):
             note=serializer.validated_data.get('note', '')
         )
 
-        if not attendance.first_punch_in_time:
-            attendance.first_punch_in_time = punch.punch_time
-            attendance.first_punch_in_location = punch.location
-            attendance.first_punch_in_latitude = punch.latitude
-            attendance.first_punch_in_longitude = punch.longitude
-
+        attendance.apply_punch(punch)
         attendance.is_currently_on_break = False
         attendance.save()
 
-        punches = attendance.punch_records.order_by('punch_time')
-        data = AttendanceSerializer(attendance, context={'request': request}).data
-        data['punch_records'] = PunchRecordSerializer(punches, many=True).data
-        data['message'] = f'Punched in successfully (Distance from office: {distance:.0f}m)'
-        data['can_punch_out'] = True
-        data['distance_from_office'] = distance
-        
-        return Response(data, status=status.HTTP_200_OK)
+        return self._punch_response(request, attendance, punch, idempotency_key, {
+            'message': f'Punched in successfully (Distance from office: {distance:.0f}m)',
+            'can_punch_out': True,
+            'distance_from_office': distance,
+        })
 
 
     @action(detail=False, methods=['post'], url_path='punch_out')
@@ -526,8 +584,18 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         user = request.user
         today = timezone.now().date()
 
+        # Retried request: answer from the stored response without re-running
+        idempotency_key = self._get_idempotency_key(request)
+        if idempotency_key:
+            if len(idempotency_key) > 64:
+                return Response({'error': 'Idempotency key must be at most 64 characters'}, status=status.HTTP_400_BAD_REQUEST)
+            replay = self._replay_punch(user, idempotency_key, 'out')
+            if replay:
+                return replay
+
         try:
-            attendance = Attendance.objects.get(user=user, date=today)
+            # Row lock serializes concurrent retries for the same user/day
+            attendance = Attendance.objects.select_for_update().get(user=user, date=today)
         except Attendance.DoesNotExist:
             return Response({
                 'error': 'No punch in record for today'
@@ -538,8 +606,13 @@ class AttendanceViewSet(viewsets.ModelViewSet):
                 'error': 'You must punch in first'
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        last_punch = attendance.punch_records.order_by('-punch_time').first()
-        if last_punch and last_punch.punch_type == 'out':
+        if idempotency_key:
+            # A concurrent request with the same key may have committed first
+            replay = self._replay_punch(user, idempotency_key, 'out')
+            if replay:
+                return replay
+
+        if attendance.last_punch_type == 'out':
             return Response({
                 'error': 'You are already punched out'
             }, status=status.HTTP_400_BAD_REQUEST)
@@ -586,12 +659,14 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         # If lat/lon are provided, validate geofence only when enforcement applies
         if lat is not None and lon is not None:
             if enforce_geofence:
-                allowed, distance = validate_office_geofence(lat, lon, user=user)
+                allowed, distance, matched_office = check_office_geofence(lat, lon, user=user)
+                # Report the office the distance was measured to (nearest one), not the primary
+                office_info = matched_office or office_info
                 print(f"Geofence Result: allowed={allowed}, distance={distance}m")
                 print("=" * 80)
 
                 if not allowed:
-                    excess_distance = distance - office_info['radius']
+                    excess_distance = max(0, distance - office_info['radius'])
                     
                     print(f"❌ PUNCH OUT REJECTED!")
                     print(f"Distance: {distance}m")
@@ -638,24 +713,19 @@ class AttendanceViewSet(viewsets.ModelViewSet):
             note=serializer.validated_data.get('note', '')
         )
 
-        attendance.last_punch_out_time = punch_record.punch_time
-        attendance.last_punch_out_location = punch_record.location
-        attendance.last_punch_out_latitude = punch_record.latitude
-        attendance.last_punch_out_longitude = punch_record.longitude
-        attendance.is_currently_on_break = True
-
-        attendance.calculate_times()
+        # O(1) running totals instead of rescanning every punch of the day
+        attendance.apply_punch(punch_record)
         attendance.update_status()
         attendance.save()
 
-        punches = attendance.punch_records.all().order_by('punch_time')
-        data = AttendanceSerializer(attendance, context={'request': request}).data
-        data['punch_records'] = PunchRecordSerializer(punches, many=True).data
-        data['message'] = f'Punched out successfully (Distance from office: {distance:.0f}m)'
-        data['can_punch_out'] = False
-        data['distance_from_office'] = distance
-        
-        return Response(data, status=status.HTTP_200_OK)
+        return self._punch_response(request, attendance, punch_record, idempotency_key, {
+            'message': (
+                f'Punched out successfully (Distance from office: {distance:.0f}m)'
+                if distance is not None else 'Punched out successfully'
+            ),
+            'can_punch_out': False,
+            'distance_from_office': distance,
+        })
 
     @action(detail=False, methods=['get'], url_path='today_status')
     def today_status(self, request):
@@ -682,8 +752,10 @@ class AttendanceViewSet(viewsets.ModelViewSet):
             if month and year:
                 qs = qs.filter(date__month=month, date__year=year)
             result = []
+            # Shared context so the penalty field computes the month once
+            serializer_context = {'request': request}
             for att in qs.order_by('date', 'first_punch_in_time'):
-                d = AttendanceSerializer(att, context={'request': request}).data
+                d = AttendanceSerializer(att, context=serializer_context).data
                 punches = att.punch_records.all().order_by('punch_time')
                 d['punch_records'] = PunchRecordSerializer(punches, many=True).data
                 result.append(d)
@@ -696,18 +768,7 @@ class AttendanceViewSet(viewsets.ModelViewSet):
 
     def _count_sundays(self, year, month):
         """Count the number of Sundays in a given month"""
-        import calendar
-        from datetime import datetime
-        
-        days_in_month = calendar.monthrange(year, month)[1]
-        sundays = 0
-        
-        for day in range(1, days_in_month + 1):
-            date = datetime(year, month, day)
-            if date.weekday() == 6:  # 6 = Sunday
-                sundays += 1
-        
-        return sundays
+        return count_sundays(year, month)
 
     # ... rest of your existing methods ...
     
@@ -717,19 +778,15 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         month = int(request.query_params.get('month', timezone.now().month))
         year = int(request.query_params.get('year', timezone.now().year))
         
-        attendances = Attendance.objects.filter(user=user, date__month=month, date__year=year)
-        holidays = Holiday.objects.filter(date__month=month, date__year=year, is_active=True).count()
-        
-        sundays = self._count_sundays(year, month)
-        days_in_month = calendar.monthrange(year, month)[1]
+        days_in_month, holidays, sundays = get_month_calendar_counts(year, month)
+        counters = get_user_monthly_counters(user, year, month)
 
-        full_days = attendances.filter(status='full').count()
-        half_days = attendances.filter(status='half').count()
-        leaves = attendances.filter(status='leave').count()
-        total_working_hours = attendances.aggregate(total=Sum('total_working_hours'))['total'] or 0
-        total_break_hours = attendances.aggregate(total=Sum('total_break_hours'))['total'] or 0
-        marked_days = attendances.count()
-        not_marked = days_in_month - marked_days - holidays - sundays
+        full_days = counters['full_days']
+        half_days = counters['half_days']
+        leaves = counters['leaves']
+        total_working_hours = counters['total_working_hours']
+        total_break_hours = counters['total_break_hours']
+        not_marked = days_in_month - counters['marked_days'] - holidays - sundays
 
         return Response({
             'user_id': user.id,
@@ -785,6 +842,10 @@ class AttendanceViewSet(viewsets.ModelViewSet):
                 'last_punch_out_longitude': None,
                 'total_working_hours': 0,
                 'total_break_hours': 0,
+                'work_seconds': 0,
+                'break_seconds': 0,
+                'open_punch_in_time': None,
+                'last_punch_type': '',
                 'is_currently_on_break': False,
                 'verification_status': 'verified',
                 'verified_by': request.user,
@@ -935,9 +996,7 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         attendance.last_punch_out_location = None
         attendance.last_punch_out_latitude = None
         attendance.last_punch_out_longitude = None
-        attendance.total_working_hours = 0
-        attendance.total_break_hours = 0
-        attendance.is_currently_on_break = False
+        attendance.reset_punch_totals()
         attendance.punch_records.all().delete()
         attendance.save()
 
@@ -964,72 +1023,10 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         except AppUser.DoesNotExist:
             return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        attendances = Attendance.objects.filter(
-            user_id=user_id,
-            date__month=month,
-            date__year=year
-        )
-
-        holidays = Holiday.objects.filter(
-            date__month=month,
-            date__year=year,
-            is_active=True
-        ).count()
-
-        sundays = self._count_sundays(year, month)
-        days_in_month = calendar.monthrange(year, month)[1]
-
-        full_days_unverified = attendances.filter(
-            status='full',
-            verification_status='unverified'
-        ).count()
-
-        verified_full_days = attendances.filter(
-            status='full',
-            verification_status='verified'
-        ).count()
-
-        half_days_unverified = attendances.filter(
-            status='half',
-            verification_status='unverified'
-        ).count()
-
-        verified_half_days = attendances.filter(
-            status='half',
-            verification_status='verified'
-        ).count()
-
-        leaves = attendances.filter(status='leave').count()
-
-        total_working_hours = attendances.aggregate(
-            total=Sum('total_working_hours')
-        )['total'] or 0
-
-        total_break_hours = attendances.aggregate(
-            total=Sum('total_break_hours')
-        )['total'] or 0
-
-        marked_days = attendances.count()
-        not_marked = days_in_month - marked_days - holidays - sundays
-
-        return Response({
-            'user_id': user.id,
-            'user_name': user.name,
-            'user_email': user.email,
-            'month': month,
-            'year': year,
-            'total_days': days_in_month,
-            'full_days_unverified': full_days_unverified,
-            'verified_full_days': verified_full_days,
-            'half_days_unverified': half_days_unverified,
-            'verified_half_days': verified_half_days,
-            'leaves': leaves,
-            'not_marked': not_marked,
-            'total_working_hours': round(total_working_hours, 2),
-            'total_break_hours': round(total_break_hours, 2),
-            'holidays': holidays,
-            'sundays': sundays,
-        })
+        counters = get_user_monthly_counters(user, year, month)
+        return Response(build_summary_row(
+            user, year, month, counters, get_month_calendar_counts(year, month)
+        ))
 
     @action(detail=False, methods=['get'], url_path='summary-all')
     def summary_all(self, request):
@@ -1045,18 +1042,6 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         month = int(request.query_params.get('month', timezone.now().month))
         year = int(request.query_params.get('year', timezone.now().year))
 
-        days_in_month = calendar.monthrange(year, month)[1]
-
-        holidays_count = Holiday.objects.filter(
-            date__month=month,
-            date__year=year,
-            is_active=True
-        ).count()
-
-        sundays_count = self._count_sundays(year, month)
-
-        result = []
-
         # Only active users by default; override with ?is_active=true|false
         users = AppUser.objects.all().order_by('name')
         is_active = request.query_params.get('is_active', None)
@@ -1065,64 +1050,8 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         else:
             users = users.filter(is_active=True)
 
-        for user in users:
-            attendances = Attendance.objects.filter(
-                user=user,
-                date__month=month,
-                date__year=year
-            )
-
-            full_days_unverified = attendances.filter(
-                status='full',
-                verification_status='unverified'
-            ).count()
-
-            verified_full_days = attendances.filter(
-                status='full',
-                verification_status='verified'
-            ).count()
-
-            half_days_unverified = attendances.filter(
-                status='half',
-                verification_status='unverified'
-            ).count()
-
-            verified_half_days = attendances.filter(
-                status='half',
-                verification_status='verified'
-            ).count()
-
-            leaves = attendances.filter(status='leave').count()
-
-            total_working_hours = attendances.aggregate(
-                total=Sum('total_working_hours')
-            )['total'] or 0
-
-            total_break_hours = attendances.aggregate(
-                total=Sum('total_break_hours')
-            )['total'] or 0
-
-            marked_days = attendances.count()
-            not_marked = days_in_month - marked_days - holidays_count - sundays_count
-
-            result.append({
-                'user_id': user.id,
-                'user_name': user.name,
-                'user_email': user.email,
-                'month': month,
-                'year': year,
-                'total_days': days_in_month,
-                'full_days_unverified': full_days_unverified,
-                'verified_full_days': verified_full_days,
-                'half_days_unverified': half_days_unverified,
-                'verified_half_days': verified_half_days,
-                'leaves': leaves,
-                'not_marked': not_marked,
-                'total_working_hours': round(float(total_working_hours), 2),
-                'total_break_hours': round(float(total_break_hours), 2),
-                'holidays': holidays_count,
-                'sundays': sundays_count,
-            })
+        # One grouped query for every user instead of ~8 queries per user
+        result = get_monthly_summaries(users, year, month)
 
         return Response(result)
 
@@ -1132,7 +1061,6 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         month = int(request.query_params.get('month', timezone.now().month))
         year = int(request.query_params.get('year', timezone.now().year))
 
-        days_in_month = calendar.monthrange(year, month)[1]
         # Only active users by default; override with ?is_active=true|false
         users = AppUser.objects.all().order_by('name')
         is_active = request.query_params.get('is_active', None)
@@ -1141,70 +1069,8 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         else:
             users = users.filter(is_active=True)
 
-        holidays = set(Holiday.objects.filter(
-            date__month=month,
-            date__year=year,
-            is_active=True
-        ).values_list('date', flat=True))
-
-        result = []
-
-        for user in users:
-            attendances = Attendance.objects.filter(
-                user=user,
-                date__month=month,
-                date__year=year
-            )
-
-            attendance_dict = {att.date.day: att for att in attendances}
-            attendance_array = []
-
-            for day in range(1, days_in_month + 1):
-                current_date = datetime(year, month, day).date()
-
-                if current_date.weekday() == 6:
-                    attendance_array.append('sunday')
-                elif current_date in holidays:
-                    attendance_array.append('holiday')
-                elif day in attendance_dict:
-                    att = attendance_dict[day]
-
-                    # Recalculate if needed
-                    att.calculate_times()
-                    att.update_status()
-                    att.save()
-
-                    if not att.first_punch_in_time:
-                        attendance_array.append('not-marked')
-                    elif att.verification_status == 'verified':
-                        if att.status == 'full':
-                            attendance_array.append('verified')
-                        elif att.status == 'half':
-                            attendance_array.append('half-verified')
-                        elif att.status == 'leave':
-                            attendance_array.append('verified-leave')
-                        else:
-                            attendance_array.append('verified')
-                    else:
-                        if att.status == 'full':
-                            attendance_array.append('full')
-                        elif att.status == 'half':
-                            attendance_array.append('half')
-                        elif att.status == 'leave':
-                            attendance_array.append('leave')
-                        else:
-                            attendance_array.append('full')
-                else:
-                    attendance_array.append('not-marked')
-
-            result.append({
-                'user_id': user.id,
-                'user_name': user.name,
-                'user_email': user.email,
-                'duty_start': user.duty_time_start.strftime('%H:%M') if user.duty_time_start else '09:00',
-                'duty_end': user.duty_time_end.strftime('%H:%M') if user.duty_time_end else '18:00',
-                'attendance': attendance_array
-            })
+        # Side-effect free: stored totals are read as-is (see recompute_attendance_totals)
+        result = build_monthly_grid(users, year, month)
 
         return Response(result)
     
@@ -1307,9 +1173,7 @@ class AttendanceViewSet(viewsets.ModelViewSet):
             attendance.first_punch_in_longitude = None
             attendance.last_punch_out_latitude = None
             attendance.last_punch_out_longitude = None
-            attendance.total_working_hours = 0
-            attendance.total_break_hours = 0
-            attendance.is_currently_on_break = False
+            attendance.reset_punch_totals()
 
             # Delete all punch records
             attendance.punch_records.all().delete()
@@ -1832,7 +1696,44 @@ class EarlyRequestViewSet(viewsets.ModelViewSet):
     
 
 
-# Reverse Geocoding Functions (unchanged)
+# Reverse Geocoding Functions (cached, see HR/utils/geocode_cache.py)
+def _geocode_response(provider_name, latitude, longitude):
+    # Validated up front so provider errors are not reported as bad input
+    try:
+        bucket_coordinates(latitude, longitude)
+    except (TypeError, ValueError, ArithmeticError):
+        return Response(
+            {'error': 'Latitude and longitude must be valid numbers, latitude within ±90 and longitude within ±180'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        result = reverse_geocode_cached(provider_name, latitude, longitude)
+    except requests.exceptions.RequestException as e:
+        return Response({
+            'address': f'Lat: {latitude}, Lon: {longitude}',
+            'latitude': latitude,
+            'longitude': longitude,
+            'details': {},
+            'error': str(e)
+        })
+
+    if result:
+        return Response({
+            'address': result['address'],
+            'latitude': latitude,
+            'longitude': longitude,
+            'details': result['details']
+        })
+
+    return Response({
+        'address': f'Lat: {latitude}, Lon: {longitude}',
+        'latitude': latitude,
+        'longitude': longitude,
+        'details': {}
+    })
+
+
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
 def reverse_geocode(request):
@@ -1854,48 +1755,7 @@ def reverse_geocode(request):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    try:
-        response = requests.get(
-            f'https://nominatim.openstreetmap.org/reverse',
-            params={
-                'format': 'json',
-                'lat': latitude,
-                'lon': longitude,
-                'zoom': 18,
-                'addressdetails': 1
-            },
-            headers={
-                'User-Agent': 'AttendanceApp/1.0 (your-email@example.com)'
-            },
-            timeout=10
-        )
-
-        if response.status_code == 200:
-            data = response.json()
-            address = data.get('display_name', f'{latitude}, {longitude}')
-
-            return Response({
-                'address': address,
-                'latitude': latitude,
-                'longitude': longitude,
-                'details': data.get('address', {})
-            })
-
-        return Response({
-            'address': f'Lat: {latitude}, Lon: {longitude}',
-            'latitude': latitude,
-            'longitude': longitude,
-            'details': {}
-        })
-
-    except requests.exceptions.RequestException as e:
-        return Response({
-            'address': f'Lat: {latitude}, Lon: {longitude}',
-            'latitude': latitude,
-            'longitude': longitude,
-            'details': {},
-            'error': str(e)
-        })
+    return _geocode_response('nominatim', latitude, longitude)
 
 
 # The reverse_geocode_bigdata function is already correct with @api_view(['POST'])
@@ -1912,55 +1772,7 @@ def reverse_geocode_bigdata(request):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    try:
-        response = requests.get(
-            'https://api.bigdatacloud.net/data/reverse-geocode-client',
-            params={
-                'latitude': latitude,
-                'longitude': longitude,
-                'localityLanguage': 'en'
-            },
-            timeout=10
-        )
-
-        if response.status_code == 200:
-            data = response.json()
-            
-            # Build address from components
-            components = []
-            if data.get('locality'):
-                components.append(data['locality'])
-            if data.get('city'):
-                components.append(data['city'])
-            if data.get('principalSubdivision'):
-                components.append(data['principalSubdivision'])
-            if data.get('countryName'):
-                components.append(data['countryName'])
-            
-            address = ', '.join(components) if components else f'{latitude}, {longitude}'
-
-            return Response({
-                'address': address,
-                'latitude': latitude,
-                'longitude': longitude,
-                'details': data
-            })
-
-        return Response({
-            'address': f'Lat: {latitude}, Lon: {longitude}',
-            'latitude': latitude,
-            'longitude': longitude,
-            'details': {}
-        })
-
-    except requests.exceptions.RequestException as e:
-        return Response({
-            'address': f'Lat: {latitude}, Lon: {longitude}',
-            'latitude': latitude,
-            'longitude': longitude,
-            'details': {},
-            'error': str(e)
-        })
+    return _geocode_response('bigdatacloud', latitude, longitude)
 
 
 @action(detail=False, methods=['get'], url_path='all-details')
@@ -2625,6 +2437,16 @@ def attendance_penalty_review(request):
     start_index = (page - 1) * page_size
     end_index = start_index + page_size
     employees_for_processing = all_employees_list[start_index:end_index]
+
+    # Penalties for the whole page in one pass (served from the penalty cache when unchanged)
+    penalties_by_user = get_monthly_penalties_bulk(
+        [getattr(employee, 'user', None) for employee in employees_for_processing], year, month
+    )
+    # Rules and late/early/missed counts for the page, loaded once
+    rule_set = get_rule_set()
+    counts_by_user = PayrollCalculationService.get_penalty_counts_bulk(
+        [getattr(employee, 'user_id', None) for employee in employees_for_processing], year, month
+    )
     
     for employee in employees_for_processing:
         user = getattr(employee, 'user', None)
@@ -2635,42 +2457,40 @@ def attendance_penalty_review(request):
         if search and search not in employee_name.lower() and search not in str(getattr(employee, 'employee_id', '') or '').lower() and search not in str(getattr(user, 'email', '') or '').lower():
             continue
 
-        penalty_data = calculate_monthly_penalties(user, year, month)
+        penalty_data = penalties_by_user.get(user.id) or get_monthly_penalties(user, year, month)
         per_date = penalty_data.get('per_date', {}) or {}
         summary = penalty_data.get('summary', {}) or {}
-        try:
-            from payroll.services import PayrollCalculationService
-        except Exception:
-            PayrollCalculationService = None
+        penalty_counts = counts_by_user.get(user.id, EMPTY_PENALTY_COUNTS)
 
         base_salary = float(getattr(employee, 'basic_salary', 0) or 0)
-        if PayrollCalculationService:
-            try:
-                base_salary = float(PayrollCalculationService.get_employee_salary(employee))
-            except Exception:
-                base_salary = float(getattr(employee, 'basic_salary', 0) or 0)
+        try:
+            base_salary = float(PayrollCalculationService.get_employee_salary(employee))
+        except Exception:
+            base_salary = float(getattr(employee, 'basic_salary', 0) or 0)
 
         penalty_amount = 0.0
         deduction_breakdown = []
-        if PayrollCalculationService:
-            try:
-                # Calculate working days (default to 22 if not in summary)
-                working_days = int(summary.get('working_days', 0) or 22)
-                if working_days <= 0:
-                    working_days = 22
-                    
-                deduction_result = PayrollCalculationService.calculate_attendance_penalty_deduction(
-                    employee=employee,
-                    year=year,
-                    month_number=month,
-                    working_days=working_days,
-                    base_salary=base_salary,
-                )
-                penalty_amount = float(deduction_result.get('amount', 0) or 0)
-                deduction_breakdown = deduction_result.get('items', [])
-            except Exception:
-                penalty_amount = 0.0
-                deduction_breakdown = []
+        try:
+            # Calculate working days (default to 22 if not in summary)
+            working_days = int(summary.get('working_days', 0) or 22)
+            if working_days <= 0:
+                working_days = 22
+                
+            deduction_result = PayrollCalculationService.calculate_attendance_penalty_deduction(
+                employee=employee,
+                year=year,
+                month_number=month,
+                working_days=working_days,
+                base_salary=base_salary,
+                penalty_data=penalty_data,
+                rule_set=rule_set,
+                penalty_counts=penalty_counts,
+            )
+            penalty_amount = float(deduction_result.get('amount', 0) or 0)
+            deduction_breakdown = deduction_result.get('items', [])
+        except Exception:
+            penalty_amount = 0.0
+            deduction_breakdown = []
         amount_after_penalties = max(base_salary - penalty_amount, 0.0)
 
         # Load attendance details
@@ -2740,56 +2560,26 @@ def attendance_penalty_review(request):
         attendance_rows.sort(key=lambda item: item.get('date') or month_start)
 
         # Only count penalties that have been APPROVED for deduction (not pending or waived)
-        late_count_approved = late_requests.filter(status='approved').count()
-        early_count_approved = early_requests.filter(status='approved').count()
-        
-        # For missed punches, count only DEDUCTED ones, but only AFTER grace period exhausted
-        attendance_records = Attendance.objects.filter(
-            user=user,
-            date__year=month_start.year,
-            date__month=month_start.month
-        ).values('date', 'admin_note')
-        
-        # Get grace period for missed punch
-        missed_grace = 1  # Default
-        try:
-            rule = AutomationRule.objects.filter(rule_type='missed', is_active=True, deduction_type='Fixed Amount').first()
-            if rule:
-                missed_grace = int(rule.max_occurrences or 1)
-        except Exception:
-            pass
-        
-        # Count ALL missed and DEDUCTED separately
-        all_missed_dates = set()
-        deducted_missed_dates = set()
-        for att in attendance_records:
-            if att['admin_note']:
-                admin_lower = str(att['admin_note']).lower()
-                # Check if reviewed (deducted or waived)
-                if ('deduct' in admin_lower or 'applied' in admin_lower or 'waive' in admin_lower) and 'missed punch' in admin_lower:
-                    all_missed_dates.add(att['date'])
-                # Check if deducted
-                if ('deduct' in admin_lower or 'applied' in admin_lower) and 'missed punch' in admin_lower:
-                    deducted_missed_dates.add(att['date'])
-        
-        # Only count deductions AFTER grace reached
-        total_missed = len(all_missed_dates)
-        if total_missed > missed_grace:
-            missed_count_approved = len(deducted_missed_dates)
+        late_count_approved = penalty_counts.late_approved
+        early_count_approved = penalty_counts.early_approved
+
+        # Missed punches: count DEDUCTED ones only AFTER grace period exhausted
+        if penalty_counts.missed_reviewed > rule_set.missed_grace:
+            missed_count_approved = penalty_counts.missed_deducted
         else:
             missed_count_approved = 0
         
         # For ALL penalties (for status display)
-        late_total = late_requests.count()
-        early_total = early_requests.count()
+        late_total = penalty_counts.late_total
+        early_total = penalty_counts.early_total
         missed_total = sum(1 for item in per_date.values() if (item or {}).get('missed_punch'))
         penalty_events = late_total + early_total + missed_total
 
         # Count penalties by status for determining overall review status
         # Late and Early: tracked in LateRequest/EarlyRequest
-        pending_count = late_requests.filter(status='pending').count() + early_requests.filter(status='pending').count()
-        approved_count = late_requests.filter(status='approved').count() + early_requests.filter(status='approved').count()
-        rejected_count = late_requests.filter(status='rejected').count() + early_requests.filter(status='rejected').count()
+        pending_count = penalty_counts.late_pending + penalty_counts.early_pending
+        approved_count = penalty_counts.late_approved + penalty_counts.early_approved
+        rejected_count = penalty_counts.late_rejected + penalty_counts.early_rejected
 
         leave_penalty_days = 0
         for leave_request in unpaid_leave_requests:
@@ -2859,8 +2649,8 @@ def attendance_penalty_review(request):
             'amount_after_penalties': amount_after_penalties,
             'penalty_summary': summary,
             'attendance_details': attendance_rows,
-            'late_request_count': late_requests.count(),
-            'early_request_count': early_requests.count(),
+            'late_request_count': late_total,
+            'early_request_count': early_total,
             'pending_request_count': pending_count,
             'approved_request_count': approved_count,
             'rejected_request_count': rejected_count,
@@ -2893,40 +2683,16 @@ def attendance_penalty_review(request):
     total_pages = (total_count + page_size - 1) // page_size
     page_rows = rows  # Already paginated above
 
-    # Fetch PayrollSettings/AutomationRules for display (guard import if payroll app missing)
-    try:
-        from payroll.models import AutomationRule
-    except Exception:
-        AutomationRule = None
-
+    # PayrollSettings/AutomationRules for display
     payroll_settings = {}
-    if AutomationRule:
-        try:
-            late_rule = AutomationRule.objects.filter(rule_type='late', is_active=True).first()
-            if late_rule:
-                payroll_settings['late'] = {
-                    'amount': float(late_rule.deduction_amount or 0),
-                    'grace_period': late_rule.max_occurrences if late_rule.set_occurrences else 0,
-                    'type': late_rule.deduction_type,
-                }
-            
-            early_rule = AutomationRule.objects.filter(rule_type='early', is_active=True).first()
-            if early_rule:
-                payroll_settings['early'] = {
-                    'amount': float(early_rule.deduction_amount or 0),
-                    'grace_period': early_rule.max_occurrences if early_rule.set_occurrences else 0,
-                    'type': early_rule.deduction_type,
-                }
-            
-            missed_rule = AutomationRule.objects.filter(rule_type='missed', is_active=True).first()
-            if missed_rule:
-                payroll_settings['missed'] = {
-                    'amount': float(missed_rule.deduction_amount or 0),
-                    'grace_period': missed_rule.max_occurrences if missed_rule.set_occurrences else 0,
-                    'type': missed_rule.deduction_type,
-                }
-        except Exception:
-            pass
+    for rule_type in ('late', 'early', 'missed'):
+        rule = getattr(rule_set, rule_type)
+        if rule:
+            payroll_settings[rule_type] = {
+                'amount': float(rule.deduction_amount or 0),
+                'grace_period': rule.max_occurrences if rule.set_occurrences else 0,
+                'type': rule.deduction_type,
+            }
 
     return Response({
         'success': True,
@@ -3033,8 +2799,8 @@ def attendance_penalty_review_action(request):
                 from payroll.models import Payroll, PayrollDeduction
 
                 payrolls = Payroll.objects.filter(employee=employee.user, year=year, month=month)
+                pen = get_monthly_penalties(employee.user, year, month) if payrolls else None
                 for p in payrolls:
-                    pen = calculate_monthly_penalties(employee.user, year, month)
                     deduction_days = float(pen.get('summary', {}).get('total_deduction_days', 0) or 0)
                     if deduction_days <= 0:
                         PayrollDeduction.objects.filter(payroll=p, deduction_type='ATTENDANCE PENALTY').delete()
@@ -3042,7 +2808,7 @@ def attendance_penalty_review_action(request):
 
                     base_salary = getattr(p, 'basic_salary', None) or PayrollCalculationService.get_employee_salary(employee)
                     try:
-                        calc = PayrollCalculationService.calculate_attendance_penalty_deduction(employee.user, year, month, p.working_days or 0, base_salary)
+                        calc = PayrollCalculationService.calculate_attendance_penalty_deduction(employee.user, year, month, p.working_days or 0, base_salary, penalty_data=pen)
                         items = calc.get('items', []) if isinstance(calc, dict) else []
                     except Exception:
                         items = []
@@ -4,6 +4,7 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from django.conf import settings
 from django.db import transaction
 from .models import OfficeLocation
 from .serializers import (
@@ -61,11 +62,12 @@ class OfficeLocationViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'], url_path='set-active')
     @transaction.atomic
     def set_active(self, request, pk=None):
-        """Set this office location as active (deactivates others)"""
+        """Set this office location as active (deactivates others unless multi-office)"""
         office = self.get_object()
         
         # Deactivate all others
-        OfficeLocation.objects.exclude(pk=office.pk).update(is_active=False)
+        if not getattr(settings, 'OFFICE_GEOFENCE_MULTI_OFFICE', False):
+            OfficeLocation.objects.exclude(pk=office.pk).update(is_active=False)
         
         # Activate this one
         office.is_active = True
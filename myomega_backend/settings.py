@@ -133,6 +133,16 @@ DATABASES = {
     }
 }
 
+# DATABASE_ENGINE=sqlite3 runs against a local SQLite file instead (e.g. for
+# `manage.py benchmark_payroll` without a Postgres server)
+if os.environ.get('DATABASE_ENGINE') == 'sqlite3':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DATABASE_NAME') or BASE_DIR / 'db.sqlite3',
+        }
+    }
+
 # Custom User Model
 AUTH_USER_MODEL = 'User.AppUser'
 
@@ -189,6 +199,10 @@ if CLOUDFLARE_R2_ENABLED:
         "default": {
             "BACKEND": "myomega_backend.storage_backends.R2MediaStorage",
         },
+        # Rendered payslip cache (not publicly readable)
+        "payslips": {
+            "BACKEND": "myomega_backend.storage_backends.R2PrivateMediaStorage",
+        },
         "staticfiles": {
             "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
         },
@@ -206,6 +220,11 @@ else:
         "default": {
             "BACKEND": "django.core.files.storage.FileSystemStorage",
         },
+        # Rendered payslip cache, outside MEDIA_ROOT so it is never served directly
+        "payslips": {
+            "BACKEND": "django.core.files.storage.FileSystemStorage",
+            "OPTIONS": {"location": os.path.join(BASE_DIR, 'private_media')},
+        },
         "staticfiles": {
             "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
         },
@@ -386,6 +405,58 @@ DXING_DEFAULT_PRIORITY = int(os.getenv('DXING_DEFAULT_PRIORITY', '1'))
 # OFFICE_LONGITUDE = 76.082882
 # OFFICE_GEOFENCE_RADIUS_METERS = 250
 
+# Allow several active OfficeLocation rows (branch offices); punches are
+# accepted inside any active office's radius.
+OFFICE_GEOFENCE_MULTI_OFFICE = os.getenv('OFFICE_GEOFENCE_MULTI_OFFICE', 'false').lower() == 'true'
+
+# Active offices are kept in an in-process index; reload at least this often
+# so worker processes without a shared cache pick up office changes.
+OFFICE_GEOFENCE_INDEX_TTL_SECONDS = int(os.getenv('OFFICE_GEOFENCE_INDEX_TTL_SECONDS', '300'))
+
+# =========================
+# REVERSE GEOCODE CACHE
+# =========================
+# Coordinates are rounded to this many decimal places before lookup (4 ≈ 11 m)
+GEOCODE_CACHE_PRECISION = int(os.getenv('GEOCODE_CACHE_PRECISION', '4'))
+# Cached addresses older than this are refreshed from the provider
+GEOCODE_CACHE_TTL_SECONDS = int(os.getenv('GEOCODE_CACHE_TTL_SECONDS', str(30 * 24 * 3600)))
+# Entries kept in the per-process LRU in front of the database table
+GEOCODE_CACHE_LRU_SIZE = int(os.getenv('GEOCODE_CACHE_LRU_SIZE', '2048'))
+# Override providers by name, e.g. {'nominatim': 'myapp.fakes.geocode'}
+GEOCODE_PROVIDERS = {}
+
+# =========================
+# HOLIDAY CALENDAR
+# =========================
+# Active holidays are kept in an in-process calendar per year; reload at least
+# this often so workers without a shared cache pick up Holiday changes.
+HOLIDAY_CALENDAR_TTL_SECONDS = int(os.getenv('HOLIDAY_CALENDAR_TTL_SECONDS', '300'))
+
+# =========================
+# PAYROLL RUNS
+# =========================
+# Employees computed per chunk; each chunk is committed (and resumable) on its own
+PAYROLL_RUN_CHUNK_SIZE = int(os.getenv('PAYROLL_RUN_CHUNK_SIZE', '50'))
+# Worker processes for organization-wide runs (1 = compute in-process)
+PAYROLL_RUN_WORKERS = int(os.getenv('PAYROLL_RUN_WORKERS', str(min(4, os.cpu_count() or 1))))
+# Memoized payroll previews are dropped when their inputs change; this bounds
+# staleness for workers without a shared cache (0 disables memoization)
+PAYROLL_PREVIEW_CACHE_TTL_SECONDS = int(os.getenv('PAYROLL_PREVIEW_CACHE_TTL_SECONDS', '600'))
+# Compiled automation rules are reloaded on AutomationRule save/delete; this
+# bounds staleness for workers without a shared cache
+AUTOMATION_RULE_SET_TTL_SECONDS = int(os.getenv('AUTOMATION_RULE_SET_TTL_SECONDS', '300'))
+# Bulk payslip ZIP export (export_payslips command; the web download always
+# renders in-process): worker processes (1 = render in-process) and
+# payslips rendered per task
+PAYSLIP_EXPORT_WORKERS = int(os.getenv('PAYSLIP_EXPORT_WORKERS', str(min(4, os.cpu_count() or 1))))
+PAYSLIP_EXPORT_CHUNK_SIZE = int(os.getenv('PAYSLIP_EXPORT_CHUNK_SIZE', '25'))
+
+# =========================
+# TARGET ANALYTICS
+# =========================
+# Cached route performance summaries are dropped when route targets change;
+# this bounds staleness for bulk writes and renamed employees (0 disables caching)
+ROUTE_ANALYTICS_CACHE_TTL_SECONDS = int(os.getenv('ROUTE_ANALYTICS_CACHE_TTL_SECONDS', '300'))
 
 
 LOGGING = {
@@ -26,6 +26,17 @@ class R2MediaStorage(S3Boto3Storage):
         return settings.CLOUDFLARE_R2_ENDPOINT
 
 
+class R2PrivateMediaStorage(R2MediaStorage):
+    """
+    Cloudflare R2 storage for files that must not be publicly readable
+    (e.g. cached payslips); served only through the API.
+    """
+    location = 'private'
+    default_acl = 'private'
+    custom_domain = None
+    querystring_auth = True
+
+
 class R2StaticStorage(S3Boto3Storage):
     """
     Cloudflare R2 storage backend for static files.
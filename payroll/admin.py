@@ -2,7 +2,7 @@ from django.contrib import admin
 
 # Register your models here.
 from django.contrib import admin
-from .models import Payroll, PayrollDeduction, PayrollAllowance, AutomationRule
+from .models import Payroll, PayrollDeduction, PayrollAllowance, AutomationRule, PayrollRun
 
 @admin.register(Payroll)
 class PayrollAdmin(admin.ModelAdmin):
@@ -47,4 +47,11 @@ class AutomationRuleAdmin(admin.ModelAdmin):
             'fields': ('created_at', 'updated_at', 'created_by'),
             'classes': ('collapse',)
         }),
-    )
\ No newline at end of file
+    )
+
+
+@admin.register(PayrollRun)
+class PayrollRunAdmin(admin.ModelAdmin):
+    list_display = ['month', 'year', 'status', 'processed_count', 'total_employees', 'error_count', 'created_at']
+    list_filter = ['status', 'month', 'year']
+    readonly_fields = ['processed_employee_ids', 'errors', 'started_at', 'finished_at', 'created_at', 'updated_at']
@@ -0,0 +1,347 @@
+# payroll/benchmark.py
+"""
+Synthetic-organization benchmarks for the payroll and penalty hot paths.
+
+build_synthetic_org() fills the current database with a reproducible
+organization (employees × months of attendance, punches, leaves, late/early
+requests, penalty decisions, holidays and automation rules);
+run_benchmarks() then times each hot path and counts its queries.
+
+The benchmark_payroll command runs both inside a throwaway test database,
+so results from different commits (same options, same seed) are comparable.
+"""
+
+import random
+import statistics
+import subprocess
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from payroll.services import PayrollCalculationService
+
+EMAIL_DOMAIN = 'bench.invalid'
+DUTY_START = dt_time(9, 0)
+DUTY_END = dt_time(18, 0)
+BULK_BATCH_SIZE = 2000
+
+BENCHMARKS = (
+    'employee_payroll_data',
+    'attendance_penalty_deduction',
+    'attendance_penalty_review',
+    'all_employees_attendance_summary',
+    'payroll_run',
+)
+
+
+def benchmark_periods(months, today=None):
+    """The `months` complete months before `today`, oldest first, as (year, month)."""
+    first = (today or timezone.localdate()).replace(day=1)
+    periods = []
+    for _ in range(months):
+        first = (first - timedelta(days=1)).replace(day=1)
+        periods.append((first.year, first.month))
+    return periods[::-1]
+
+
+def _aware(day, clock, minutes=0):
+    return timezone.make_aware(datetime.combine(day, clock) + timedelta(minutes=minutes))
+
+
+def build_synthetic_org(employees=200, months=3, departments=8, seed=42):
+    """
+    Create the synthetic organization and return its periods.
+
+    Per working day an employee is mostly present (full/half/WFH with punches
+    that are sometimes late, early or missing a punch-out), sometimes on
+    approved leave and occasionally not marked at all. Late/early days get a
+    LateRequest/EarlyRequest and missed punch-outs a PenaltyDecision.
+    """
+    from cv_management.models import Department
+    from employee_management.models import Employee
+    from HR.models import (
+        Attendance, EarlyRequest, Holiday, LateRequest, LeaveRequest, PenaltyDecision, PunchRecord,
+    )
+    from master.models import LeaveMaster
+    from payroll.models import AutomationRule
+    from User.models import AppUser
+
+    rng = random.Random(seed)
+    periods = benchmark_periods(months)
+
+    leave_masters = [
+        LeaveMaster.objects.create(leave_name=f'Bench {category}', category=category, payment_status='paid')
+        for category in ('casual', 'sick', 'special')
+    ]
+    AutomationRule.objects.create(
+        rule_type='late', rule_name='Bench late', deduct_salary=True, deduction_type='Fixed Amount',
+        deduction_amount=Decimal('200.00'), set_occurrences=True, max_occurrences=3,
+    )
+    AutomationRule.objects.create(
+        rule_type='early', rule_name='Bench early', deduct_salary=True, deduction_type='Half Day',
+        set_occurrences=True, max_occurrences=2,
+    )
+    AutomationRule.objects.create(
+        rule_type='missed', rule_name='Bench missed', deduct_salary=True, deduction_type='Fixed Amount',
+        deduction_amount=Decimal('150.00'), set_occurrences=True, max_occurrences=1,
+    )
+
+    holidays = set()
+    for index, (year, month) in enumerate(periods):
+        day = date(year, month, 15)
+        if day.weekday() == 6:
+            day += timedelta(days=1)
+        Holiday.objects.create(
+            name=f'Bench holiday {year}-{month:02d}', date=day,
+            holiday_type='mandatory' if index % 2 == 0 else 'special',
+        )
+        holidays.add(day)
+
+    department_rows = Department.objects.bulk_create([
+        Department(name=f'Bench department {index + 1}') for index in range(departments)
+    ])
+    AppUser.objects.bulk_create([
+        AppUser(email=f'bench{index}@{EMAIL_DOMAIN}', name=f'Bench Employee {index}',
+                duty_time_start=DUTY_START, duty_time_end=DUTY_END)
+        for index in range(employees)
+    ], batch_size=BULK_BATCH_SIZE)
+    users = list(AppUser.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}').order_by('id'))
+    Employee.objects.bulk_create([
+        Employee(user=user, employee_id=f'BENCH{index:06d}', full_name=user.name,
+                 basic_salary=Decimal(rng.randrange(15000, 120000, 500)))
+        for index, user in enumerate(users)
+    ], batch_size=BULK_BATCH_SIZE)
+    employee_rows = list(Employee.objects.filter(employee_id__startswith='BENCH').order_by('id'))
+    membership = Employee.department.through
+    membership.objects.bulk_create([
+        membership(employee_id=employee.id, department_id=rng.choice(department_rows).id)
+        for employee in employee_rows
+    ], batch_size=BULK_BATCH_SIZE)
+
+    working_days = []
+    for year, month in periods:
+        day = date(year, month, 1)
+        while day.month == month:
+            if day.weekday() != 6 and day not in holidays:
+                working_days.append(day)
+            day += timedelta(days=1)
+
+    attendances, punches, leaves, lates, earlies, decisions = [], [], [], [], [], []
+    for user in users:
+        for day in working_days:
+            roll = rng.random()
+            if roll < 0.04:
+                continue  # not marked
+            if roll < 0.09:
+                leave_master = rng.choice(leave_masters)
+                attendances.append(Attendance(
+                    user=user, date=day, status='leave', is_leave=True, leave_master=leave_master,
+                    is_paid_day=True, verification_status='verified',
+                ))
+                leaves.append(LeaveRequest(
+                    user=user, leave_master=leave_master, from_date=day, to_date=day,
+                    reason='Benchmark leave', status='approved',
+                ))
+                continue
+
+            status = 'half' if roll < 0.13 else 'wfh' if roll < 0.18 else 'full'
+            late_roll = rng.random()
+            if late_roll < 0.80:
+                late_by = -rng.randint(0, 10)
+            elif late_roll < 0.92:
+                late_by = rng.randint(1, 15)
+            elif late_roll < 0.97:
+                late_by = rng.randint(16, 45)
+            else:
+                late_by = rng.randint(61, 90)
+            out_roll = rng.random()
+            punch_in = _aware(day, DUTY_START, late_by)
+            punch_out = None
+            early_by = 0
+            if out_roll < 0.90:
+                punch_out = _aware(day, DUTY_END, rng.randint(0, 30))
+            elif out_roll < 0.97:
+                early_by = rng.randint(5, 40)
+                punch_out = _aware(day, DUTY_END, -early_by)
+
+            hours = Decimal(str(round((punch_out - punch_in).total_seconds() / 3600, 2))) if punch_out else Decimal('0.00')
+            attendances.append(Attendance(
+                user=user, date=day, status=status, verification_status='verified',
+                first_punch_in_time=punch_in, last_punch_out_time=punch_out,
+                total_working_hours=hours, is_paid_day=True,
+                open_punch_in_time=None if punch_out else punch_in,
+                last_punch_type='out' if punch_out else 'in',
+            ))
+            punches.append((user.id, day, 'in', punch_in))
+            if punch_out:
+                punches.append((user.id, day, 'out', punch_out))
+            else:
+                decisions.append(PenaltyDecision(
+                    user=user, date=day, penalty_type='missed', action=rng.choice(('deduct', 'waive')),
+                ))
+            if late_by > 0:
+                lates.append(LateRequest(
+                    user=user, date=day, late_by_minutes=min(late_by, 240), reason='Benchmark',
+                    status=rng.choice(('approved', 'approved', 'rejected', 'pending')),
+                ))
+            if early_by:
+                earlies.append(EarlyRequest(
+                    user=user, date=day, early_by_minutes=early_by, reason='Benchmark',
+                    status=rng.choice(('approved', 'approved', 'rejected', 'pending')),
+                ))
+
+    Attendance.objects.bulk_create(attendances, batch_size=BULK_BATCH_SIZE)
+    LeaveRequest.objects.bulk_create(leaves, batch_size=BULK_BATCH_SIZE)
+    LateRequest.objects.bulk_create(lates, batch_size=BULK_BATCH_SIZE)
+    EarlyRequest.objects.bulk_create(earlies, batch_size=BULK_BATCH_SIZE)
+    PenaltyDecision.objects.bulk_create(decisions, batch_size=BULK_BATCH_SIZE)
+
+    attendance_ids = {
+        (user_id, day): attendance_id
+        for attendance_id, user_id, day in Attendance.objects.filter(
+            user__email__endswith=f'@{EMAIL_DOMAIN}'
+        ).values_list('id', 'user_id', 'date')
+    }
+    PunchRecord.objects.bulk_create([
+        PunchRecord(attendance_id=attendance_ids[(user_id, day)], punch_type=punch_type, punch_time=punch_time)
+        for user_id, day, punch_type, punch_time in punches
+    ], batch_size=BULK_BATCH_SIZE)
+
+    return periods
+
+
+def _measure(calls):
+    """Run each zero-argument callable once; wall time (ms) and queries per call."""
+    timings = []
+    queries = []
+    for call in calls:
+        # The log is a bounded deque; a full one would make every count zero
+        connection.queries_log.clear()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            call()
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(len(captured.captured_queries))
+    ordered = sorted(timings)
+    return {
+        'calls': len(timings),
+        'first_ms': round(timings[0], 2),
+        'mean_ms': round(statistics.fmean(timings), 2),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+        'total_ms': round(sum(timings), 2),
+        'queries_per_call': round(statistics.fmean(queries), 2),
+        'max_queries': max(queries),
+    }
+
+
+def _api_get(view, path, params, user=None):
+    from rest_framework.test import APIRequestFactory, force_authenticate
+
+    def call():
+        request = APIRequestFactory().get(path, params)
+        if user is not None:
+            force_authenticate(request, user=user)
+        response = view(request)
+        if response.status_code != 200:
+            raise RuntimeError(f'{path} returned {response.status_code}')
+    return call
+
+
+def run_benchmarks(periods, sample=25, repeat=3, only=None, seed=42):
+    """
+    Time each hot path over the synthetic organization.
+
+    Per-employee paths run for `sample` employees in every period; endpoint
+    paths run `repeat` times for the last period (the first call is cold,
+    later ones may be served from caches). The payroll run covers every
+    employee for the last period, in-process.
+    """
+    from employee_management.models import Employee
+    from HR.views import attendance_penalty_review
+    from payroll.payroll_run import execute_payroll_run, get_or_create_payroll_run
+    from payroll.views import get_all_employees_attendance_summary
+    from User.models import AppUser
+
+    rng = random.Random(seed)
+    employees = list(Employee.objects.filter(employee_id__startswith='BENCH').select_related('user').order_by('id'))
+    sampled = rng.sample(employees, min(sample, len(employees)))
+    year, month = periods[-1]
+    month_name = date(year, month, 1).strftime('%B')
+    admin = AppUser.objects.filter(email=f'admin@{EMAIL_DOMAIN}').first() or AppUser.objects.create(
+        email=f'admin@{EMAIL_DOMAIN}', name='Bench Admin', is_staff=True, is_superuser=True,
+    )
+
+    benchmarks = {
+        'employee_payroll_data': lambda: [
+            (lambda e=employee, y=y, m=m: PayrollCalculationService.calculate_employee_payroll_data(e, y, m))
+            for y, m in periods for employee in sampled
+        ],
+        'attendance_penalty_deduction': lambda: [
+            (lambda e=employee, y=y, m=m: PayrollCalculationService.calculate_attendance_penalty_deduction(
+                e, y, m, working_days=26, base_salary=e.basic_salary or Decimal('0.00')))
+            for y, m in periods for employee in sampled
+        ],
+        'attendance_penalty_review': lambda: [
+            _api_get(attendance_penalty_review, '/api/hr/penalty-review/',
+                     {'month': month, 'year': year, 'page_size': 100})
+        ] * repeat,
+        'all_employees_attendance_summary': lambda: [
+            _api_get(get_all_employees_attendance_summary, '/api/payroll/attendance-summaries/all/',
+                     {'month': month_name, 'year': year}, user=admin)
+        ] * repeat,
+        'payroll_run': lambda: [
+            lambda: execute_payroll_run(get_or_create_payroll_run(month_name, year, workers=1)[0], workers=1)
+        ],
+    }
+
+    results = {}
+    for name in BENCHMARKS:
+        if only and name not in only:
+            continue
+        results[name] = _measure(benchmarks[name]())
+    if 'payroll_run' in results:
+        results['payroll_run']['per_employee_ms'] = round(results['payroll_run']['total_ms'] / max(len(employees), 1), 2)
+    return results
+
+
+def benchmark_metadata(options):
+    """Commit, database and options that identify a result set."""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except Exception:
+        commit = None
+    return {
+        'commit': commit,
+        'database': connection.vendor,
+        'created_at': timezone.now().isoformat(),
+        'options': options,
+    }
+
+
+def compare_results(baseline, current, threshold=20.0):
+    """
+    Rows of (name, metric, baseline, current, change %, regressed) for the
+    benchmarks present in both. Wall time regresses when it grows by more
+    than `threshold` percent; query counts regress on any increase.
+    """
+    rows = []
+    for name, result in current.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        for metric in ('mean_ms', 'queries_per_call'):
+            old, new = before.get(metric), result.get(metric)
+            if old is None or new is None:
+                continue
+            change = ((new - old) / old * 100) if old else (0.0 if new == old else 100.0)
+            regressed = change > threshold if metric == 'mean_ms' else new > old
+            rows.append((name, metric, old, new, round(change, 1), regressed))
+    return rows
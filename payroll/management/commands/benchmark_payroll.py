@@ -0,0 +1,130 @@
+# payroll/management/commands/benchmark_payroll.py
+"""
+Management command to benchmark the payroll and penalty hot paths on a
+synthetic organization.
+
+Runs in a throwaway test database (test_<DATABASE_NAME> on Postgres, an
+in-memory database with DATABASE_ENGINE=sqlite3), so real data is never
+touched. Save results with --output and compare a later commit against
+them with --compare; use the same options and seed for both.
+
+Usage: python manage.py benchmark_payroll --employees 500 --months 3 --output before.json
+       python manage.py benchmark_payroll --employees 500 --months 3 --compare before.json
+"""
+
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from payroll.benchmark import (
+    BENCHMARKS, benchmark_metadata, build_synthetic_org, compare_results, run_benchmarks,
+)
+
+# Options that change the results; compare only runs that agree on them
+RESULT_OPTIONS = ('employees', 'months', 'departments', 'sample', 'repeat', 'seed', 'only')
+
+
+class Command(BaseCommand):
+    help = 'Benchmark payroll and penalty hot paths on a synthetic organization'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=200, help='Synthetic employees (default: 200)')
+        parser.add_argument('--months', type=int, default=3, help='Months of attendance (default: 3)')
+        parser.add_argument('--departments', type=int, default=8, help='Departments (default: 8)')
+        parser.add_argument('--sample', type=int, default=25,
+                            help='Employees timed per month by the per-employee benchmarks (default: 25)')
+        parser.add_argument('--repeat', type=int, default=3, help='Calls per endpoint benchmark (default: 3)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+        parser.add_argument('--only', nargs='+', choices=BENCHMARKS, help='Run only these benchmarks')
+        parser.add_argument('--output', type=str, help='Write results as JSON to this file')
+        parser.add_argument('--compare', type=str, help='Compare against results written earlier with --output')
+        parser.add_argument('--threshold', type=float, default=20.0,
+                            help='Wall-time increase (%%) reported as a regression (default: 20)')
+        parser.add_argument('--fail-on-regression', action='store_true', help='Exit with an error on regressions')
+        parser.add_argument('--keepdb', action='store_true', help='Keep the test database afterwards')
+
+    def handle(self, *args, **options):
+        if options['employees'] < 1 or options['months'] < 1:
+            raise CommandError('--employees and --months must be at least 1')
+
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as handle:
+                    baseline = json.load(handle)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Cannot read {options["compare"]}: {e}')
+
+        old_name = connection.settings_dict['NAME']
+        # Tables straight from the current models: faster than replaying every
+        # migration, and independent of backend-specific migration history
+        connection.settings_dict.setdefault('TEST', {})['MIGRATE'] = False
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'], serialize=False)
+        try:
+            results, metadata = self._run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+
+        self._report(results)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump({**metadata, 'results': results}, handle, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'✓ Results written to {options["output"]}'))
+        if baseline is not None:
+            self._compare(baseline, results, options)
+
+    def _run(self, options):
+        config = {key: options[key] for key in RESULT_OPTIONS}
+        self.stdout.write(
+            f'Building synthetic organization on {connection.vendor}: '
+            f'{options["employees"]} employee(s) × {options["months"]} month(s)...'
+        )
+        started = time.perf_counter()
+        periods = build_synthetic_org(
+            employees=options['employees'], months=options['months'],
+            departments=options['departments'], seed=options['seed'],
+        )
+        self.stdout.write(f'  built in {time.perf_counter() - started:.1f}s')
+
+        results = run_benchmarks(
+            periods, sample=options['sample'], repeat=options['repeat'],
+            only=options['only'], seed=options['seed'],
+        )
+        return results, benchmark_metadata(config)
+
+    def _report(self, results):
+        self.stdout.write(f'\n{"benchmark":<34}{"calls":>6}{"first ms":>11}{"mean ms":>11}{"p95 ms":>11}{"queries":>9}')
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<34}{result["calls"]:>6}{result["first_ms"]:>11.1f}{result["mean_ms"]:>11.1f}'
+                f'{result["p95_ms"]:>11.1f}{result["queries_per_call"]:>9.1f}'
+            )
+        if 'payroll_run' in results:
+            self.stdout.write(f'  payroll run: {results["payroll_run"]["per_employee_ms"]:.1f} ms per employee')
+        self.stdout.write(self.style.SUCCESS(f'\n✓ {len(results)} benchmark(s) completed'))
+
+    def _compare(self, baseline, results, options):
+        options_before = baseline.get('options') or {}
+        for key in RESULT_OPTIONS:
+            if options_before.get(key) != options[key]:
+                self.stdout.write(self.style.WARNING(
+                    f'  ⚠ --{key} differs from the baseline ({options_before.get(key)} vs {options[key]})'
+                ))
+
+        self.stdout.write(f'\nCompared with {baseline.get("commit") or "baseline"} ({baseline.get("database")}):')
+        regressions = 0
+        for name, metric, old, new, change, regressed in compare_results(
+            baseline.get('results') or {}, results, options['threshold']
+        ):
+            line = f'  {name:<34}{metric:<18}{old:>10}{new:>10}{change:>+9.1f}%'
+            if regressed:
+                regressions += 1
+                self.stdout.write(self.style.WARNING(f'{line}  ⚠ regression'))
+            else:
+                self.stdout.write(line)
+
+        if regressions and options['fail_on_regression']:
+            raise CommandError(f'{regressions} regression(s) against {options["compare"]}')
+        self.stdout.write(self.style.SUCCESS(f'✓ {regressions} regression(s)'))
@@ -0,0 +1,48 @@
+# payroll/management/commands/export_payslips.py
+"""
+Management command to render every payslip of a month into one ZIP file.
+
+Usage: python manage.py export_payslips --month November --year 2025 --output payslips.zip
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from payroll.payslip_export import payroll_ids_for_month, stream_payslip_zip
+
+
+class Command(BaseCommand):
+    help = 'Render all payslips for a month into a ZIP file using a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', type=str, required=True, help='Month name, e.g. "November"')
+        parser.add_argument('--year', type=int, required=True, help='Year')
+        parser.add_argument('--output', type=str, help='ZIP path (default: payslips_<month>_<year>.zip)')
+        parser.add_argument('--employee-ids', type=str, help='Comma-separated employee ids (default: all)')
+        parser.add_argument('--workers', type=int, help='Worker processes (default: PAYSLIP_EXPORT_WORKERS)')
+        parser.add_argument('--chunk-size', type=int, help='Payslips per task (default: PAYSLIP_EXPORT_CHUNK_SIZE)')
+
+    def handle(self, *args, **options):
+        month, year = options['month'], options['year']
+        try:
+            employee_ids = [int(value) for value in (options['employee_ids'] or '').split(',') if value.strip()]
+        except ValueError:
+            raise CommandError('--employee-ids must be comma-separated numbers')
+
+        payroll_ids = payroll_ids_for_month(month, year, employee_ids)
+        if not payroll_ids:
+            raise CommandError(f'No payrolls found for {month} {year}')
+
+        output = options['output'] or f'payslips_{month}_{year}.zip'
+        self.stdout.write(self.style.SUCCESS(f'Rendering {len(payroll_ids)} payslip(s) for {month} {year}...'))
+
+        started = time.monotonic()
+        with open(output, 'wb') as zip_file:
+            for data in stream_payslip_zip(payroll_ids, workers=options['workers'], chunk_size=options['chunk_size']):
+                zip_file.write(data)
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Wrote {len(payroll_ids)} payslip(s) to {output} in {elapsed:.1f}s '
+            f'({len(payroll_ids) / elapsed if elapsed else 0:.0f}/s)'
+        ))
@@ -0,0 +1,25 @@
+# payroll/management/commands/rebuild_payroll_statistics.py
+"""
+Management command to recompute the maintained payroll statistics.
+
+Statistics are updated incrementally on every Payroll/item write; run this
+to repair them after raw SQL changes or queryset.update() calls that bypass
+the signals.
+
+Usage: python manage.py rebuild_payroll_statistics
+"""
+
+from django.core.management.base import BaseCommand
+from payroll.statistics import get_payroll_statistics, rebuild_payroll_statistics
+
+
+class Command(BaseCommand):
+    help = 'Recompute PayrollStatistic rows from Payroll, PayrollAllowance and PayrollDeduction'
+
+    def handle(self, *args, **options):
+        rows = rebuild_payroll_statistics()
+        summary, months, employee_ids = get_payroll_statistics()
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Rebuilt {rows} statistic(s): {summary['payroll_count']} payroll(s), "
+            f"{len(months)} month(s), {len(employee_ids)} employee(s)"
+        ))
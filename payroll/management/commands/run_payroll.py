@@ -0,0 +1,116 @@
+# payroll/management/commands/run_payroll.py
+"""
+Management command to generate payroll for every active employee of a month.
+
+Resumes the latest unfinished run for the month (e.g. after a crash) unless
+--new is given. Defaults to the previous month. --queued executes the runs
+queued through POST /api/payroll/runs/ instead (schedule it from cron).
+
+A run is claimed before any work, so a second process refuses to execute a
+run that is already running; --force takes over a run left 'running' by a
+killed process.
+
+Usage: python manage.py run_payroll --month November --year 2025 --workers 4
+       python manage.py run_payroll --queued
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from payroll.models import PayrollRun
+from payroll.payroll_run import (
+    PayrollRunConflict, create_payroll_run, execute_payroll_run, get_or_create_payroll_run,
+    supersede_payroll_runs,
+)
+from payroll.services import PayrollCalculationService
+
+
+class Command(BaseCommand):
+    help = 'Generate (or resume) the organization-wide payroll run for a month'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', type=str, help='Month name, e.g. "November" (default: last month)')
+        parser.add_argument('--year', type=int, help='Year (default: year of last month)')
+        parser.add_argument('--workers', type=int, help='Worker processes (default: PAYROLL_RUN_WORKERS)')
+        parser.add_argument('--chunk-size', type=int, help='Employees per chunk (default: PAYROLL_RUN_CHUNK_SIZE)')
+        parser.add_argument('--run-id', type=int, help='Resume this PayrollRun')
+        parser.add_argument('--new', action='store_true', help='Start a fresh run instead of resuming')
+        parser.add_argument('--queued', action='store_true', help='Execute every run queued through the API')
+        parser.add_argument('--force', action='store_true', help='Take over a run left running by a killed process')
+        parser.add_argument('--skip-errors', action='store_true', help='Do not retry employees that failed before')
+
+    def handle(self, *args, **options):
+        if options['queued']:
+            runs = list(PayrollRun.objects.filter(status='pending').order_by('created_at'))
+            if not runs:
+                self.stdout.write('No queued payroll runs')
+            for run in runs:
+                try:
+                    self._execute(run, options, 'Starting queued')
+                except PayrollRunConflict as e:
+                    # Picked up by a concurrent invocation
+                    self.stdout.write(self.style.WARNING(f'  ⚠ {e}'))
+            return
+
+        if options['run_id']:
+            try:
+                run = PayrollRun.objects.get(id=options['run_id'])
+            except PayrollRun.DoesNotExist:
+                raise CommandError(f'PayrollRun {options["run_id"]} not found')
+            created = False
+        else:
+            month, year = self._period(options)
+            if options['new']:
+                try:
+                    supersede_payroll_runs(month, year)
+                except PayrollRunConflict as e:
+                    raise CommandError(str(e))
+                run = create_payroll_run(
+                    month, year, chunk_size=options['chunk_size'], workers=options['workers'],
+                )
+                created = True
+            else:
+                run, created = get_or_create_payroll_run(
+                    month, year,
+                    chunk_size=options['chunk_size'],
+                    workers=options['workers'],
+                )
+
+        try:
+            self._execute(run, options, 'Starting' if created else 'Resuming')
+        except PayrollRunConflict as e:
+            raise CommandError(f'{e}; use --force if its process was killed')
+
+    def _execute(self, run, options, action):
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} payroll run #{run.id} for {run.month} {run.year} '
+            f'({len(run.processed_employee_ids)} employee(s) already done)...'
+        ))
+
+        def progress(run):
+            self.stdout.write(f'  {run.processed_count}/{run.total_employees} processed, {run.error_count} error(s)')
+
+        run = execute_payroll_run(
+            run,
+            workers=options['workers'],
+            chunk_size=options['chunk_size'],
+            retry_errors=not options['skip_errors'],
+            progress=progress,
+            force=options['force'],
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\n✓ Payroll run #{run.id}: {run.success_count} payroll(s) generated for {run.month} {run.year}'
+        ))
+        for employee_id, message in run.errors.items():
+            self.stdout.write(self.style.WARNING(f'  ⚠ Employee {employee_id}: {message}'))
+
+    def _period(self, options):
+        today = timezone.localdate()
+        last_month = today.replace(day=1) - timedelta(days=1)
+        month = options['month'] or last_month.strftime('%B')
+        year = options['year'] or last_month.year
+        if month not in PayrollCalculationService.MONTH_NAME_TO_NUMBER:
+            raise CommandError(f'Invalid month name: {month}. Use full month names like "November"')
+        return month, year
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payroll', '0005_update_automation_rules'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayrollRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.CharField(max_length=20)),
+                ('year', models.IntegerField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('completed_with_errors', 'Completed with errors'), ('failed', 'Failed')], default='pending', max_length=25)),
+                ('total_employees', models.IntegerField(default=0)),
+                ('processed_count', models.IntegerField(default=0)),
+                ('success_count', models.IntegerField(default=0)),
+                ('error_count', models.IntegerField(default=0)),
+                ('processed_employee_ids', models.JSONField(blank=True, default=list)),
+                ('errors', models.JSONField(blank=True, default=dict)),
+                ('last_error', models.TextField(blank=True)),
+                ('chunk_size', models.IntegerField(default=50)),
+                ('workers', models.IntegerField(default=1)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='created_payroll_runs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'payroll_payrollrun',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['year', 'month', 'status'], name='payroll_run_period_idx')],
+            },
+        ),
+    ]
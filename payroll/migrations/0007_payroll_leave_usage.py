@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payroll', '0006_payrollrun'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payroll',
+            name='leave_usage',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:52
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def seed_payroll_statistics(apps, schema_editor):
+    """Initial statistics from existing payrolls (same keys as rebuild_payroll_statistics)"""
+    Payroll = apps.get_model('payroll', 'Payroll')
+    PayrollAllowance = apps.get_model('payroll', 'PayrollAllowance')
+    PayrollDeduction = apps.get_model('payroll', 'PayrollDeduction')
+    PayrollStatistic = apps.get_model('payroll', 'PayrollStatistic')
+
+    payrolls = Payroll.objects.order_by()
+    totals = payrolls.aggregate(count=Count('id'), allowances=Sum('allowances'), deductions=Sum('deductions'))
+    stats = {
+        'payrolls': (totals['count'], Decimal('0.00')),
+        'payroll_allowances': (0, totals['allowances'] or Decimal('0.00')),
+        'payroll_deductions': (0, totals['deductions'] or Decimal('0.00')),
+    }
+    for field, prefix in (('status', 'status'), ('month', 'month'), ('employee_id', 'employee')):
+        for value, count in payrolls.values(field).annotate(count=Count('id')).values_list(field, 'count'):
+            stats[f'{prefix}:{value}'] = (count, Decimal('0.00'))
+    for model, key in ((PayrollAllowance, 'allowance_items'), (PayrollDeduction, 'deduction_items')):
+        items = model.objects.aggregate(count=Count('id'), amount=Sum('amount'))
+        stats[key] = (items['count'], items['amount'] or Decimal('0.00'))
+
+    PayrollStatistic.objects.bulk_create([
+        PayrollStatistic(key=key, count=count, amount=amount)
+        for key, (count, amount) in stats.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payroll', '0007_payroll_leave_usage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayrollStatistic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('count', models.BigIntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=18)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'payroll_statistic',
+            },
+        ),
+        migrations.RunPython(seed_payroll_statistics, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payroll', '0008_payroll_statistic'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='payrollrun',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('completed_with_errors', 'Completed with errors'), ('failed', 'Failed'), ('superseded', 'Superseded')], default='pending', max_length=25),
+        ),
+    ]
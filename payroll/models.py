@@ -45,6 +45,10 @@ class Payroll(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
     paid_date = models.DateField(null=True, blank=True)
 
+    # Leave usage committed to EmployeeLeaveBalance when this payroll was finalized
+    # (this_month_usage of the calculation), so re-finalizing applies only the difference
+    leave_usage = models.JSONField(default=dict, blank=True)
+
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -236,3 +240,87 @@ class AutomationRule(models.Model):
         if self.threshold_hours == 0 and self.threshold_minutes == 0:
             return "No threshold"
         return f"{self.threshold_hours:02d}:{self.threshold_minutes:02d}"
+
+
+class PayrollRun(models.Model):
+    """
+    One organization-wide payroll run for a month.
+
+    Employees are processed in chunks; every committed chunk records its
+    employees in `processed_employee_ids` (and failures in `errors`), so a
+    crashed or interrupted run resumes where it stopped.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('completed_with_errors', 'Completed with errors'),
+        ('failed', 'Failed'),
+        ('superseded', 'Superseded'),
+    ]
+
+    month = models.CharField(max_length=20)  # e.g., "November"
+    year = models.IntegerField()
+    status = models.CharField(max_length=25, choices=STATUS_CHOICES, default='pending')
+
+    # Progress
+    total_employees = models.IntegerField(default=0)
+    processed_count = models.IntegerField(default=0)
+    success_count = models.IntegerField(default=0)
+    error_count = models.IntegerField(default=0)
+    processed_employee_ids = models.JSONField(default=list, blank=True)
+    errors = models.JSONField(default=dict, blank=True)  # {employee_id: message}
+    last_error = models.TextField(blank=True)
+
+    # Execution settings
+    chunk_size = models.IntegerField(default=50)
+    workers = models.IntegerField(default=1)
+
+    # Metadata
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='created_payroll_runs'
+    )
+
+    class Meta:
+        ordering = ['-created_at']
+        db_table = 'payroll_payrollrun'
+        indexes = [
+            models.Index(fields=['year', 'month', 'status'], name='payroll_run_period_idx'),
+        ]
+
+    def __str__(self):
+        return f"Payroll run {self.month} {self.year} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in ('completed', 'completed_with_errors')
+
+
+class PayrollStatistic(models.Model):
+    """
+    One maintained counter behind the payroll settings summary.
+
+    Keys are 'payrolls', 'status:<status>', 'month:<month>',
+    'employee:<employee_id>', 'payroll_allowances', 'payroll_deductions',
+    'allowance_items' and 'deduction_items'. payroll/statistics.py keeps them
+    current with F() increments on every Payroll/item write;
+    `manage.py rebuild_payroll_statistics` recomputes them from scratch.
+    """
+    key = models.CharField(max_length=64, unique=True)
+    count = models.BigIntegerField(default=0)
+    amount = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0.00'))
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'payroll_statistic'
+
+    def __str__(self):
+        return f"{self.key}: {self.count} / {self.amount}"
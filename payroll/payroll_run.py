@@ -0,0 +1,368 @@
+# payroll/payroll_run.py
+"""
+Organization-wide payroll runs.
+
+A PayrollRun computes every active employee for one month. Employees are
+split into chunks that are computed in a process pool (or in-process when
+workers == 1); each finished chunk is written with bulk upserts and
+recorded on the run in the same transaction, so a crashed run resumes by
+skipping the employees it already committed.
+
+Per-employee values match PayrollViewSet.create: allowance/deduction items
+already on an existing Payroll are kept, the ATTENDANCE PENALTY deduction is
+replaced and the month's leave usage is committed to the leave balances.
+"""
+
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from payroll.models import Payroll, PayrollAllowance, PayrollDeduction, PayrollRun
+from payroll.payslip_cache import invalidate_payslips
+from payroll.preview_cache import invalidate_payroll_previews
+from payroll.statistics import ITEM_KEYS, StatisticsDelta
+
+logger = logging.getLogger(__name__)
+
+PENALTY_DEDUCTION_TYPE = 'ATTENDANCE PENALTY'
+
+PAYROLL_VALUE_FIELDS = [
+    'salary', 'attendance_days', 'working_days', 'earned_salary', 'allowances',
+    'gross_pay', 'deductions', 'tax', 'net_pay', 'leave_usage',
+]
+
+UNFINISHED_STATUSES = ('pending', 'running', 'failed')
+
+
+class PayrollRunConflict(Exception):
+    """The run is being executed by another process (or was superseded)."""
+
+
+def payroll_employees():
+    """Employees a run covers (active employee and login)."""
+    from employee_management.models import Employee
+
+    return (
+        Employee.objects.filter(is_active=True)
+        .filter(Q(user__isnull=True) | Q(user__is_active=True))
+        .order_by('id')
+    )
+
+
+def payroll_employee_ids():
+    return list(payroll_employees().values_list('id', flat=True))
+
+
+def create_payroll_run(month, year, created_by=None, chunk_size=None, workers=None):
+    return PayrollRun.objects.create(
+        month=month,
+        year=year,
+        created_by=created_by,
+        chunk_size=chunk_size or getattr(settings, 'PAYROLL_RUN_CHUNK_SIZE', 50),
+        workers=workers or getattr(settings, 'PAYROLL_RUN_WORKERS', 1),
+    )
+
+
+def get_or_create_payroll_run(month, year, created_by=None, chunk_size=None, workers=None):
+    """Latest unfinished run for the month (to resume), or a new one."""
+    run = PayrollRun.objects.filter(
+        month=month, year=year, status__in=UNFINISHED_STATUSES
+    ).order_by('-created_at').first()
+    if run:
+        return run, False
+    return create_payroll_run(month, year, created_by, chunk_size, workers), True
+
+
+def supersede_payroll_runs(month, year):
+    """
+    Mark the month's pending/failed runs superseded so a new run can start.
+    Raises PayrollRunConflict while one is running.
+    """
+    running = PayrollRun.objects.filter(month=month, year=year, status='running').first()
+    if running:
+        raise PayrollRunConflict(f'Payroll run #{running.id} for {month} {year} is running')
+    PayrollRun.objects.filter(month=month, year=year, status__in=['pending', 'failed']).update(
+        status='superseded', last_error='Superseded by a new run', updated_at=timezone.now()
+    )
+
+
+def claim_payroll_run(run, force=False):
+    """
+    Atomically mark `run` running, so no other process executes it at the same
+    time, and reload it. Raises PayrollRunConflict if it is already running
+    (unless `force`, for runs left 'running' by a killed process) or superseded.
+    """
+    blocked = ['superseded'] if force else ['running', 'superseded']
+    claimed = PayrollRun.objects.filter(pk=run.pk).exclude(status__in=blocked).update(
+        status='running', updated_at=timezone.now()
+    )
+    if not claimed:
+        run.refresh_from_db(fields=['status'])
+        raise PayrollRunConflict(f'Payroll run #{run.id} is {run.status}')
+    run.refresh_from_db()
+    return run
+
+
+def compute_payroll_chunk(month, year, employee_ids):
+    """
+    Compute payroll values for a chunk of employees (no Payroll writes).
+
+    Returns (results, errors): results is {employee_id: {'values': {...},
+    'user_id': ..., 'penalty_amount': Decimal}}, errors is {employee_id: message}.
+    """
+    from employee_management.models import Employee
+    from HR.utils.penalty_cache import get_monthly_penalties_bulk
+    from payroll.rule_set import get_rule_set
+    from payroll.services import EMPTY_PENALTY_COUNTS, PayrollCalculationService
+
+    month_number = PayrollCalculationService.MONTH_NAME_TO_NUMBER[month]
+    employees = list(Employee.objects.filter(id__in=employee_ids).select_related('user'))
+
+    # Item totals of payrolls that already exist, one grouped query each
+    payroll_ids = dict(
+        Payroll.objects.filter(employee_id__in=employee_ids, month=month, year=year)
+        .values_list('employee_id', 'id')
+    )
+    allowance_totals = dict(
+        PayrollAllowance.objects.filter(payroll_id__in=payroll_ids.values())
+        .order_by().values('payroll_id').annotate(total=Sum('amount'))
+        .values_list('payroll_id', 'total')
+    )
+    deduction_totals = dict(
+        PayrollDeduction.objects.filter(payroll_id__in=payroll_ids.values())
+        .exclude(deduction_type=PENALTY_DEDUCTION_TYPE)
+        .order_by().values('payroll_id').annotate(total=Sum('amount'))
+        .values_list('payroll_id', 'total')
+    )
+
+    penalties = get_monthly_penalties_bulk([employee.user for employee in employees], year, month_number)
+    # One rule set and one set of grouped request counts for the whole chunk
+    rule_set = get_rule_set()
+    penalty_counts = PayrollCalculationService.get_penalty_counts_bulk(
+        [employee.user_id for employee in employees], year, month_number
+    )
+
+    results = {}
+    errors = {}
+    for employee in employees:
+        try:
+            base_salary = PayrollCalculationService.get_employee_salary(employee)
+            if base_salary == 0:
+                errors[employee.id] = 'Employee has no salary configured'
+                continue
+
+            payroll_id = payroll_ids.get(employee.id)
+            preview = PayrollCalculationService.calculate_preview(
+                employee=employee,
+                month=month,
+                year=year,
+                base_salary=base_salary,
+                allowances=allowance_totals.get(payroll_id) or Decimal('0.00'),
+                deductions=deduction_totals.get(payroll_id) or Decimal('0.00'),
+                penalty_data=penalties.get(employee.user_id) if employee.user_id else None,
+                rule_set=rule_set,
+                penalty_counts=penalty_counts.get(employee.user_id, EMPTY_PENALTY_COUNTS),
+            )
+        except Exception as e:
+            logger.exception(f"[PAYROLL RUN] Failed to compute employee {employee.id}")
+            errors[employee.id] = str(e)
+            continue
+
+        salary = preview['salary_calculation']
+        results[employee.id] = {
+            'values': {
+                'salary': base_salary,
+                'attendance_days': int(preview['attendance_breakdown']['effective_paid_days']),
+                'working_days': preview['attendance_breakdown']['total_working_days'],
+                'earned_salary': Decimal(str(salary['earned_salary'])),
+                'allowances': Decimal(str(salary['allowances'])),
+                'gross_pay': Decimal(str(salary['gross_pay'])),
+                'deductions': Decimal(str(salary['deductions'])),
+                'tax': Decimal(str(salary['tax'])),
+                'net_pay': Decimal(str(salary['net_pay'])),
+                'leave_usage': preview['attendance_breakdown']['this_month_usage'],
+            },
+            'user_id': employee.user_id,
+            'penalty_amount': Decimal(str(preview['penalty_deduction'].get('amount', 0) or 0)),
+        }
+
+    for employee_id in set(employee_ids) - {employee.id for employee in employees}:
+        errors[employee_id] = 'Employee not found'
+
+    return results, errors
+
+
+def _compute_chunk_in_worker(month, year, employee_ids):
+    try:
+        return compute_payroll_chunk(month, year, employee_ids)
+    finally:
+        connections.close_all()
+
+
+def _init_worker():
+    import django
+
+    django.setup()
+    # Never share the parent's database sockets
+    connections.close_all()
+
+
+def save_payroll_chunk(run, results, errors):
+    """Upsert one computed chunk and record it on the run, atomically."""
+    from payroll.services import PayrollCalculationService
+
+    month, year = run.month, run.year
+    payroll_ids = {}
+
+    with transaction.atomic():
+        if results:
+            previous = {
+                row[0]: row[1:]
+                for row in Payroll.objects.filter(employee_id__in=results.keys(), month=month, year=year)
+                .values_list('employee_id', 'leave_usage', 'status', 'allowances', 'deductions')
+            }
+            previous_usage = {employee_id: row[0] for employee_id, row in previous.items()}
+            Payroll.objects.bulk_create(
+                [
+                    Payroll(
+                        employee_id=employee_id,
+                        month=month,
+                        year=year,
+                        created_by_id=run.created_by_id,
+                        **result['values'],
+                    )
+                    for employee_id, result in results.items()
+                ],
+                update_conflicts=True,
+                unique_fields=['employee', 'month', 'year'],
+                update_fields=PAYROLL_VALUE_FIELDS + ['updated_at'],
+            )
+            payroll_ids = dict(
+                Payroll.objects.filter(employee_id__in=results.keys(), month=month, year=year)
+                .values_list('employee_id', 'id')
+            )
+
+            PayrollDeduction.objects.filter(
+                payroll_id__in=payroll_ids.values(),
+                deduction_type=PENALTY_DEDUCTION_TYPE,
+            ).delete()
+            penalty_items = PayrollDeduction.objects.bulk_create([
+                PayrollDeduction(
+                    payroll_id=payroll_ids[employee_id],
+                    deduction_type=PENALTY_DEDUCTION_TYPE,
+                    amount=result['penalty_amount'],
+                    description=f'Attendance penalties for {month} {year}',
+                )
+                for employee_id, result in results.items()
+                if result['penalty_amount'] > 0
+            ])
+
+            # Bulk writes skip the statistics signals (the delete above did not)
+            delta = StatisticsDelta()
+            for employee_id, result in results.items():
+                values = result['values']
+                status = 'Pending'
+                if employee_id in previous:
+                    _, status, allowances, deductions = previous[employee_id]
+                    delta.add_payroll(status, month, employee_id, allowances, deductions, sign=-1)
+                delta.add_payroll(status, month, employee_id, values['allowances'], values['deductions'])
+            for item in penalty_items:
+                delta.add_item(ITEM_KEYS[PayrollDeduction], item.amount)
+            delta.apply()
+
+            # Finalizing commits each employee's leave usage for the month
+            PayrollCalculationService.commit_leave_usage(
+                year,
+                PayrollCalculationService.MONTH_NAME_TO_NUMBER[month],
+                {
+                    result['user_id']: (result['values']['leave_usage'], previous_usage.get(employee_id) or {})
+                    for employee_id, result in results.items()
+                    if result['user_id']
+                },
+            )
+
+        processed = set(run.processed_employee_ids) | set(results)
+        run_errors = {key: value for key, value in run.errors.items() if int(key) not in results}
+        run_errors.update({str(employee_id): message for employee_id, message in errors.items()})
+
+        run.processed_employee_ids = sorted(processed)
+        run.errors = run_errors
+        run.success_count = len(processed)
+        run.error_count = len(run_errors)
+        run.processed_count = run.success_count + run.error_count
+        run.save(update_fields=[
+            'processed_employee_ids', 'errors', 'success_count', 'error_count',
+            'processed_count', 'updated_at',
+        ])
+
+    # Bulk writes skip the model signals
+    invalidate_payroll_previews()
+    for employee_id, payroll_id in payroll_ids.items():
+        invalidate_payslips(employee_id, payroll_id)
+
+
+def execute_payroll_run(run, workers=None, chunk_size=None, retry_errors=True, progress=None, force=False):
+    """
+    Compute and store payroll for every employee the run has not committed yet.
+
+    The run is claimed first (see claim_payroll_run). Employees that failed on
+    an earlier attempt are retried unless `retry_errors` is False.
+    `progress(run)` is called after each chunk.
+    """
+    run = claim_payroll_run(run, force=force)
+    workers = workers or run.workers or 1
+    chunk_size = chunk_size or run.chunk_size or 50
+
+    employee_ids = payroll_employee_ids()
+    skip = set(run.processed_employee_ids)
+    if not retry_errors:
+        skip |= {int(key) for key in run.errors}
+    pending = [employee_id for employee_id in employee_ids if employee_id not in skip]
+    chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+
+    run.status = 'running'
+    run.total_employees = len(employee_ids)
+    run.workers = workers
+    run.chunk_size = chunk_size
+    run.started_at = run.started_at or timezone.now()
+    run.finished_at = None
+    run.last_error = ''
+    run.save(update_fields=[
+        'status', 'total_employees', 'workers', 'chunk_size', 'started_at',
+        'finished_at', 'last_error', 'updated_at',
+    ])
+
+    try:
+        if workers > 1 and len(chunks) > 1:
+            # Workers open their own connections
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                futures = [
+                    pool.submit(_compute_chunk_in_worker, run.month, run.year, chunk)
+                    for chunk in chunks
+                ]
+                for future in as_completed(futures):
+                    save_payroll_chunk(run, *future.result())
+                    if progress:
+                        progress(run)
+        else:
+            for chunk in chunks:
+                save_payroll_chunk(run, *compute_payroll_chunk(run.month, run.year, chunk))
+                if progress:
+                    progress(run)
+    except Exception as e:
+        logger.exception(f"[PAYROLL RUN] Run {run.id} failed")
+        run.status = 'failed'
+        run.last_error = str(e)
+        run.save(update_fields=['status', 'last_error', 'updated_at'])
+        raise
+
+    run.status = 'completed_with_errors' if run.errors else 'completed'
+    run.finished_at = timezone.now()
+    run.save(update_fields=['status', 'finished_at', 'updated_at'])
+    return run
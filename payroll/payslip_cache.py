@@ -0,0 +1,109 @@
+# payroll/payslip_cache.py
+"""
+Content-addressed cache of rendered payslip PDFs.
+
+A payslip is stored in the "payslips" storage (local disk or private R2,
+see settings.STORAGES) under a SHA-256 of everything it prints: the Payroll
+row, its allowance/deduction items, the employee's name and designation and
+the pay date. Any change produces a new hash, so a stale PDF is never served;
+payroll/signals.py deletes the superseded files. The hash doubles as the
+download ETag.
+
+Files are laid out as payslips/<employee_id>/<payroll_id>-<hash>.pdf so one
+employee's or payroll's files can be dropped with a single listing.
+"""
+
+import hashlib
+import json
+import logging
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import InvalidStorageError, default_storage, storages
+
+logger = logging.getLogger(__name__)
+
+# Bump when the payslip layout changes so old renders are not reused
+PAYSLIP_TEMPLATE_VERSION = 1
+
+PAYROLL_HASH_FIELDS = [
+    'id', 'employee_id', 'month', 'year', 'salary', 'attendance_days', 'working_days',
+    'earned_salary', 'allowances', 'gross_pay', 'deductions', 'tax', 'net_pay',
+]
+
+
+def get_payslip_storage():
+    try:
+        return storages['payslips']
+    except InvalidStorageError:
+        return default_storage
+
+
+def payslip_hash(payroll):
+    """SHA-256 of everything the payslip of `payroll` prints."""
+    from payroll.serializers import get_employee_name_for_pdf, payslip_pay_date
+
+    employee = payroll.employee
+    content = {
+        'template': PAYSLIP_TEMPLATE_VERSION,
+        'payroll': {field: str(getattr(payroll, field)) for field in PAYROLL_HASH_FIELDS},
+        'pay_date': str(payslip_pay_date(payroll)),
+        'employee': [get_employee_name_for_pdf(employee), str(getattr(employee, 'designation', '') or '')],
+        'allowances': [[item.allowance_type, str(item.amount)] for item in payroll.allowance_items.all()],
+        'deductions': [[item.deduction_type, str(item.amount)] for item in payroll.deduction_items.all()],
+    }
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+
+def payslip_path(payroll, digest):
+    return f'payslips/{payroll.employee_id}/{payroll.id}-{digest}.pdf'
+
+
+def get_payslip_pdf(payroll, digest=None):
+    """
+    (pdf_bytes, digest) for `payroll`, rendering and storing it on a miss.
+
+    Storage failures fall back to rendering, so downloads never depend on
+    the cache being reachable.
+    """
+    from payroll.serializers import generate_payslip_pdf
+
+    digest = digest or payslip_hash(payroll)
+    path = payslip_path(payroll, digest)
+    storage = get_payslip_storage()
+
+    try:
+        if storage.exists(path):
+            with storage.open(path, 'rb') as stored:
+                return stored.read(), digest
+    except Exception as e:
+        logger.warning(f"[PAYSLIP CACHE] Read failed for {path}: {e}")
+
+    pdf = generate_payslip_pdf(payroll)
+    try:
+        if not storage.exists(path):
+            storage.save(path, ContentFile(pdf))
+    except Exception as e:
+        logger.warning(f"[PAYSLIP CACHE] Write failed for {path}: {e}")
+    return pdf, digest
+
+
+def invalidate_payslips(employee_id, payroll_id=None):
+    """Delete stored payslips of one payroll, or every payroll of an employee."""
+    storage = get_payslip_storage()
+    directory = f'payslips/{employee_id}'
+    try:
+        _, files = storage.listdir(directory)
+    except (FileNotFoundError, NotADirectoryError):
+        return
+    except Exception as e:
+        logger.warning(f"[PAYSLIP CACHE] Listing {directory} failed: {e}")
+        return
+
+    prefix = f'{payroll_id}-' if payroll_id is not None else ''
+    for name in files:
+        if not name.startswith(prefix):
+            continue
+        try:
+            storage.delete(f'{directory}/{name}')
+        except Exception as e:
+            logger.warning(f"[PAYSLIP CACHE] Delete failed for {directory}/{name}: {e}")
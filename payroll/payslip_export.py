@@ -0,0 +1,129 @@
+# payroll/payslip_export.py
+"""
+Bulk payslip export.
+
+Payslips for a month are rendered in chunks across a process pool (or
+in-process when workers == 1) and written into a ZIP as they arrive. The ZIP
+is produced as a stream of byte chunks, so neither the pool nor the caller
+ever holds more than a few chunks of PDFs in memory.
+
+The pool is for the export_payslips command; web requests render in-process
+(workers=1) rather than forking from a threaded server.
+"""
+
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+
+from payroll.models import Payroll
+
+
+def payslip_filename(payroll):
+    return f'payslip_{payroll.employee_id}_{payroll.month}_{payroll.year}.pdf'
+
+
+def payroll_ids_for_month(month, year, employee_ids=None):
+    qs = Payroll.objects.filter(month=month, year=year)
+    if employee_ids:
+        qs = qs.filter(employee_id__in=employee_ids)
+    return list(qs.order_by('employee_id').values_list('id', flat=True))
+
+
+def render_payslip_chunk(payroll_ids):
+    """[(filename, pdf_bytes)] for a chunk of payrolls, in id order."""
+    from payroll.serializers import generate_payslip_pdf
+
+    payrolls = (
+        Payroll.objects.filter(id__in=payroll_ids)
+        .select_related('employee__user')
+        .prefetch_related('allowance_items', 'deduction_items')
+        .order_by('employee_id')
+    )
+    return [(payslip_filename(payroll), generate_payslip_pdf(payroll)) for payroll in payrolls]
+
+
+def _render_chunk_in_worker(payroll_ids):
+    try:
+        return render_payslip_chunk(payroll_ids)
+    finally:
+        connections.close_all()
+
+
+def _init_worker():
+    import django
+
+    django.setup()
+    # Never share the parent's database sockets
+    connections.close_all()
+
+
+def iter_payslip_pdfs(payroll_ids, workers=None, chunk_size=None):
+    """Yield (filename, pdf_bytes) for `payroll_ids`, keeping at most 2 chunks per worker in flight."""
+    workers = workers or getattr(settings, 'PAYSLIP_EXPORT_WORKERS', 1)
+    chunk_size = chunk_size or getattr(settings, 'PAYSLIP_EXPORT_CHUNK_SIZE', 25)
+    chunks = [payroll_ids[i:i + chunk_size] for i in range(0, len(payroll_ids), chunk_size)]
+
+    if workers <= 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            yield from render_payslip_chunk(chunk)
+        return
+
+    # Workers open their own connections
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        pending = iter(chunks)
+        in_flight = [pool.submit(_render_chunk_in_worker, chunk) for chunk in _take(pending, workers * 2)]
+        while in_flight:
+            # Keep output order stable: wait for the oldest chunk first
+            yield from in_flight.pop(0).result()
+            in_flight.extend(pool.submit(_render_chunk_in_worker, chunk) for chunk in _take(pending, 1))
+
+
+def _take(iterator, count):
+    for _ in range(count):
+        try:
+            yield next(iterator)
+        except StopIteration:
+            return
+
+
+class _ZipStream:
+    """Write-only file object that hands written bytes back to the generator."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_payslip_zip(payroll_ids, workers=None, chunk_size=None):
+    """
+    Yield the bytes of a ZIP containing one payslip PDF per payroll.
+
+    PDFs are stored without recompression (their page streams are already
+    compressed).
+    """
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, mode='w', compression=zipfile.ZIP_STORED) as archive:
+        for filename, pdf in iter_payslip_pdfs(payroll_ids, workers=workers, chunk_size=chunk_size):
+            archive.writestr(filename, pdf)
+            yield stream.drain()
+    # Central directory
+    yield stream.drain()
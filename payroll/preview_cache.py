@@ -0,0 +1,88 @@
+# payroll/preview_cache.py
+"""
+Memoized payroll previews.
+
+Previews are side-effect free, so a result can be reused until one of its
+inputs changes. Results are cached per employee, month and data version;
+the version is made of three counters kept in the shared cache:
+
+- global: holidays, automation rules, leave types and bulk jobs
+- per user: attendance, leave/late/early requests, leave balance
+- per employee: employee record and that employee's payroll items
+
+payroll/signals.py bumps the counters. Bulk writes skip signals, so callers
+doing those must call invalidate_payroll_previews() themselves;
+PAYROLL_PREVIEW_CACHE_TTL_SECONDS bounds staleness otherwise.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+GLOBAL_VERSION_KEY = 'payroll:preview:version'
+USER_VERSION_KEY = 'payroll:preview:version:user:{}'
+EMPLOYEE_VERSION_KEY = 'payroll:preview:version:employee:{}'
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+    except Exception:
+        pass
+
+
+def invalidate_payroll_previews(user_id=None, employee_id=None):
+    """Drop cached previews for a user, an employee, or (no arguments) everyone."""
+    if user_id is None and employee_id is None:
+        _bump(GLOBAL_VERSION_KEY)
+        return
+    if user_id is not None:
+        _bump(USER_VERSION_KEY.format(user_id))
+    if employee_id is not None:
+        _bump(EMPLOYEE_VERSION_KEY.format(employee_id))
+
+
+def data_version(employee):
+    """(global, user, employee) version counters for `employee`."""
+    keys = [
+        GLOBAL_VERSION_KEY,
+        USER_VERSION_KEY.format(getattr(employee, 'user_id', None)),
+        EMPLOYEE_VERSION_KEY.format(employee.pk),
+    ]
+    try:
+        versions = cache.get_many(keys)
+    except Exception:
+        versions = {}
+    return tuple(versions.get(key, 0) for key in keys)
+
+
+def memoize_preview(kind, employee, key_parts, compute):
+    """
+    Return compute() for `employee`, cached under `kind` and `key_parts`.
+
+    `key_parts` must identify every input besides the employee's stored data
+    (month, year, amounts passed in by the caller).
+    """
+    ttl = getattr(settings, 'PAYROLL_PREVIEW_CACHE_TTL_SECONDS', 600)
+    # The current month grows by a day at midnight
+    key = ':'.join(str(part) for part in (
+        'payroll:preview', kind, employee.pk, *data_version(employee), timezone.localdate(), *key_parts
+    ))
+    if ttl <= 0:
+        return compute()
+
+    try:
+        result = cache.get(key)
+    except Exception:
+        result = None
+    if result is not None:
+        return result
+
+    result = compute()
+    try:
+        cache.set(key, result, ttl)
+    except Exception:
+        pass
+    return result
@@ -0,0 +1,123 @@
+# payroll/rule_set.py
+"""
+Compiled, read-only set of active automation rules.
+
+All active AutomationRule rows are loaded with one query into immutable
+CompiledRule tuples and kept in-process. AutomationRule save/delete bumps
+the rule-set version (locally and in the shared cache), and
+AUTOMATION_RULE_SET_TTL_SECONDS bounds staleness for workers without a
+shared cache backend.
+
+Penalty deduction takes the rule set (and grouped request counts) as
+arguments, so a payroll run or request loads it once and every employee
+after that is pure in-memory arithmetic.
+"""
+
+import threading
+import time
+from collections import namedtuple
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+
+VERSION_CACHE_KEY = 'payroll:automation_rules:version'
+
+CompiledRule = namedtuple(
+    'CompiledRule',
+    ['id', 'rule_type', 'rule_name', 'deduct_salary', 'deduction_type', 'deduction_amount',
+     'set_occurrences', 'max_occurrences'],
+)
+
+_rule_set = None
+_local_version = 0
+_lock = threading.Lock()
+
+
+class AutomationRuleSet:
+    """
+    Active rules by type. `late`, `early` and `missed` are the newest active
+    rule of each type (what `.filter(rule_type=..., is_active=True).first()`
+    returned); `missed_fixed` is the newest active Fixed Amount missed rule,
+    whose occurrences are the missed-punch grace period.
+    """
+
+    __slots__ = ('version', 'loaded_at', 'rules', 'late', 'early', 'missed', 'missed_fixed')
+
+    def __init__(self, rules, version):
+        object.__setattr__(self, 'version', version)
+        object.__setattr__(self, 'loaded_at', time.monotonic())
+        object.__setattr__(self, 'rules', tuple(rules))
+        first = {}
+        missed_fixed = None
+        for rule in self.rules:
+            first.setdefault(rule.rule_type, rule)
+            if missed_fixed is None and rule.rule_type == 'missed' and rule.deduction_type == 'Fixed Amount':
+                missed_fixed = rule
+        object.__setattr__(self, 'late', first.get('late'))
+        object.__setattr__(self, 'early', first.get('early'))
+        object.__setattr__(self, 'missed', first.get('missed'))
+        object.__setattr__(self, 'missed_fixed', missed_fixed)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('AutomationRuleSet is immutable')
+
+    @classmethod
+    def load(cls, version):
+        from payroll.models import AutomationRule
+
+        rows = AutomationRule.objects.filter(is_active=True).values_list(
+            'id', 'rule_type', 'rule_name', 'deduct_salary', 'deduction_type', 'deduction_amount',
+            'set_occurrences', 'max_occurrences',
+        )
+        # Model ordering: rule_type, newest first
+        return cls([
+            CompiledRule(pk, rule_type, name, deduct_salary, deduction_type,
+                         Decimal(str(amount or 0)), set_occurrences, max_occurrences)
+            for pk, rule_type, name, deduct_salary, deduction_type, amount, set_occurrences, max_occurrences in rows
+        ], version)
+
+    def grace(self, rule_type):
+        """Occurrences allowed before late/early requests are charged."""
+        rule = getattr(self, rule_type)
+        return int(rule.max_occurrences or 0) if rule else 0
+
+    @property
+    def missed_grace(self):
+        """Missed punches allowed before one is charged (defaults to 1)."""
+        return int(self.missed_fixed.max_occurrences or 1) if self.missed_fixed else 1
+
+
+def _shared_version():
+    try:
+        return cache.get(VERSION_CACHE_KEY, 0)
+    except Exception:
+        return 0
+
+
+def get_rule_set():
+    """Current rule set, reloading it when the rules version changed."""
+    global _rule_set
+    ttl = getattr(settings, 'AUTOMATION_RULE_SET_TTL_SECONDS', 300)
+    version = (_local_version, _shared_version())
+    rule_set = _rule_set
+    if rule_set is not None and rule_set.version == version and time.monotonic() - rule_set.loaded_at < ttl:
+        return rule_set
+
+    with _lock:
+        _rule_set = AutomationRuleSet.load(version)
+    return _rule_set
+
+
+def invalidate_rule_set():
+    """Force every process to reload the rule set on next use."""
+    global _local_version, _rule_set
+    with _lock:
+        _local_version += 1
+        _rule_set = None
+    try:
+        cache.incr(VERSION_CACHE_KEY)
+    except ValueError:
+        cache.set(VERSION_CACHE_KEY, 1, None)
+    except Exception:
+        pass
@@ -1,7 +1,9 @@
 # payroll/serializers.py - Fixed with defensive employee name handling
 
+from decimal import Decimal
+
 from rest_framework import serializers
-from .models import Payroll, PayrollDeduction, PayrollAllowance, SalaryIncrement, AutomationRule
+from .models import Payroll, PayrollDeduction, PayrollAllowance, SalaryIncrement, AutomationRule, PayrollRun
 
 
 # =========================
@@ -499,7 +501,7 @@ from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
 from reportlab.lib.units import mm
 from io import BytesIO
-from django.utils.timezone import now
+from django.utils.timezone import localdate, now
 
 
 def get_employee_name_for_pdf(employee):
@@ -676,7 +678,25 @@ class SalaryIncrementListSerializer(serializers.ModelSerializer):
         return 'system'
 
 
+# Built once per process and shared by every payslip (bulk exports render
+# hundreds in a row)
+PAYSLIP_STYLES = getSampleStyleSheet()
+PAYSLIP_EMPLOYEE_TABLE_STYLE = TableStyle([
+    ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+    ("BACKGROUND", (2, 0), (2, -1), colors.whitesmoke),
+])
+
+
+def payslip_pay_date(payroll):
+    """Date printed as "Pay Date": when the payroll was paid, else today"""
+    return payroll.paid_date or localdate()
+
+
 def generate_payslip_pdf(payroll):
+    """
+    Render one payslip. Prefetch employee__user, allowance_items and
+    deduction_items when rendering many.
+    """
     buffer = BytesIO()
 
     doc = SimpleDocTemplate(
@@ -688,7 +708,7 @@ def generate_payslip_pdf(payroll):
         bottomMargin=20 * mm
     )
 
-    styles = getSampleStyleSheet()
+    styles = PAYSLIP_STYLES
     elements = []
 
     # Header
@@ -714,15 +734,12 @@ def generate_payslip_pdf(payroll):
          f"₹{payroll.net_pay:,.2f}"],
         ["Designation", designation, "Paid Days",
          payroll.attendance_days],
-        ["Pay Date", now().strftime("%d/%m/%Y"), "LOP Days",
+        ["Pay Date", payslip_pay_date(payroll).strftime("%d/%m/%Y"), "LOP Days",
          max(payroll.working_days - payroll.attendance_days, 0)],
     ]
 
     emp_table = Table(emp_data, colWidths=[80, 140, 80, 100])
-    emp_table.setStyle(TableStyle([
-        ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
-        ("BACKGROUND", (2, 0), (2, -1), colors.whitesmoke),
-    ]))
+    emp_table.setStyle(PAYSLIP_EMPLOYEE_TABLE_STYLE)
 
     elements.append(emp_table)
     elements.append(Spacer(1, 16))
@@ -849,3 +866,77 @@ class AutomationRuleListSerializer(serializers.ModelSerializer):
 
     def get_threshold_display(self, obj):
         return obj.get_threshold_display()
+
+
+class PayrollRunSerializer(serializers.ModelSerializer):
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    created_by_email = serializers.SerializerMethodField()
+
+    class Meta:
+        model = PayrollRun
+        fields = [
+            'id',
+            'month',
+            'year',
+            'status',
+            'status_display',
+            'total_employees',
+            'processed_count',
+            'success_count',
+            'error_count',
+            'errors',
+            'last_error',
+            'chunk_size',
+            'workers',
+            'started_at',
+            'finished_at',
+            'created_at',
+            'updated_at',
+            'created_by_email',
+        ]
+        read_only_fields = fields
+
+    def get_created_by_email(self, obj):
+        if obj.created_by:
+            return getattr(obj.created_by, 'email', 'system')
+        return 'system'
+
+
+# =========================
+# PAYROLL SIMULATION
+# =========================
+class SimulationIncrementSerializer(serializers.Serializer):
+    """Hypothetical increment; without department_id/employee_ids it applies to everyone."""
+    department_id = serializers.IntegerField(required=False)
+    employee_ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+    percent = serializers.DecimalField(max_digits=6, decimal_places=2, required=False, default=Decimal('0'))
+    amount = serializers.DecimalField(max_digits=12, decimal_places=2, required=False, default=Decimal('0'))
+
+
+class SimulationRuleSerializer(serializers.Serializer):
+    """Hypothetical AutomationRule settings; omitted fields keep the active rule's value."""
+    deduct_salary = serializers.BooleanField(required=False)
+    deduction_type = serializers.ChoiceField(choices=AutomationRule.DEDUCTION_TYPES, required=False)
+    deduction_amount = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False)
+    max_occurrences = serializers.IntegerField(min_value=0, required=False, allow_null=True)
+
+
+class SimulationRulesSerializer(serializers.Serializer):
+    late = SimulationRuleSerializer(required=False)
+    early = SimulationRuleSerializer(required=False)
+    missed = SimulationRuleSerializer(required=False)
+
+
+class PayrollSimulationSerializer(serializers.Serializer):
+    month = serializers.CharField(help_text='Baseline month name, e.g. "November"')
+    year = serializers.IntegerField()
+    months = serializers.IntegerField(min_value=1, max_value=24, default=1, help_text='Months to project')
+    increments = SimulationIncrementSerializer(many=True, required=False, default=list)
+    rules = SimulationRulesSerializer(required=False, default=dict)
+
+    def validate_month(self, value):
+        from .services import PayrollCalculationService
+
+        if value not in PayrollCalculationService.MONTH_NAME_TO_NUMBER:
+            raise serializers.ValidationError('Use a full month name like "November"')
+        return value
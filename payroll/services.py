@@ -1,15 +1,29 @@
 # payroll/services.py - FIXED LEAVE BALANCE HANDLING
 
+import calendar
+from collections import defaultdict, namedtuple
 from decimal import Decimal
 
-from HR.utils.attendance_penalties import calculate_monthly_penalties
+from HR.utils.penalty_cache import get_monthly_penalties
 from datetime import datetime, timedelta
 from django.utils import timezone
-from django.db.models import Q, Sum
+from django.db.models import Count, F, Q, QuerySet, Sum, Value
 from django.db import transaction
-from HR.models import Attendance, Holiday, EmployeeLeaveBalance, LateRequest, EarlyRequest
+from HR.models import Attendance, EmployeeLeaveBalance, LateRequest, EarlyRequest, PenaltyDecision
+from HR.utils.holiday_calendar import get_holidays_in_month
 from master.models import LeaveMaster
-from payroll.models import AutomationRule
+from payroll.models import Payroll
+from payroll.preview_cache import memoize_preview
+from payroll.rule_set import get_rule_set
+
+
+PenaltyCounts = namedtuple(
+    'PenaltyCounts',
+    ['late_approved', 'late_rejected', 'late_pending', 'late_total',
+     'early_approved', 'early_rejected', 'early_pending', 'early_total',
+     'missed_reviewed', 'missed_deducted'],
+)
+EMPTY_PENALTY_COUNTS = PenaltyCounts(0, 0, 0, 0, 0, 0, 0, 0, 0, 0)
 
 
 class PayrollCalculationService:
@@ -23,6 +37,7 @@ class PayrollCalculationService:
         'May': 5, 'June': 6, 'July': 7, 'August': 8,
         'September': 9, 'October': 10, 'November': 11, 'December': 12
     }
+    MONTH_NUMBER_TO_NAME = {number: name for name, number in MONTH_NAME_TO_NUMBER.items()}
     
     # Leave rules
     CASUAL_LEAVE_YEARLY = 12  # 12 casual leaves per year (accumulate monthly: 1 per month)
@@ -59,22 +74,12 @@ class PayrollCalculationService:
     @staticmethod
     def get_holidays_in_month(year, month):
         """Get holidays in a month with their types"""
-        dates = PayrollCalculationService.get_month_dates(year, month)
-        first_day = dates[0]
-        last_day = dates[-1]
-        
-        holidays = Holiday.objects.filter(
-            date__gte=first_day,
-            date__lte=last_day,
-            is_active=True
-        ).values('date', 'name', 'holiday_type', 'is_paid')
-        
         holiday_dict = {}
-        for h in holidays:
-            holiday_dict[h['date']] = {
-                'name': h['name'],
-                'type': h['holiday_type'],
-                'is_paid': h['is_paid']
+        for day, holiday in get_holidays_in_month(int(year), int(month)).items():
+            holiday_dict[day] = {
+                'name': holiday.name,
+                'type': holiday.holiday_type,
+                'is_paid': holiday.is_paid
             }
         
         return holiday_dict
@@ -167,6 +172,129 @@ class PayrollCalculationService:
         
         return balance
     
+    @staticmethod
+    def _reset_leave_balance(balance, year):
+        """Start `balance` over for a new year (in memory)"""
+        balance.year = year
+        balance.casual_leave_balance = Decimal('0.00')
+        balance.casual_leave_used = Decimal('0.00')
+        balance.sick_leave_balance = PayrollCalculationService.SICK_LEAVE_YEARLY
+        balance.sick_leave_used = 0
+        balance.special_leave_balance = 7
+        balance.special_leave_used = 0
+        balance.unpaid_leave_taken = Decimal('0.00')
+        balance.last_casual_credit_month = 0
+        return balance
+
+    @staticmethod
+    def _credit_casual_leave(balance, current_month):
+        """update_casual_leave_balance() without saving"""
+        if balance.last_casual_credit_month < current_month:
+            months_to_credit = current_month - balance.last_casual_credit_month
+            balance.casual_leave_balance = min(
+                balance.casual_leave_balance + Decimal(str(months_to_credit)),
+                Decimal('12.00')
+            )
+            balance.last_casual_credit_month = current_month
+        return balance
+
+    @staticmethod
+    def get_leave_balance_snapshot(employee, year, month):
+        """
+        Unsaved copy of the employee's leave balance as it stood before `month`.
+
+        The monthly casual credit is applied in memory, and usage already
+        committed by a finalized payroll for the same month is taken back out.
+        """
+        user = employee.user if hasattr(employee, 'user') else employee
+        balance = EmployeeLeaveBalance.objects.filter(user=user).first() if user else None
+
+        if balance is None or balance.year != year:
+            return PayrollCalculationService._credit_casual_leave(
+                PayrollCalculationService._reset_leave_balance(EmployeeLeaveBalance(user=user), year),
+                month
+            )
+
+        PayrollCalculationService._credit_casual_leave(balance, month)
+
+        if hasattr(employee, 'user'):
+            committed = Payroll.objects.filter(
+                employee=employee,
+                month=PayrollCalculationService.MONTH_NUMBER_TO_NAME[month],
+                year=year
+            ).values_list('leave_usage', flat=True).first() or {}
+            balance.casual_leave_used -= Decimal(str(committed.get('casual_used', 0)))
+            balance.sick_leave_used -= int(committed.get('sick_used', 0))
+            balance.special_leave_used -= int(committed.get('special_used', 0))
+            balance.unpaid_leave_taken -= Decimal(str(committed.get('unpaid_used', 0)))
+
+        return balance
+
+    @staticmethod
+    def commit_leave_usage(year, month, usages):
+        """
+        Persist the leave usage of finalized payrolls.
+
+        `usages` is {user_id: (usage, previous_usage)}, where usage is the
+        payroll's this_month_usage and previous_usage what an earlier
+        finalization of the same payroll committed ({} if none), so
+        finalizing again only applies the difference.
+        """
+        if not usages:
+            return
+
+        with transaction.atomic():
+            balances = {
+                balance.user_id: balance
+                for balance in EmployeeLeaveBalance.objects.select_for_update().filter(user_id__in=usages)
+            }
+            to_create = []
+            to_update = []
+            for user_id, (usage, previous) in usages.items():
+                balance = balances.get(user_id)
+                if balance is None:
+                    balance = PayrollCalculationService._reset_leave_balance(
+                        EmployeeLeaveBalance(user_id=user_id), year
+                    )
+                    to_create.append(balance)
+                    previous = {}
+                else:
+                    if balance.year != year:
+                        PayrollCalculationService._reset_leave_balance(balance, year)
+                        previous = {}
+                    to_update.append(balance)
+
+                previous = previous or {}
+                PayrollCalculationService._credit_casual_leave(balance, month)
+                balance.casual_leave_used += (
+                    Decimal(str(usage.get('casual_used', 0))) - Decimal(str(previous.get('casual_used', 0)))
+                )
+                balance.sick_leave_used += int(usage.get('sick_used', 0)) - int(previous.get('sick_used', 0))
+                balance.special_leave_used += int(usage.get('special_used', 0)) - int(previous.get('special_used', 0))
+                balance.unpaid_leave_taken += (
+                    Decimal(str(usage.get('unpaid_used', 0))) - Decimal(str(previous.get('unpaid_used', 0)))
+                )
+                balance.updated_at = timezone.now()
+
+            EmployeeLeaveBalance.objects.bulk_create(to_create)
+            EmployeeLeaveBalance.objects.bulk_update(to_update, [
+                'year', 'casual_leave_balance', 'casual_leave_used', 'sick_leave_balance',
+                'sick_leave_used', 'special_leave_balance', 'special_leave_used',
+                'unpaid_leave_taken', 'last_casual_credit_month', 'updated_at',
+            ])
+
+    @staticmethod
+    def release_leave_usage(user_id, year, usage):
+        """Give back leave usage committed by a payroll that was deleted"""
+        if not user_id or not usage:
+            return
+        EmployeeLeaveBalance.objects.filter(user_id=user_id, year=year).update(
+            casual_leave_used=F('casual_leave_used') - Decimal(str(usage.get('casual_used', 0))),
+            sick_leave_used=F('sick_leave_used') - int(usage.get('sick_used', 0)),
+            special_leave_used=F('special_leave_used') - int(usage.get('special_used', 0)),
+            unpaid_leave_taken=F('unpaid_leave_taken') - Decimal(str(usage.get('unpaid_used', 0))),
+        )
+
     @staticmethod
     def get_employee_salary(employee):
         """Get employee's basic salary from multiple possible locations"""
@@ -194,6 +322,8 @@ class PayrollCalculationService:
         """
         Calculate comprehensive payroll data for an employee with FULL leave integration
         
+        Read-only: nothing is saved, so repeated previews give the same result.
+        
         Leave Rules Applied:
         - Casual Leave: 12 per year, max 6 per month
           * 1 leave credited each month (accumulates up to 12)
@@ -217,11 +347,8 @@ class PayrollCalculationService:
         # Get user for attendance
         user_for_attendance = employee.user if hasattr(employee, 'user') else employee
         
-        # Get or create leave balance
-        leave_balance = PayrollCalculationService.get_or_create_leave_balance(user_for_attendance, year)
-        
-        # Update casual leave balance for current month
-        leave_balance = PayrollCalculationService.update_casual_leave_balance(leave_balance, month)
+        # Read-only snapshot of the leave balance before this month
+        leave_balance = PayrollCalculationService.get_leave_balance_snapshot(employee, year, month)
         
         # Get all attendance records for the month
         attendances = Attendance.objects.filter(
@@ -351,12 +478,12 @@ class PayrollCalculationService:
                 # Not marked at all
                 not_marked_days += 1
         
-        # Update leave balance for the year (cumulative)
+        # Show the balance including this month (not saved here: the usage
+        # is committed by commit_leave_usage() when the payroll is finalized)
         leave_balance.casual_leave_used += casual_used_this_month
         leave_balance.sick_leave_used += sick_used_this_month
         leave_balance.special_leave_used += special_used_this_month
         leave_balance.unpaid_leave_taken += unpaid_leave_days
-        leave_balance.save()
         
         # Calculate totals
         total_working_days = total_days_in_month - sundays_count - total_paid_holidays
@@ -473,10 +600,65 @@ class PayrollCalculationService:
         }
 
     @staticmethod
-    def calculate_attendance_penalty_deduction(employee, year, month_number, working_days, base_salary):
+    def get_penalty_counts_bulk(user_ids, year, month_number):
+        """
+        {user_id: PenaltyCounts} for a month: late/early request counts by
+        status from one grouped query, and days with a reviewed (deducted or
+        waived) and a deducted missed punch from the PenaltyDecision ledger.
+
+        `user_ids` may also be a values_list() QuerySet, which is used as a
+        subquery; only users with any counts are returned then.
+        """
+        counts = defaultdict(lambda: dict.fromkeys(PenaltyCounts._fields, 0))
+        if not isinstance(user_ids, QuerySet):
+            user_ids = [user_id for user_id in user_ids if user_id]
+            if not user_ids:
+                return {}
+            for user_id in user_ids:
+                counts[user_id]
+
+        # A date range (not __year/__month) so the (user, date, ...) indexes apply
+        month_start = datetime(int(year), int(month_number), 1).date()
+        month_end = month_start.replace(day=calendar.monthrange(int(year), int(month_number))[1])
+        period = {'user_id__in': user_ids, 'date__range': (month_start, month_end)}
+        late = (
+            LateRequest.objects.filter(**period).order_by()
+            .values('user_id', 'status').annotate(kind=Value('late'), total=Count('id'))
+        )
+        early = (
+            EarlyRequest.objects.filter(**period).order_by()
+            .values('user_id', 'status').annotate(kind=Value('early'), total=Count('id'))
+        )
+        for row in late.union(early, all=True):
+            user_counts = counts[row['user_id']]
+            user_counts[f"{row['kind']}_total"] += row['total']
+            if row['status'] in ('approved', 'rejected', 'pending'):
+                user_counts[f"{row['kind']}_{row['status']}"] += row['total']
+
+        missed = (
+            PenaltyDecision.objects.filter(**period, penalty_type='missed').order_by()
+            .values('user_id')
+            .annotate(
+                reviewed=Count('date', distinct=True),
+                deducted=Count('date', distinct=True, filter=Q(action='deduct')),
+            )
+        )
+        for row in missed:
+            counts[row['user_id']]['missed_reviewed'] = row['reviewed']
+            counts[row['user_id']]['missed_deducted'] = row['deducted']
+        return {user_id: PenaltyCounts(**user_counts) for user_id, user_counts in counts.items()}
+
+    @staticmethod
+    def calculate_attendance_penalty_deduction(employee, year, month_number, working_days, base_salary,
+                                               penalty_data=None, rule_set=None, penalty_counts=None):
         """
         Calculate attendance penalty deduction based on AutomationRules from Payroll Settings.
         Applies rules for: late arrivals, early exits, missed punches
+
+        Pass `penalty_data` from get_monthly_penalties_bulk(), `rule_set` from
+        get_rule_set() and `penalty_counts` from get_penalty_counts_bulk() to
+        reuse values already loaded for a cohort; with all three the
+        calculation runs no queries.
         """
         user = getattr(employee, 'user', None)
         if not user:
@@ -489,97 +671,39 @@ class PayrollCalculationService:
             }
 
         # Get penalty data by type
-        penalty_data = calculate_monthly_penalties(user, int(year), int(month_number))
+        if penalty_data is None:
+            penalty_data = get_monthly_penalties(user, int(year), int(month_number))
         summary = penalty_data.get('summary', {}) or {}
         per_date = penalty_data.get('per_date', {}) or {}
 
-        late_requests = LateRequest.objects.filter(user=user, date__year=year, date__month=month_number)
-        early_requests = EarlyRequest.objects.filter(user=user, date__year=year, date__month=month_number)
+        if rule_set is None:
+            rule_set = get_rule_set()
+        if penalty_counts is None:
+            penalty_counts = PayrollCalculationService.get_penalty_counts_bulk([user.id], year, month_number)[user.id]
 
-        # Extract counts by type from the actual penalty data structure
         # Count penalties: only charge AFTER grace period is exhausted
         # Grace period comes from PayrollSetting (max_occurrences)
         # Only show 1 deduction per violation type (capped at 1)
-        
-        # For late: read grace from current rule
-        late_approved = late_requests.filter(status='approved').count()
-        late_rejected = late_requests.filter(status='rejected').count()
-        late_grace = 0
-        
-        # Get current grace period from PayrollSetting
-        late_rule = AutomationRule.objects.filter(rule_type='late', is_active=True).first()
-        if late_rule:
-            late_grace = int(late_rule.max_occurrences or 0)
-        
-        # Only show 1 if grace exhausted (cap at 1)
-        if (late_approved + late_rejected) > late_grace and late_approved > 0:
-            late_count = 1  # Only 1 × penalty amount
-        else:
-            late_count = 0
-        
-        # For early: read grace from current rule
-        early_approved = early_requests.filter(status='approved').count()
-        early_rejected = early_requests.filter(status='rejected').count()
-        early_grace = 0
-        
-        # Get current grace period from PayrollSetting
-        early_rule = AutomationRule.objects.filter(rule_type='early', is_active=True).first()
-        if early_rule:
-            early_grace = int(early_rule.max_occurrences or 0)
-        
-        # Only show 1 if grace exhausted (cap at 1)
-        if (early_approved + early_rejected) > early_grace and early_approved > 0:
-            early_count = 1  # Only 1 × penalty amount
-        else:
-            early_count = 0
-        
-        # For missed punches, only show 1 deduction AFTER grace period exhausted
-        missed_count = 0
-        try:
-            # Get the grace period for missed punch rule
-            missed_grace = 1  # Default
-            rule = AutomationRule.objects.filter(rule_type='missed', is_active=True, deduction_type='Fixed Amount').first()
-            if rule:
-                missed_grace = int(rule.max_occurrences or 1)
-            
-            attendance_records = Attendance.objects.filter(
-                user=user,
-                date__year=year,
-                date__month=month_number
-            ).values('date', 'admin_note')
-            
-            # Count ALL missed punch records (deducted + waived)
-            all_missed_dates = set()
-            deducted_missed_dates = set()
-            
-            for att in attendance_records:
-                if att['admin_note']:
-                    admin_lower = str(att['admin_note']).lower()
-                    # Check if it's any reviewed missed punch (deducted or waived)
-                    if ('deduct' in admin_lower or 'applied' in admin_lower or 'waive' in admin_lower) and 'missed punch' in admin_lower:
-                        all_missed_dates.add(att['date'])
-                    # Check if it's deducted
-                    if ('deduct' in admin_lower or 'applied' in admin_lower) and 'missed punch' in admin_lower:
-                        deducted_missed_dates.add(att['date'])
-            
-            # Only charge 1 deduction if grace exhausted
-            total_missed = len(all_missed_dates)
-            if total_missed > missed_grace and len(deducted_missed_dates) > 0:
-                missed_count = 1  # Only count 1, not all deducted
-            else:
-                missed_count = 0
-        except Exception:
-            # Fallback
-            missed_count = 0
-        
+        late_count = 1 if (
+            penalty_counts.late_approved + penalty_counts.late_rejected > rule_set.grace('late')
+            and penalty_counts.late_approved > 0
+        ) else 0
+        early_count = 1 if (
+            penalty_counts.early_approved + penalty_counts.early_rejected > rule_set.grace('early')
+            and penalty_counts.early_approved > 0
+        ) else 0
+        # Missed punches: reviewed (deducted + waived) beyond grace, at least one deducted
+        missed_count = 1 if (
+            penalty_counts.missed_reviewed > rule_set.missed_grace
+            and penalty_counts.missed_deducted > 0
+        ) else 0
+
         leave_penalty_days = float(summary.get('leave_penalty_days', 0) or 0)
 
-        # Fetch active automation rules (late and early are standard, missed can use 'breaks')
         rules = {
-            'late': AutomationRule.objects.filter(rule_type='late', is_active=True).first(),
-            'early': AutomationRule.objects.filter(rule_type='early', is_active=True).first(),
-            # For missed punches, use explicit 'missed' rule type
-            'missed': AutomationRule.objects.filter(rule_type='missed', is_active=True).first(),
+            'late': rule_set.late,
+            'early': rule_set.early,
+            'missed': rule_set.missed,
         }
 
         total_deduction_amount = Decimal('0.00')
@@ -690,8 +814,14 @@ class PayrollCalculationService:
         }
     
     @staticmethod
-    def calculate_preview(employee, month, year, base_salary, allowances=0, deductions=0):
-        """Calculate complete payroll preview with full leave breakdown"""
+    def calculate_preview(employee, month, year, base_salary, allowances=0, deductions=0,
+                          penalty_data=None, rule_set=None, penalty_counts=None):
+        """
+        Calculate complete payroll preview with full leave breakdown
+
+        `penalty_data`, `rule_set` and `penalty_counts` are passed through to
+        calculate_attendance_penalty_deduction().
+        """
         month_number = PayrollCalculationService.MONTH_NAME_TO_NUMBER.get(month)
         if not month_number:
             raise ValueError(f"Invalid month name: {month}")
@@ -709,6 +839,9 @@ class PayrollCalculationService:
             month_number=month_number,
             working_days=attendance_breakdown['total_working_days'],
             base_salary=base_salary,
+            penalty_data=penalty_data,
+            rule_set=rule_set,
+            penalty_counts=penalty_counts,
         )
 
         total_deductions = Decimal(str(deductions)) + penalty_deduction['amount']
@@ -762,6 +895,29 @@ class PayrollCalculationService:
             }
         }
     
+    @staticmethod
+    def get_cached_employee_payroll_data(employee, year, month):
+        """calculate_employee_payroll_data(), memoized until its inputs change"""
+        return memoize_preview(
+            'attendance', employee, (year, month),
+            lambda: PayrollCalculationService.calculate_employee_payroll_data(employee, year, month)
+        )
+
+    @staticmethod
+    def get_cached_preview(employee, month, year, base_salary, allowances=0, deductions=0):
+        """calculate_preview(), memoized until its inputs change"""
+        return memoize_preview(
+            'preview', employee, (month, year, base_salary, allowances, deductions),
+            lambda: PayrollCalculationService.calculate_preview(
+                employee=employee,
+                month=month,
+                year=year,
+                base_salary=base_salary,
+                allowances=allowances,
+                deductions=deductions
+            )
+        )
+
     @staticmethod
     def generate_payroll_summary_text(payroll_data):
         """Generate a human-readable summary of the payroll calculation"""
@@ -0,0 +1,200 @@
+# payroll/signals.py
+"""
+Payroll Signals
+
+AutomationRule changed → reload the compiled rule set
+Preview inputs changed → drop memoized payroll previews
+Payroll deleted → give its committed leave usage back to the balance
+Payroll/items/employee changed → delete superseded cached payslip PDFs
+Payroll/items saved or deleted → update the maintained payroll statistics
+"""
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import AutomationRule, Payroll, PayrollAllowance, PayrollDeduction
+from .payslip_cache import invalidate_payslips
+from .preview_cache import invalidate_payroll_previews
+from .rule_set import invalidate_rule_set
+from .statistics import ITEM_KEYS, StatisticsDelta, payroll_statistics_values
+from .services import PayrollCalculationService
+
+
+# ============================================================================
+# AUTOMATION RULE SET
+# ============================================================================
+# Admin list actions such as queryset.update() bypass these; the rule set's
+# TTL (AUTOMATION_RULE_SET_TTL_SECONDS) bounds how long that stays stale.
+
+@receiver(post_save, sender=AutomationRule)
+@receiver(post_delete, sender=AutomationRule)
+def reload_automation_rule_set(sender, instance, **kwargs):
+    invalidate_rule_set()
+
+
+# ============================================================================
+# PREVIEW CACHE INVALIDATION
+# ============================================================================
+# Bulk operations (queryset.update / bulk_create) bypass these signals;
+# callers doing those must call invalidate_payroll_previews() themselves.
+
+@receiver(post_save, sender='HR.Attendance')
+@receiver(post_delete, sender='HR.Attendance')
+@receiver(post_save, sender='HR.LeaveRequest')
+@receiver(post_delete, sender='HR.LeaveRequest')
+@receiver(post_save, sender='HR.LateRequest')
+@receiver(post_delete, sender='HR.LateRequest')
+@receiver(post_save, sender='HR.EarlyRequest')
+@receiver(post_delete, sender='HR.EarlyRequest')
+@receiver(post_save, sender='HR.EmployeeLeaveBalance')
+@receiver(post_delete, sender='HR.EmployeeLeaveBalance')
+@receiver(post_save, sender='HR.PenaltyDecision')
+@receiver(post_delete, sender='HR.PenaltyDecision')
+def invalidate_previews_for_user(sender, instance, **kwargs):
+    invalidate_payroll_previews(user_id=instance.user_id)
+
+
+@receiver(post_save, sender='employee_management.Employee')
+@receiver(post_delete, sender='employee_management.Employee')
+def invalidate_previews_for_employee(sender, instance, **kwargs):
+    invalidate_payroll_previews(employee_id=instance.pk)
+
+
+@receiver(post_save, sender=Payroll)
+@receiver(post_delete, sender=Payroll)
+def invalidate_previews_for_payroll(sender, instance, **kwargs):
+    invalidate_payroll_previews(employee_id=instance.employee_id)
+
+
+@receiver(post_save, sender=PayrollAllowance)
+@receiver(post_delete, sender=PayrollAllowance)
+@receiver(post_save, sender=PayrollDeduction)
+@receiver(post_delete, sender=PayrollDeduction)
+def invalidate_previews_for_payroll_item(sender, instance, **kwargs):
+    try:
+        employee_id = instance.payroll.employee_id
+    except Payroll.DoesNotExist:
+        # Cascade delete; the Payroll delete already invalidated
+        return
+    invalidate_payroll_previews(employee_id=employee_id)
+
+
+@receiver(post_save, sender='HR.Holiday')
+@receiver(post_delete, sender='HR.Holiday')
+@receiver(post_save, sender=AutomationRule)
+@receiver(post_delete, sender=AutomationRule)
+@receiver(post_save, sender='master.LeaveMaster')
+@receiver(post_delete, sender='master.LeaveMaster')
+def invalidate_all_previews(sender, instance, **kwargs):
+    invalidate_payroll_previews()
+
+
+# ============================================================================
+# LEAVE USAGE
+# ============================================================================
+
+@receiver(post_delete, sender=Payroll)
+def release_payroll_leave_usage(sender, instance, **kwargs):
+    if not instance.leave_usage:
+        return
+    try:
+        user_id = instance.employee.user_id
+    except ObjectDoesNotExist:
+        # Employee deleted too
+        return
+    PayrollCalculationService.release_leave_usage(user_id, instance.year, instance.leave_usage)
+
+
+# ============================================================================
+# PAYSLIP CACHE CLEANUP
+# ============================================================================
+# Cached payslips are content-addressed, so a changed payroll can never be
+# served stale; this only removes files nothing will ask for again.
+
+@receiver(post_save, sender=Payroll)
+@receiver(post_delete, sender=Payroll)
+def delete_cached_payslips_for_payroll(sender, instance, **kwargs):
+    employee_id, payroll_id = instance.employee_id, instance.pk
+    transaction.on_commit(lambda: invalidate_payslips(employee_id, payroll_id))
+
+
+@receiver(post_save, sender=PayrollAllowance)
+@receiver(post_delete, sender=PayrollAllowance)
+@receiver(post_save, sender=PayrollDeduction)
+@receiver(post_delete, sender=PayrollDeduction)
+def delete_cached_payslips_for_payroll_item(sender, instance, **kwargs):
+    try:
+        employee_id = instance.payroll.employee_id
+    except Payroll.DoesNotExist:
+        return
+    payroll_id = instance.payroll_id
+    transaction.on_commit(lambda: invalidate_payslips(employee_id, payroll_id))
+
+
+@receiver(post_save, sender='employee_management.Employee')
+def delete_cached_payslips_for_employee(sender, instance, created, **kwargs):
+    # Name and designation are printed on every payslip
+    if not created:
+        employee_id = instance.pk
+        transaction.on_commit(lambda: invalidate_payslips(employee_id))
+
+
+# ============================================================================
+# PAYROLL STATISTICS
+# ============================================================================
+# The previous values are read in pre_save so post_save can apply the
+# difference. save_payroll_chunk's bulk upsert applies its own delta.
+
+@receiver(pre_save, sender=Payroll)
+def remember_payroll_statistics(sender, instance, **kwargs):
+    instance._statistics_before = None
+    if instance.pk:
+        instance._statistics_before = Payroll.objects.filter(pk=instance.pk).values_list(
+            'status', 'month', 'employee_id', 'allowances', 'deductions'
+        ).first()
+
+
+@receiver(post_save, sender=Payroll)
+def update_statistics_for_payroll(sender, instance, **kwargs):
+    delta = StatisticsDelta()
+    before = getattr(instance, '_statistics_before', None)
+    if before:
+        delta.add_payroll(*before, sign=-1)
+    delta.add_payroll(*payroll_statistics_values(instance))
+    delta.apply()
+
+
+@receiver(post_delete, sender=Payroll)
+def remove_payroll_statistics(sender, instance, **kwargs):
+    delta = StatisticsDelta()
+    delta.add_payroll(*payroll_statistics_values(instance), sign=-1)
+    delta.apply()
+
+
+@receiver(pre_save, sender=PayrollAllowance)
+@receiver(pre_save, sender=PayrollDeduction)
+def remember_item_statistics(sender, instance, **kwargs):
+    instance._statistics_before = None
+    if instance.pk:
+        instance._statistics_before = sender.objects.filter(pk=instance.pk).values_list('amount', flat=True).first()
+
+
+@receiver(post_save, sender=PayrollAllowance)
+@receiver(post_save, sender=PayrollDeduction)
+def update_statistics_for_item(sender, instance, created, **kwargs):
+    delta = StatisticsDelta()
+    before = getattr(instance, '_statistics_before', None)
+    if before is not None:
+        delta.add_item(ITEM_KEYS[sender], before, sign=-1)
+    delta.add_item(ITEM_KEYS[sender], instance.amount)
+    delta.apply()
+
+
+@receiver(post_delete, sender=PayrollAllowance)
+@receiver(post_delete, sender=PayrollDeduction)
+def remove_item_statistics(sender, instance, **kwargs):
+    delta = StatisticsDelta()
+    delta.add_item(ITEM_KEYS[sender], instance.amount, sign=-1)
+    delta.apply()
@@ -0,0 +1,282 @@
+# payroll/simulation.py
+"""
+Vectorized payroll what-if simulation.
+
+Loads, for every payroll employee, the base salary, the paid/working days
+and allowance/deduction totals of a finalized month (Payroll rows) and the
+month's late/early/missed penalty counts into NumPy arrays, then applies
+hypothetical salary increments and AutomationRule settings to the whole
+organization at once. Nothing is written.
+
+Penalties follow calculate_attendance_penalty_deduction: a type is charged
+once when its occurrences exceed the grace period and at least one was
+deducted. Leave penalties are not rule-driven and are left out. Employees
+without a Payroll row for the month are assumed to have worked every one of
+DEFAULT_WORKING_DAYS days with no allowances or deductions.
+
+NumPy is an optional dependency; simulation_available() is False without it.
+"""
+
+import time
+from decimal import Decimal
+
+try:
+    import numpy as np
+except ImportError:  # optional: only the simulator needs it
+    np = None
+
+from django.db.models import Sum
+
+from payroll.models import Payroll, PayrollDeduction
+from payroll.payroll_run import PENALTY_DEDUCTION_TYPE, payroll_employees
+
+DEFAULT_WORKING_DAYS = 22
+PENALTY_TYPES = ('late', 'early', 'missed')
+
+
+def simulation_available():
+    return np is not None
+
+
+class SimulationInputs:
+    """Per-employee arrays (aligned by position) plus department membership."""
+
+    def __init__(self, **arrays):
+        self.__dict__.update(arrays)
+
+    def __len__(self):
+        return len(self.employee_ids)
+
+
+def load_simulation_inputs(month, year):
+    """Read everything the simulation needs for `month`/`year` (a handful of queries)."""
+    from cv_management.models import Department
+    from employee_management.models import Employee
+    from payroll.services import PayrollCalculationService
+
+    month_number = PayrollCalculationService.MONTH_NAME_TO_NUMBER[month]
+    # Filtered by subquery: thousands of literal ids cost more to build than to run
+    employees = payroll_employees()
+    rows = list(employees.values_list('id', 'user_id', 'basic_salary'))
+    count = len(rows)
+    index = {employee_id: position for position, (employee_id, _, _) in enumerate(rows)}
+
+    salary = np.array([float(basic_salary or 0) for _, _, basic_salary in rows], dtype=np.float64)
+    paid_days = np.full(count, DEFAULT_WORKING_DAYS, dtype=np.float64)
+    working_days = np.full(count, DEFAULT_WORKING_DAYS, dtype=np.float64)
+    allowances = np.zeros(count, dtype=np.float64)
+    other_deductions = np.zeros(count, dtype=np.float64)
+    has_payroll = np.zeros(count, dtype=bool)
+
+    payrolls = Payroll.objects.filter(month=month, year=year).values_list(
+        'employee_id', 'attendance_days', 'working_days', 'allowances', 'deductions'
+    )
+    for employee_id, attendance_days, days, allowance_total, deduction_total in payrolls:
+        position = index.get(employee_id)
+        if position is None:
+            continue
+        paid_days[position] = attendance_days
+        working_days[position] = days
+        allowances[position] = float(allowance_total)
+        other_deductions[position] = float(deduction_total)
+        has_payroll[position] = True
+
+    # Payroll.deductions includes the attendance penalty; the simulation recomputes it
+    penalties = (
+        PayrollDeduction.objects.filter(
+            payroll__month=month, payroll__year=year, deduction_type=PENALTY_DEDUCTION_TYPE
+        ).order_by().values('payroll__employee_id').annotate(total=Sum('amount'))
+        .values_list('payroll__employee_id', 'total')
+    )
+    for employee_id, total in penalties:
+        if employee_id in index:
+            other_deductions[index[employee_id]] -= float(total)
+
+    counts = PayrollCalculationService.get_penalty_counts_bulk(
+        employees.order_by().values_list('user_id', flat=True), year, month_number
+    )
+    count_fields = ('late_approved', 'late_rejected', 'early_approved', 'early_rejected',
+                    'missed_reviewed', 'missed_deducted')
+    penalty_counts = {field: np.zeros(count, dtype=np.int64) for field in count_fields}
+    for position, (_, user_id, _) in enumerate(rows):
+        user_counts = counts.get(user_id)
+        if user_counts:
+            for field in count_fields:
+                penalty_counts[field][position] = getattr(user_counts, field)
+
+    # Each employee is reported under their first department (by id); 0 = unassigned
+    membership = Employee.department.through.objects.values_list('employee_id', 'department_id')
+    members = {}
+    primary = np.zeros(count, dtype=np.int64)
+    for employee_id, department_id in membership:
+        position = index.get(employee_id)
+        if position is None:
+            continue
+        members.setdefault(department_id, []).append(employee_id)
+        if not primary[position] or department_id < primary[position]:
+            primary[position] = department_id
+    department_names = dict(Department.objects.filter(id__in=members.keys()).values_list('id', 'name'))
+
+    return SimulationInputs(
+        month=month,
+        year=year,
+        employee_ids=np.array([employee_id for employee_id, _, _ in rows], dtype=np.int64),
+        salary=salary,
+        paid_days=paid_days,
+        working_days=working_days,
+        allowances=allowances,
+        other_deductions=other_deductions,
+        has_payroll=has_payroll,
+        department=primary,
+        department_members={key: np.array(value, dtype=np.int64) for key, value in members.items()},
+        department_names=department_names,
+        **penalty_counts,
+    )
+
+
+def current_rules():
+    """Active AutomationRule settings as simulation rule dicts."""
+    from payroll.rule_set import get_rule_set
+
+    rule_set = get_rule_set()
+    rules = {}
+    for rule_type in PENALTY_TYPES:
+        rule = getattr(rule_set, rule_type)
+        rules[rule_type] = {
+            'deduct_salary': bool(rule and rule.deduct_salary),
+            'deduction_type': rule.deduction_type if rule else None,
+            'deduction_amount': float(rule.deduction_amount) if rule else 0.0,
+            'grace': rule_set.missed_grace if rule_type == 'missed' else rule_set.grace(rule_type),
+        }
+    return rules
+
+
+def apply_rule_overrides(rules, overrides):
+    """Copy of `rules` with hypothetical settings ({rule_type: {field: value}}) applied."""
+    simulated = {rule_type: dict(rule) for rule_type, rule in rules.items()}
+    for rule_type, override in (overrides or {}).items():
+        rule = simulated[rule_type]
+        for field in ('deduct_salary', 'deduction_type'):
+            if field in override:
+                rule[field] = override[field]
+        if 'deduction_amount' in override:
+            rule['deduction_amount'] = float(override['deduction_amount'])
+        if 'max_occurrences' in override:
+            default = 1 if rule_type == 'missed' else 0
+            rule['grace'] = int(override['max_occurrences'] or default)
+    return simulated
+
+
+def apply_increments(inputs, increments):
+    """Salary array after hypothetical increments, applied in order."""
+    salary = inputs.salary.copy()
+    for increment in increments or ():
+        mask = np.ones(len(inputs), dtype=bool)
+        if increment.get('department_id') is not None:
+            members = inputs.department_members.get(increment['department_id'], np.array([], dtype=np.int64))
+            mask &= np.isin(inputs.employee_ids, members)
+        if increment.get('employee_ids'):
+            mask &= np.isin(inputs.employee_ids, np.array(increment['employee_ids'], dtype=np.int64))
+        percent = float(increment.get('percent') or 0)
+        amount = float(increment.get('amount') or 0)
+        salary[mask] = salary[mask] * (1 + percent / 100) + amount
+    return salary
+
+
+def penalty_deductions(inputs, salary, rules):
+    """Attendance penalty per employee for `salary` under `rules`."""
+    approved = {'late': inputs.late_approved, 'early': inputs.early_approved, 'missed': inputs.missed_deducted}
+    occurrences = {
+        'late': inputs.late_approved + inputs.late_rejected,
+        'early': inputs.early_approved + inputs.early_rejected,
+        'missed': inputs.missed_reviewed,
+    }
+    daily_rate = salary / np.where(inputs.working_days > 0, inputs.working_days, DEFAULT_WORKING_DAYS)
+
+    total = np.zeros(len(inputs), dtype=np.float64)
+    for rule_type in PENALTY_TYPES:
+        rule = rules[rule_type]
+        if not rule['deduct_salary']:
+            continue
+        # Charged once per type when the grace period is exhausted
+        charged = ((occurrences[rule_type] > rule['grace']) & (approved[rule_type] > 0)).astype(np.float64)
+        amount = rule['deduction_amount']
+        if rule['deduction_type'] == 'Fixed Amount':
+            deduction = np.full(len(inputs), amount) * charged
+        elif rule['deduction_type'] == 'Percentage Per Day':
+            deduction = daily_rate * amount / 100 * charged
+        elif rule['deduction_type'] == 'Half Day':
+            deduction = daily_rate * 0.5 * charged
+        elif rule['deduction_type'] == 'Full Day':
+            deduction = daily_rate * charged
+        else:
+            continue
+        total += np.round(deduction, 2)
+    return total
+
+
+def _net_pay(inputs, salary, penalties):
+    earned = np.where(inputs.working_days > 0, salary / np.maximum(inputs.working_days, 1), 0) * inputs.paid_days
+    gross = earned + inputs.allowances
+    return gross, gross - inputs.other_deductions - penalties
+
+
+def simulate_payroll(inputs, increments=None, rule_overrides=None, months=1):
+    """
+    Baseline vs simulated payroll totals per department and for the
+    organization, each multiplied by `months`.
+    """
+    started = time.perf_counter()
+    baseline_rules = current_rules()
+    simulated_rules = apply_rule_overrides(baseline_rules, rule_overrides)
+
+    baseline_penalties = penalty_deductions(inputs, inputs.salary, baseline_rules)
+    baseline_gross, baseline_net = _net_pay(inputs, inputs.salary, baseline_penalties)
+
+    salary = apply_increments(inputs, increments)
+    simulated_penalties = penalty_deductions(inputs, salary, simulated_rules)
+    simulated_gross, simulated_net = _net_pay(inputs, salary, simulated_penalties)
+
+    department_ids, groups = np.unique(inputs.department, return_inverse=True)
+    columns = {
+        'baseline_gross': baseline_gross,
+        'simulated_gross': simulated_gross,
+        'baseline_penalties': baseline_penalties,
+        'simulated_penalties': simulated_penalties,
+        'baseline_net': baseline_net,
+        'simulated_net': simulated_net,
+    }
+    sums = {
+        name: np.bincount(groups, weights=values, minlength=len(department_ids)) * months
+        for name, values in columns.items()
+    }
+    employees = np.bincount(groups, minlength=len(department_ids))
+
+    def money(value):
+        return str(Decimal(str(float(value))).quantize(Decimal('0.01')))
+
+    departments = []
+    for position, department_id in enumerate(department_ids.tolist()):
+        row = {
+            'department_id': department_id or None,
+            'department_name': inputs.department_names.get(department_id, 'Unassigned'),
+            'employees': int(employees[position]),
+        }
+        row.update({name: money(values[position]) for name, values in sums.items()})
+        row['net_change'] = money(sums['simulated_net'][position] - sums['baseline_net'][position])
+        departments.append(row)
+
+    totals = {name: money(values.sum()) for name, values in sums.items()}
+    totals['net_change'] = money(sums['simulated_net'].sum() - sums['baseline_net'].sum())
+
+    return {
+        'month': inputs.month,
+        'year': inputs.year,
+        'months': months,
+        'employees': len(inputs),
+        'estimated_employees': int((~inputs.has_payroll).sum()),
+        'rules': {'baseline': baseline_rules, 'simulated': simulated_rules},
+        'totals': totals,
+        'departments': departments,
+        'compute_ms': round((time.perf_counter() - started) * 1000, 1),
+    }
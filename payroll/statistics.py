@@ -0,0 +1,134 @@
+# payroll/statistics.py
+"""
+Maintained payroll statistics.
+
+PayrollSettingsUniversalView shows org-wide counts, totals and the distinct
+months/employees that have payrolls. Instead of aggregating all of Payroll
+on every request, each write applies its difference to PayrollStatistic
+rows with F() increments (payroll/signals.py for model saves/deletes,
+save_payroll_chunk for its bulk upsert), and the view reads every row in a
+single query.
+
+Months and employees are kept as reference counts, so one disappears from
+the available lists only when its last payroll is deleted.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from payroll.models import Payroll, PayrollAllowance, PayrollDeduction, PayrollStatistic
+
+ITEM_KEYS = {PayrollAllowance: 'allowance_items', PayrollDeduction: 'deduction_items'}
+
+
+class StatisticsDelta:
+    """Accumulated (count, amount) changes per statistic key."""
+
+    def __init__(self):
+        self.changes = defaultdict(lambda: [0, Decimal('0.00')])
+
+    def add(self, key, count=0, amount=Decimal('0.00')):
+        change = self.changes[key]
+        change[0] += count
+        change[1] += Decimal(str(amount or 0))
+
+    def add_payroll(self, status, month, employee_id, allowances, deductions, sign=1):
+        """Count one payroll row (`sign=-1` removes it)."""
+        self.add('payrolls', sign)
+        self.add(f'status:{status}', sign)
+        self.add(f'month:{month}', sign)
+        self.add(f'employee:{employee_id}', sign)
+        self.add('payroll_allowances', amount=sign * Decimal(str(allowances or 0)))
+        self.add('payroll_deductions', amount=sign * Decimal(str(deductions or 0)))
+
+    def add_item(self, key, amount, sign=1):
+        self.add(key, sign, sign * Decimal(str(amount or 0)))
+
+    def apply(self):
+        """Write the changes as F() increments, creating missing keys."""
+        now = timezone.now()
+        # Fixed key order so concurrent writers lock rows in the same order
+        for key in sorted(self.changes):
+            count, amount = self.changes[key]
+            if not count and not amount:
+                continue
+            if _increment(key, count, amount, now):
+                continue
+            try:
+                with transaction.atomic():
+                    PayrollStatistic.objects.create(key=key, count=count, amount=amount)
+            except IntegrityError:
+                # Created concurrently
+                _increment(key, count, amount, now)
+        self.changes.clear()
+
+
+def _increment(key, count, amount, now):
+    return PayrollStatistic.objects.filter(key=key).update(
+        count=F('count') + count,
+        amount=F('amount') + amount,
+        updated_at=now,
+    )
+
+
+def payroll_statistics_values(payroll):
+    """(status, month, employee_id, allowances, deductions) of a Payroll."""
+    return payroll.status, payroll.month, payroll.employee_id, payroll.allowances, payroll.deductions
+
+
+def get_payroll_statistics():
+    """Summary, available months and employee ids, from one query."""
+    rows = PayrollStatistic.objects.filter(~Q(count=0) | ~Q(amount=0)).values_list('key', 'count', 'amount')
+    counts = {}
+    amounts = {}
+    for key, count, amount in rows:
+        counts[key] = count
+        amounts[key] = amount
+
+    def total(key):
+        return (amounts.get(key) or Decimal('0.00')).quantize(Decimal('0.01'))
+
+    summary = {
+        'payroll_count': counts.get('payrolls', 0),
+        'paid_count': counts.get('status:Paid', 0),
+        'pending_count': counts.get('status:Pending', 0),
+        'cancelled_count': counts.get('status:Cancelled', 0),
+        'total_allowances': str(total('payroll_allowances')),
+        'total_deductions': str(total('payroll_deductions')),
+        'allowance_items_total': str(total('allowance_items')),
+        'deduction_items_total': str(total('deduction_items')),
+    }
+    months = sorted(key.split(':', 1)[1] for key, count in counts.items() if key.startswith('month:') and count > 0)
+    employee_ids = sorted(
+        int(key.split(':', 1)[1]) for key, count in counts.items() if key.startswith('employee:') and count > 0
+    )
+    return summary, months, employee_ids
+
+
+def rebuild_payroll_statistics():
+    """Recompute every statistic from Payroll and its items. Returns the row count."""
+    payrolls = Payroll.objects.order_by()
+    totals = payrolls.aggregate(count=Count('id'), allowances=Sum('allowances'), deductions=Sum('deductions'))
+    stats = {
+        'payrolls': (totals['count'], Decimal('0.00')),
+        'payroll_allowances': (0, totals['allowances'] or Decimal('0.00')),
+        'payroll_deductions': (0, totals['deductions'] or Decimal('0.00')),
+    }
+    for field, prefix in (('status', 'status'), ('month', 'month'), ('employee_id', 'employee')):
+        for value, count in payrolls.values(field).annotate(count=Count('id')).values_list(field, 'count'):
+            stats[f'{prefix}:{value}'] = (count, Decimal('0.00'))
+    for model, key in ITEM_KEYS.items():
+        items = model.objects.aggregate(count=Count('id'), amount=Sum('amount'))
+        stats[key] = (items['count'], items['amount'] or Decimal('0.00'))
+
+    with transaction.atomic():
+        PayrollStatistic.objects.all().delete()
+        PayrollStatistic.objects.bulk_create([
+            PayrollStatistic(key=key, count=count, amount=amount)
+            for key, (count, amount) in stats.items()
+        ])
+    return len(stats)
@@ -0,0 +1,165 @@
+# payroll/summary_export.py
+"""
+Per-employee attendance summaries for get_all_employees_attendance_summary.
+
+The JSON response collects every summary; the streaming formats
+(?format=ndjson / ?format=csv) write each employee's line as soon as it is
+computed, reading employees from the database in chunks, so the first byte
+goes out immediately and memory stays flat however many employees match.
+"""
+
+import csv
+import json
+import logging
+
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from payroll.services import PayrollCalculationService
+
+logger = logging.getLogger(__name__)
+
+# Employees fetched per database round trip while streaming
+STREAM_CHUNK_SIZE = 200
+
+CSV_COLUMNS = [
+    ('employee_id', ('employee_id',)),
+    ('employee_name', ('employee_name',)),
+    ('department', ('department',)),
+    ('designation', ('designation',)),
+    ('base_salary', ('base_salary',)),
+    ('total_working_days', ('attendance_summary', 'total_working_days')),
+    ('full_days', ('attendance_summary', 'full_days')),
+    ('half_days', ('attendance_summary', 'half_days')),
+    ('wfh_days', ('attendance_summary', 'wfh_days')),
+    ('casual_leave', ('attendance_summary', 'casual_leave')),
+    ('sick_leave', ('attendance_summary', 'sick_leave')),
+    ('special_leave', ('attendance_summary', 'special_leave')),
+    ('unpaid_leave', ('attendance_summary', 'unpaid_leave')),
+    ('not_marked', ('attendance_summary', 'not_marked')),
+    ('effective_paid_days', ('attendance_summary', 'effective_paid_days')),
+    ('casual_remaining', ('leave_balance', 'casual_remaining')),
+    ('sick_remaining', ('leave_balance', 'sick_remaining')),
+    ('special_remaining', ('leave_balance', 'special_remaining')),
+    ('attendance_percentage', ('attendance_percentage',)),
+]
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Newline-delimited JSON; streamed responses bypass it, errors use it."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return (json.dumps(data, cls=JSONEncoder) + '\n').encode()
+
+
+class CSVRenderer(BaseRenderer):
+    """CSV; streamed responses bypass it, errors are written as key,value rows."""
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        buffer = _EchoBuffer()
+        writer = csv.writer(buffer)
+        items = data.items() if isinstance(data, dict) else [('detail', data)]
+        return ''.join(writer.writerow([key, value]) for key, value in items).encode()
+
+
+class _EchoBuffer:
+    """File-like object whose write() returns the text, for streaming csv.writer output."""
+
+    def write(self, value):
+        return value
+
+
+def _employee_name(employee):
+    return (
+        employee.get_full_name() if hasattr(employee, 'get_full_name') and callable(employee.get_full_name)
+        else getattr(employee, 'full_name', None)
+        or getattr(employee, 'name', None)
+        or f'Employee_{employee.id}'
+    )
+
+
+def _department_names(employee):
+    # Prefetched by the caller; an employee may belong to several departments
+    names = [department.name for department in employee.department.all() if department.name]
+    return ', '.join(names) or None
+
+
+def employee_attendance_summary(employee, year, month_number):
+    """Attendance summary of one employee for a month."""
+    attendance_data = PayrollCalculationService.get_cached_employee_payroll_data(
+        employee=employee,
+        year=int(year),
+        month=month_number
+    )
+    base_salary = PayrollCalculationService.get_employee_salary(employee)
+
+    return {
+        'employee_id': employee.id,
+        'employee_name': _employee_name(employee),
+        'department': _department_names(employee),
+        'designation': getattr(employee, 'designation', None),
+        'base_salary': float(base_salary),
+
+        'attendance_summary': {
+            'total_working_days': attendance_data['total_working_days'],
+            'full_days': attendance_data['full_days_worked'],
+            'half_days': attendance_data['half_days_worked'],
+            'wfh_days': attendance_data['wfh_days'],
+            'casual_leave': attendance_data['casual_leave_days'],
+            'sick_leave': attendance_data['sick_leave_days'],
+            'special_leave': attendance_data['special_leave_days'],
+            'unpaid_leave': attendance_data['unpaid_leave_days'],
+            'not_marked': attendance_data['not_marked_days'],
+            'effective_paid_days': attendance_data['effective_paid_days'],
+        },
+
+        'leave_balance': {
+            'casual_remaining': attendance_data['leave_balance']['casual_remaining'],
+            'sick_remaining': attendance_data['leave_balance']['sick_remaining'],
+            'special_remaining': attendance_data['leave_balance']['special_remaining'],
+        },
+
+        'attendance_percentage': round(
+            (attendance_data['effective_paid_days'] / attendance_data['total_working_days'] * 100)
+            if attendance_data['total_working_days'] > 0 else 0,
+            2
+        ),
+    }
+
+
+def iter_attendance_summaries(employees_qs, year, month_number, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield each employee's summary, reading employees `chunk_size` at a time; failures are skipped."""
+    employees = employees_qs.select_related('user').prefetch_related('department')
+    for employee in employees.iterator(chunk_size=chunk_size):
+        try:
+            yield employee_attendance_summary(employee, year, month_number)
+        except Exception as e:
+            logger.warning(f"[ATTENDANCE SUMMARY] Skipping employee {employee.id}: {e}")
+
+
+def stream_summaries_ndjson(employees_qs, year, month_number):
+    for summary in iter_attendance_summaries(employees_qs, year, month_number):
+        yield json.dumps(summary, cls=JSONEncoder) + '\n'
+
+
+def stream_summaries_csv(employees_qs, year, month_number):
+    writer = csv.writer(_EchoBuffer())
+    yield writer.writerow([header for header, _ in CSV_COLUMNS])
+    for summary in iter_attendance_summaries(employees_qs, year, month_number):
+        row = []
+        for _, path in CSV_COLUMNS:
+            value = summary
+            for key in path:
+                value = value.get(key) if isinstance(value, dict) else None
+            row.append('' if value is None else value)
+        yield writer.writerow(row)
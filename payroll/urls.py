@@ -6,8 +6,10 @@ from .views import (
     PayrollViewSet,
     PayrollAllowanceViewSet,
     PayrollSettingsUniversalView,
+    PayrollSimulationView,
     SalaryIncrementViewSet,
     AutomationRuleViewSet,
+    PayrollRunViewSet,
     DeductionListView,
     AllowanceListView,
     AddDeductionView,
@@ -22,6 +24,7 @@ router.register(r'', PayrollViewSet, basename='payroll')
 router.register(r'allowances', PayrollAllowanceViewSet, basename='payroll-allowances')
 router.register(r'salary-increments', SalaryIncrementViewSet, basename='salary-increments')
 router.register(r'automation-rules', AutomationRuleViewSet, basename='automation-rules')
+router.register(r'runs', PayrollRunViewSet, basename='payroll-runs')
 
 urlpatterns = [
     # ==================== AUTOMATION RULES ENDPOINTS ====================
@@ -35,6 +38,11 @@ urlpatterns = [
     path('automation-rules/<int:pk>/toggle_active/', AutomationRuleViewSet.as_view({'post': 'toggle_active'}), name='automation-rules-toggle'),
     path('automation-rules/by_type/<str:rule_type>/', AutomationRuleViewSet.as_view({'get': 'by_type'}), name='automation-rules-by-type'),
     
+    # ==================== PAYROLL RUN ENDPOINTS ====================
+    path('runs/', PayrollRunViewSet.as_view({'get': 'list', 'post': 'create'}), name='payroll-runs-list'),
+    path('runs/<int:pk>/', PayrollRunViewSet.as_view({'get': 'retrieve'}), name='payroll-runs-detail'),
+    path('runs/<int:pk>/resume/', PayrollRunViewSet.as_view({'post': 'resume'}), name='payroll-runs-resume'),
+    
     # ==================== SALARY INCREMENT ENDPOINTS ====================
     path('salary-increments/', SalaryIncrementViewSet.as_view({'get': 'list', 'post': 'create'}), name='salary-increments-list'),
     path('salary-increments/<int:pk>/', SalaryIncrementViewSet.as_view({
@@ -59,6 +67,7 @@ urlpatterns = [
     # ==================== EXISTING ENDPOINTS ====================
     # Payroll preview and payslip generation
     path('settings/universal/', PayrollSettingsUniversalView.as_view(), name='payroll-settings-universal'),
+    path('simulate/', PayrollSimulationView.as_view(), name='payroll-simulate'),
 
     path('calculate_payroll_preview/', 
          PayrollViewSet.as_view({'get': 'calculate_payroll_preview', 'post': 'calculate_payroll_preview'}), 
@@ -68,6 +77,11 @@ urlpatterns = [
          PayrollViewSet.as_view({'post': 'generate_preview_payslip'}), 
          name='generate-preview-payslip'),
     
+    # The action's kwargs carry its permission_classes, as the router would pass them
+    path('bulk_payslips/', 
+         PayrollViewSet.as_view({'get': 'bulk_payslips'}, **PayrollViewSet.bulk_payslips.kwargs), 
+         name='bulk-payslips'),
+    
     # Deductions and Allowances
     path('deductions/', DeductionListView.as_view(), name='deduction-list'),
     path('allowances/', AllowanceListView.as_view(), name='allowance-list'),
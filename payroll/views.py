@@ -1,22 +1,39 @@
 # payroll/views.py - ENHANCED WITH LEAVE INTEGRATION
 
+import time
 from datetime import datetime
 from decimal import Decimal
 
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.http import parse_etags, quote_etag
+from django.db import transaction
 from django.db.models import Sum, Q
 
-from .models import Payroll, PayrollDeduction, PayrollAllowance, SalaryIncrement, AutomationRule
+from .models import Payroll, PayrollDeduction, PayrollAllowance, SalaryIncrement, AutomationRule, PayrollRun
 from .serializers import (
     PayrollSerializer, PayrollListSerializer,
     PayrollDeductionSerializer, PayrollAllowanceSerializer,
     SalaryIncrementSerializer, SalaryIncrementListSerializer,
     AutomationRuleSerializer, AutomationRuleListSerializer,
-    generate_payslip_pdf
+    PayrollRunSerializer, PayrollSimulationSerializer,
+)
+from .payroll_run import get_or_create_payroll_run
+from .payslip_cache import get_payslip_pdf, payslip_hash
+from .payslip_export import payroll_ids_for_month, stream_payslip_zip
+from .simulation import load_simulation_inputs, simulate_payroll, simulation_available
+from .statistics import get_payroll_statistics
+from .summary_export import (
+    CSVRenderer,
+    NDJSONRenderer,
+    iter_attendance_summaries,
+    stream_summaries_csv,
+    stream_summaries_ndjson,
 )
 from .services import PayrollCalculationService
 from employee_management.models import Employee
@@ -112,8 +129,8 @@ class PayrollViewSet(viewsets.ModelViewSet):
             deductions = deductions_total
 
         try:
-            # Calculate comprehensive payroll preview
-            preview = PayrollCalculationService.calculate_preview(
+            # Calculate comprehensive payroll preview (memoized; previews never write)
+            preview = PayrollCalculationService.get_cached_preview(
                 employee=employee,
                 month=month,
                 year=int(year),
@@ -273,8 +290,8 @@ class PayrollViewSet(viewsets.ModelViewSet):
             else:
                 PayrollDeduction.objects.filter(payroll=payroll, deduction_type='ATTENDANCE PENALTY').delete()
             
-            # Generate PDF
-            pdf = generate_payslip_pdf(payroll)
+            # Generate PDF (or reuse the stored render)
+            pdf, _ = get_payslip_pdf(payroll)
             
             # Return PDF response
             response = HttpResponse(pdf, content_type='application/pdf')
@@ -336,7 +353,9 @@ class PayrollViewSet(viewsets.ModelViewSet):
             except Exception:
                 pass
 
-        # Calculate using service
+        # Calculate using service - uncached: each worker has its own cache and
+        # signal invalidation only reaches the one that handled the write, so a
+        # memoized preview could be stale when saved and committed to balances
         preview = PayrollCalculationService.calculate_preview(
             employee=employee,
             month=month,
@@ -347,6 +366,8 @@ class PayrollViewSet(viewsets.ModelViewSet):
         )
         penalty_info = preview.get('penalty_deduction', {}) or {}
         penalty_amount = Decimal(str(penalty_info.get('amount', 0) or 0))
+        leave_usage = preview['attendance_breakdown']['this_month_usage']
+        previous_leave_usage = payroll_obj.leave_usage if payroll_obj else {}
 
         # Create or update payroll
         payroll_vals = {
@@ -359,26 +380,36 @@ class PayrollViewSet(viewsets.ModelViewSet):
             'deductions': Decimal(str(preview['salary_calculation']['deductions'])),
             'tax': Decimal(str(preview['salary_calculation']['tax'])),
             'net_pay': Decimal(str(preview['salary_calculation']['net_pay'])),
+            'leave_usage': leave_usage,
         }
 
-        payroll_obj, created = Payroll.objects.update_or_create(
-            employee=employee, 
-            month=month, 
-            year=int(year), 
-            defaults=payroll_vals
-        )
-
-        if penalty_amount > 0:
-            PayrollDeduction.objects.update_or_create(
-                payroll=payroll_obj,
-                deduction_type='ATTENDANCE PENALTY',
-                defaults={
-                    'amount': penalty_amount,
-                    'description': f'Attendance penalties for {month} {year}',
-                }
+        # Finalizing commits this month's leave usage to the balance
+        with transaction.atomic():
+            payroll_obj, created = Payroll.objects.update_or_create(
+                employee=employee, 
+                month=month, 
+                year=int(year), 
+                defaults=payroll_vals
             )
-        else:
-            PayrollDeduction.objects.filter(payroll=payroll_obj, deduction_type='ATTENDANCE PENALTY').delete()
+
+            if penalty_amount > 0:
+                PayrollDeduction.objects.update_or_create(
+                    payroll=payroll_obj,
+                    deduction_type='ATTENDANCE PENALTY',
+                    defaults={
+                        'amount': penalty_amount,
+                        'description': f'Attendance penalties for {month} {year}',
+                    }
+                )
+            else:
+                PayrollDeduction.objects.filter(payroll=payroll_obj, deduction_type='ATTENDANCE PENALTY').delete()
+
+            if employee.user_id:
+                PayrollCalculationService.commit_leave_usage(
+                    int(year),
+                    PayrollCalculationService.MONTH_NAME_TO_NUMBER[month],
+                    {employee.user_id: (leave_usage, previous_leave_usage)}
+                )
 
         serializer = PayrollSerializer(payroll_obj)
         return Response(
@@ -393,10 +424,21 @@ class PayrollViewSet(viewsets.ModelViewSet):
         """
         try:
             payroll = self.get_object()
-            pdf = generate_payslip_pdf(payroll)
+
+            # The content hash is the ETag: unchanged payslips cost no read at all
+            digest = payslip_hash(payroll)
+            etag = quote_etag(digest)
+            if etag in parse_etags(request.headers.get('If-None-Match', '')):
+                response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+                response['ETag'] = etag
+                return response
+
+            pdf, _ = get_payslip_pdf(payroll, digest)
             
             response = HttpResponse(pdf, content_type='application/pdf')
             response['Content-Disposition'] = f'attachment; filename="payslip_{payroll.employee.id}_{payroll.month}_{payroll.year}.pdf"'
+            response['ETag'] = etag
+            response['Cache-Control'] = 'private, no-cache'
             
             return response
             
@@ -405,6 +447,43 @@ class PayrollViewSet(viewsets.ModelViewSet):
                 'error': f'Failed to generate payslip: {str(e)}'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(
+        detail=False, methods=['get'], url_path='bulk_payslips',
+        permission_classes=[permissions.IsAuthenticated, permissions.IsAdminUser],
+    )
+    def bulk_payslips(self, request):
+        """
+        Download every payslip of a month as a streamed ZIP (staff only)
+        GET /api/payroll/bulk_payslips/?month=November&year=2025[&employee_ids=1,2,3]
+        """
+        month = request.query_params.get('month')
+        year = request.query_params.get('year')
+        if not month or not year:
+            return Response({
+                'error': 'month and year are required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            year = int(year)
+            employee_ids = [
+                int(value) for value in request.query_params.get('employee_ids', '').split(',') if value.strip()
+            ]
+        except ValueError:
+            return Response({
+                'error': 'year and employee_ids must be numbers'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        payroll_ids = payroll_ids_for_month(month, year, employee_ids)
+        if not payroll_ids:
+            return Response({
+                'error': f'No payrolls found for {month} {year}'
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        # Rendered in-process: the pool is for export_payslips, not web workers
+        response = StreamingHttpResponse(stream_payslip_zip(payroll_ids, workers=1), content_type='application/zip')
+        response['Content-Disposition'] = f'attachment; filename="payslips_{month}_{year}.zip"'
+        return response
+
 
 # Keep existing views
 class DeductionListView(APIView):
@@ -668,22 +747,8 @@ class PayrollSettingsUniversalView(APIView):
             }, status=status.HTTP_404_NOT_FOUND)
 
         latest_payrolls = [self._serialize_payroll(item) for item in payroll_qs.order_by('-year', '-created_at')[:5]]
-        payroll_count = Payroll.objects.count()
-        total_allowances = Payroll.objects.aggregate(total=Sum('allowances'))['total'] or Decimal('0.00')
-        total_deductions = Payroll.objects.aggregate(total=Sum('deductions'))['total'] or Decimal('0.00')
-        allowance_items_total = PayrollAllowance.objects.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-        deduction_items_total = PayrollDeduction.objects.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-
-        summary = {
-            'payroll_count': payroll_count,
-            'paid_count': Payroll.objects.filter(status='Paid').count(),
-            'pending_count': Payroll.objects.filter(status='Pending').count(),
-            'cancelled_count': Payroll.objects.filter(status='Cancelled').count(),
-            'total_allowances': str(total_allowances),
-            'total_deductions': str(total_deductions),
-            'allowance_items_total': str(allowance_items_total),
-            'deduction_items_total': str(deduction_items_total),
-        }
+        # Maintained incrementally (payroll/statistics.py): one query
+        summary, available_months, available_employee_ids = get_payroll_statistics()
 
         data = {
             'resolved_by': resolved_by,
@@ -696,12 +761,8 @@ class PayrollSettingsUniversalView(APIView):
                 'month': month,
                 'year': year,
             },
-            'available_months': list(
-                Payroll.objects.order_by('month').values_list('month', flat=True).distinct()
-            ),
-            'available_employee_ids': list(
-                Payroll.objects.order_by('employee_id').values_list('employee_id', flat=True).distinct()
-            ),
+            'available_months': available_months,
+            'available_employee_ids': available_employee_ids,
         }
 
         return Response({
@@ -711,6 +772,51 @@ class PayrollSettingsUniversalView(APIView):
         })
 
 
+class PayrollSimulationView(APIView):
+    """
+    What-if payroll simulation (read-only).
+
+    POST /api/payroll/simulate/
+    {
+        "month": "November", "year": 2025,      # baseline month
+        "months": 3,                             # projection length
+        "increments": [{"department_id": 4, "percent": 7}],
+        "rules": {"late": {"deduction_type": "Full Day", "max_occurrences": 1}}
+    }
+
+    Returns baseline vs simulated gross, penalties and net pay per department.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        if not simulation_available():
+            return Response({
+                'success': False,
+                'message': 'Payroll simulation requires NumPy, which is not installed',
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        serializer = PayrollSimulationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+
+        started = time.perf_counter()
+        inputs = load_simulation_inputs(params['month'], params['year'])
+        load_ms = round((time.perf_counter() - started) * 1000, 1)
+        result = simulate_payroll(
+            inputs,
+            increments=params['increments'],
+            rule_overrides=params['rules'],
+            months=params['months'],
+        )
+        result['load_ms'] = load_ms
+
+        return Response({
+            'success': True,
+            'message': 'Payroll simulation completed',
+            'data': result,
+        })
+
+
 class DebugRoutesView(APIView):
     """Return which named routes resolve successfully for payroll endpoints."""
     permission_classes = [permissions.AllowAny]
@@ -739,7 +845,7 @@ class DebugRoutesView(APIView):
 
 # payroll/views.py - ADD THIS TO YOUR EXISTING VIEWS FILE
 
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
@@ -791,7 +897,7 @@ def get_attendance_summary_for_payroll(request):
     try:
         # Get comprehensive attendance data
         try:
-            attendance_data = PayrollCalculationService.calculate_employee_payroll_data(
+            attendance_data = PayrollCalculationService.get_cached_employee_payroll_data(
                 employee=employee,
                 year=int(year),
                 month=month_number
@@ -943,6 +1049,7 @@ def get_attendance_summary_for_payroll(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@renderer_classes([JSONRenderer, BrowsableAPIRenderer, NDJSONRenderer, CSVRenderer])
 def get_all_employees_attendance_summary(request):
     """
     Get attendance summary for ALL employees for a specific month/year
@@ -951,6 +1058,8 @@ def get_all_employees_attendance_summary(request):
     - month: Required - Month name (e.g., "November")
     - year: Required - Year (e.g., 2024)
     - department: Optional - Filter by department
+    - format: Optional - "ndjson" or "csv" streams one line per employee as
+      soon as it is computed (default: one JSON response)
     
     Returns array of attendance summaries for all employees
     """
@@ -989,66 +1098,21 @@ def get_all_employees_attendance_summary(request):
         
         employees_qs = employees_qs.order_by('id')
         
-        summaries = []
-        
-        for employee in employees_qs:
-            try:
-                # Get attendance data for each employee
-                attendance_data = PayrollCalculationService.calculate_employee_payroll_data(
-                    employee=employee,
-                    year=int(year),
-                    month=month_number
-                )
-                
-                # Get employee name safely
-                employee_name = (
-                    employee.get_full_name() if hasattr(employee, 'get_full_name') and callable(employee.get_full_name)
-                    else getattr(employee, 'full_name', None)
-                    or getattr(employee, 'name', None)
-                    or f'Employee_{employee.id}'
-                )
-                
-                # Get base salary
-                base_salary = PayrollCalculationService.get_employee_salary(employee)
-                
-                summary = {
-                    'employee_id': employee.id,
-                    'employee_name': employee_name,
-                    'department': getattr(employee, 'department', None),
-                    'designation': getattr(employee, 'designation', None),
-                    'base_salary': float(base_salary),
-                    
-                    'attendance_summary': {
-                        'total_working_days': attendance_data['total_working_days'],
-                        'full_days': attendance_data['full_days_worked'],
-                        'half_days': attendance_data['half_days_worked'],
-                        'wfh_days': attendance_data['wfh_days'],
-                        'casual_leave': attendance_data['casual_leave_days'],
-                        'sick_leave': attendance_data['sick_leave_days'],
-                        'special_leave': attendance_data['special_leave_days'],
-                        'unpaid_leave': attendance_data['unpaid_leave_days'],
-                        'not_marked': attendance_data['not_marked_days'],
-                        'effective_paid_days': attendance_data['effective_paid_days'],
-                    },
-                    
-                    'leave_balance': {
-                        'casual_remaining': attendance_data['leave_balance']['casual_remaining'],
-                        'sick_remaining': attendance_data['leave_balance']['sick_remaining'],
-                        'special_remaining': attendance_data['leave_balance']['special_remaining'],
-                    },
-                    
-                    'attendance_percentage': round(
-                        (attendance_data['effective_paid_days'] / attendance_data['total_working_days'] * 100)
-                        if attendance_data['total_working_days'] > 0 else 0,
-                        2
-                    ),
-                }
-                
-                summaries.append(summary)
-                
-            except Exception as e:
-                print(f"Error calculating for employee {employee.id}: {e}")
-                continue
+        stream_format = request.query_params.get('format')
+        if stream_format in ('ndjson', 'csv'):
+            if stream_format == 'ndjson':
+                stream = stream_summaries_ndjson(employees_qs, int(year), month_number)
+                content_type = 'application/x-ndjson'
+            else:
+                stream = stream_summaries_csv(employees_qs, int(year), month_number)
+                content_type = 'text/csv'
+            response = StreamingHttpResponse(stream, content_type=content_type)
+            response['Content-Disposition'] = f'attachment; filename="attendance_summary_{month}_{year}.{stream_format}"'
+            # Let nginx pass each line through instead of buffering the whole body
+            response['X-Accel-Buffering'] = 'no'
+            return response
+
+        summaries = list(iter_attendance_summaries(employees_qs, int(year), month_number))
         
         return Response({
             'success': True,
@@ -1479,3 +1543,84 @@ class AutomationRuleViewSet(viewsets.ModelViewSet):
             'success': True,
             'message': f'Rule "{rule_name}" deleted successfully',
         }, status=status.HTTP_200_OK)
+
+
+class PayrollRunViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Organization-wide payroll runs
+
+    Endpoints:
+    - GET /api/payroll/runs/ - List runs (filter by ?month=&year=)
+    - POST /api/payroll/runs/ - Queue payroll for all active employees of a month (202)
+    - GET /api/payroll/runs/{id}/ - Run progress and per-employee errors
+    - POST /api/payroll/runs/{id}/resume/ - Queue an unfinished run again (202)
+
+    Queued runs are executed by `manage.py run_payroll --queued`; both
+    endpoints answer 409 while the run is executing.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = PayrollRunSerializer
+
+    def get_queryset(self):
+        qs = PayrollRun.objects.select_related('created_by').all()
+        month = self.request.query_params.get('month')
+        year = self.request.query_params.get('year')
+        if month:
+            qs = qs.filter(month=month)
+        if year:
+            try:
+                qs = qs.filter(year=int(year))
+            except ValueError:
+                pass
+        return qs.order_by('-created_at')
+
+    def create(self, request, *args, **kwargs):
+        """
+        Queue the run for a month (or requeue its unfinished run)
+        POST /api/payroll/runs/ {"month": "November", "year": 2025}
+        """
+        month = request.data.get('month')
+        year = request.data.get('year')
+        if not month or not year:
+            return Response({
+                'error': 'month and year are required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if month not in PayrollCalculationService.MONTH_NAME_TO_NUMBER:
+            return Response({
+                'error': f'Invalid month name: {month}. Use full month names like "November"'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            year = int(year)
+        except (TypeError, ValueError):
+            return Response({'error': 'year must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+
+        run, _ = get_or_create_payroll_run(month, year, created_by=request.user)
+        return self._queue(run)
+
+    @action(detail=True, methods=['post'], url_path='resume')
+    def resume(self, request, pk=None):
+        """
+        Queue an unfinished run again, retrying failed employees
+        POST /api/payroll/runs/{id}/resume/
+        """
+        run = self.get_object()
+        if run.is_finished and not run.errors:
+            return Response(PayrollRunSerializer(run).data)
+        return self._queue(run)
+
+    def _queue(self, run):
+        """
+        Leave the run 'pending' for `manage.py run_payroll --queued` (run from
+        cron); computing the whole organization does not belong in a request.
+        """
+        queued = PayrollRun.objects.filter(pk=run.pk).exclude(status__in=['running', 'superseded']).update(
+            status='pending', updated_at=timezone.now()
+        )
+        run.refresh_from_db()
+        if not queued:
+            return Response({
+                'error': f'Payroll run #{run.id} is {run.status}',
+                'run': PayrollRunSerializer(run).data,
+            }, status=status.HTTP_409_CONFLICT)
+        return Response(PayrollRunSerializer(run).data, status=status.HTTP_202_ACCEPTED)
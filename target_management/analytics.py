@@ -0,0 +1,368 @@
+# target_management/analytics.py
+"""
+Route target performance analytics.
+
+get_route_performance_summary() computes the dashboard summary for a filter set:
+overall totals and the achievement distribution come from one conditional
+aggregate, followed by the employee/route/product group-bys and the recent
+targets. Results are cached per filter set under a version counter stored in
+the database (AnalyticsCacheVersion), so a bump reaches every worker even
+with the default per-process cache; target_management/signals.py bumps it
+once route targets, their product details or parameters, routes or products
+are saved or deleted, so dashboard refreshes between writes cost one version
+query and one cache read.
+
+Bulk writes skip signals, so callers doing those must call
+invalidate_route_analytics() themselves; ROUTE_ANALYTICS_CACHE_TTL_SECONDS
+bounds staleness otherwise (e.g. renamed employees).
+
+compare_employee_performance() backs the comparative report: route targets
+and call daily targets are each summed in one query grouped by employee (and
+optionally by week or month), whatever the size of the team.
+"""
+
+import hashlib
+import json
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce, TruncMonth, TruncWeek
+
+from .models import (
+    AnalyticsCacheVersion, CallDailyTarget, CallTargetPeriod, RouteTargetPeriod, RouteTargetProductDetail,
+)
+
+VERSION_NAME = 'route_analytics'
+ROUTE_FILTER_PARAMS = ('employee', 'route', 'start_date', 'end_date', 'period')
+
+# Share of target_amount achieved: bucket -> (lower bound, upper bound)
+ACHIEVEMENT_BUCKETS = {
+    'excellent': (Decimal('0.9'), None),   # 90%+
+    'good': (Decimal('0.75'), Decimal('0.9')),   # 75-89%
+    'average': (Decimal('0.5'), Decimal('0.75')),   # 50-74%
+    'poor': (None, Decimal('0.5')),   # <50%
+}
+
+# Comparative report trend buckets: route periods by start date, call daily targets by date
+COMPARISON_BUCKETS = {'week': TruncWeek, 'month': TruncMonth}
+
+
+def _bump_version():
+    try:
+        with transaction.atomic():
+            AnalyticsCacheVersion.objects.get_or_create(name=VERSION_NAME)
+            AnalyticsCacheVersion.objects.filter(name=VERSION_NAME).update(version=F('version') + 1)
+    except Exception:
+        pass
+
+
+def invalidate_route_analytics():
+    """
+    Drop every cached route performance summary once the caller's transaction
+    commits (immediately in autocommit). Summaries are keyed by the version
+    read before computing, so one computed from the old data is never served
+    after the bump.
+    """
+    transaction.on_commit(_bump_version)
+
+
+def _version():
+    try:
+        return AnalyticsCacheVersion.objects.filter(name=VERSION_NAME).values_list('version', flat=True).first() or 0
+    except Exception:
+        return None
+
+
+def _period_range(period, today):
+    """(start, end) of a quick period filter containing `today`, or None."""
+    if period == 'today':
+        return today, today
+    if period == 'week':
+        week_start = today - timedelta(days=today.weekday())
+        return week_start, week_start + timedelta(days=6)
+    if period == 'month':
+        month_start = today.replace(day=1)
+        next_month = month_start.replace(day=28) + timedelta(days=4)
+        return month_start, next_month - timedelta(days=next_month.day)
+    if period == 'quarter':
+        quarter = (today.month - 1) // 3
+        quarter_start = datetime(today.year, quarter * 3 + 1, 1).date()
+        return quarter_start, (quarter_start + timedelta(days=92)).replace(day=1) - timedelta(days=1)
+    if period == 'year':
+        return datetime(today.year, 1, 1).date(), datetime(today.year, 12, 31).date()
+    return None
+
+
+def filter_route_targets(filters, today):
+    """Active route targets matching the dashboard filters."""
+    queryset = RouteTargetPeriod.objects.filter(is_active=True)
+    if filters.get('employee'):
+        queryset = queryset.filter(employee_id=filters['employee'])
+    if filters.get('route'):
+        queryset = queryset.filter(route_id=filters['route'])
+
+    if filters.get('period'):
+        # Targets overlapping the period
+        period_range = _period_range(filters['period'], today)
+        if period_range:
+            start, end = period_range
+            queryset = queryset.filter(
+                Q(start_date__range=[start, end]) |
+                Q(end_date__range=[start, end]) |
+                Q(start_date__lte=start, end_date__gte=end)
+            )
+    else:
+        if filters.get('start_date'):
+            queryset = queryset.filter(start_date__gte=filters['start_date'])
+        if filters.get('end_date'):
+            queryset = queryset.filter(end_date__lte=filters['end_date'])
+    return queryset
+
+
+def _percentage(achieved, target):
+    return float((achieved / target * 100) if target > 0 else 0)
+
+
+def _totals():
+    return {
+        'target_boxes': Coalesce(Sum('target_boxes'), Decimal('0')),
+        'target_amount': Coalesce(Sum('target_amount'), Decimal('0')),
+        'achieved_boxes': Coalesce(Sum('achieved_boxes'), Decimal('0')),
+        'achieved_amount': Coalesce(Sum('achieved_amount'), Decimal('0')),
+    }
+
+
+def _bucket_filter(lower, upper):
+    condition = Q()
+    if lower is not None:
+        condition &= Q(achieved_amount__gte=F('target_amount') * lower)
+    if upper is not None:
+        condition &= Q(achieved_amount__lt=F('target_amount') * upper)
+    return condition
+
+
+def compute_route_performance(queryset):
+    """Summary, per-employee/route/product performance and recent targets for `queryset`."""
+    from .serializers import RouteTargetPeriodSerializer
+
+    # Overall totals and the achievement distribution in one pass
+    aggregates = queryset.aggregate(
+        total_targets=Count('id'),
+        total_employees=Count('employee', distinct=True),
+        total_routes=Count('route', distinct=True),
+        **{f'total_{name}': total for name, total in _totals().items()},
+        **{
+            f'bucket_{bucket}': Count('id', filter=_bucket_filter(lower, upper))
+            for bucket, (lower, upper) in ACHIEVEMENT_BUCKETS.items()
+        },
+    )
+    achievement_distribution = {bucket: aggregates.pop(f'bucket_{bucket}') for bucket in ACHIEVEMENT_BUCKETS}
+    overall_summary = aggregates
+    overall_summary['boxes_achievement_percentage'] = _percentage(
+        overall_summary['total_achieved_boxes'], overall_summary['total_target_boxes']
+    )
+    overall_summary['amount_achievement_percentage'] = _percentage(
+        overall_summary['total_achieved_amount'], overall_summary['total_target_amount']
+    )
+
+    employee_performance = list(
+        queryset.values(
+            'employee__id', 'employee__employee_id', 'employee__full_name', 'employee__designation'
+        ).annotate(total_targets=Count('id'), **_totals()).order_by('-achieved_amount')
+    )
+    for employee in employee_performance:
+        employee['employee_name'] = employee['employee__full_name']
+        employee['boxes_achievement_percentage'] = _percentage(employee['achieved_boxes'], employee['target_boxes'])
+        employee['amount_achievement_percentage'] = _percentage(employee['achieved_amount'], employee['target_amount'])
+
+    route_performance = list(
+        queryset.values(
+            'route__id', 'route__origin', 'route__destination', 'route__route_code'
+        ).annotate(total_targets=Count('id'), **_totals()).order_by('-achieved_amount')
+    )
+    for route in route_performance:
+        route['route_name'] = f"{route['route__origin']} → {route['route__destination']}"
+        route['boxes_achievement_percentage'] = _percentage(route['achieved_boxes'], route['target_boxes'])
+        route['amount_achievement_percentage'] = _percentage(route['achieved_amount'], route['target_amount'])
+
+    product_performance = list(
+        RouteTargetProductDetail.objects.filter(route_target_period__in=queryset.values('id')).values(
+            'product__id', 'product__product_name', 'product__product_code', 'product__unit'
+        ).annotate(
+            target_quantity=Coalesce(Sum('target_quantity'), Decimal('0')),
+            achieved_quantity=Coalesce(Sum('achieved_quantity'), Decimal('0')),
+        ).order_by('-achieved_quantity')
+    )
+    for product in product_performance:
+        product['achievement_percentage'] = _percentage(product['achieved_quantity'], product['target_quantity'])
+
+    recent_targets = (
+        queryset.select_related('employee__user', 'route', 'assigned_by')
+        .prefetch_related('product_details__product', 'target_parameters')
+        .order_by('-created_at')[:10]
+    )
+
+    return {
+        'summary': {
+            'overall': overall_summary,
+            'achievement_distribution': achievement_distribution,
+        },
+        'performance': {
+            'by_employee': employee_performance,
+            'by_route': route_performance,
+            'by_product': product_performance,
+        },
+        'recent_targets': list(RouteTargetPeriodSerializer(recent_targets, many=True).data),
+    }
+
+
+def get_route_performance_summary(filters, today=None):
+    """
+    Cached compute_route_performance() for the dashboard `filters`
+    (ROUTE_FILTER_PARAMS; missing or empty values are ignored).
+    """
+    today = today or datetime.now().date()
+    filters = {name: filters.get(name) for name in ROUTE_FILTER_PARAMS if filters.get(name)}
+    ttl = getattr(settings, 'ROUTE_ANALYTICS_CACHE_TTL_SECONDS', 300)
+    if ttl <= 0:
+        return compute_route_performance(filter_route_targets(filters, today))
+
+    # Quick periods move with the date
+    digest = hashlib.sha1(json.dumps(
+        [sorted(filters.items()), str(today) if filters.get('period') else None]
+    ).encode()).hexdigest()
+    version = _version()
+    if version is None:
+        return compute_route_performance(filter_route_targets(filters, today))
+    key = f'target_management:route_analytics:{version}:{digest}'
+    try:
+        result = cache.get(key)
+    except Exception:
+        result = None
+    if result is not None:
+        return result
+
+    result = compute_route_performance(filter_route_targets(filters, today))
+    try:
+        cache.set(key, result, ttl)
+    except Exception:
+        pass
+    return result
+
+
+# ==================== COMPARATIVE PERFORMANCE ====================
+
+def _call_totals():
+    return {
+        'target_calls': Coalesce(Sum('target_calls'), 0),
+        'achieved_calls': Coalesce(Sum('achieved_calls'), 0),
+        'productive_calls': Coalesce(Sum('productive_calls'), 0),
+        'total_orders': Coalesce(Sum('order_received'), 0),
+        'total_order_amount': Coalesce(Sum('order_amount'), Decimal('0')),
+    }
+
+
+def _route_zero():
+    return dict.fromkeys(_totals(), Decimal('0'))
+
+
+def _call_zero():
+    return {**dict.fromkeys(_call_totals(), 0), 'total_order_amount': Decimal('0')}
+
+
+def _route_percentages(data):
+    data['boxes_achievement_percentage'] = _percentage(data['achieved_boxes'], data['target_boxes'])
+    data['amount_achievement_percentage'] = _percentage(data['achieved_amount'], data['target_amount'])
+    return data
+
+
+def _call_percentages(data):
+    data['achievement_percentage'] = _percentage(data['achieved_calls'], data['target_calls'])
+    data['productivity_percentage'] = _percentage(data['productive_calls'], data['achieved_calls'])
+    return data
+
+
+def _totals_by_employee(queryset, employee_field, date_field, totals, zero, bucket=None):
+    """
+    {employee id: (totals, [per-bucket totals])} from one grouped query; `zero`
+    makes the starting totals. With a `bucket`, rows are grouped by employee and
+    bucket and the totals summed here.
+    """
+    group = [employee_field]
+    if bucket:
+        queryset = queryset.annotate(period_start=COMPARISON_BUCKETS[bucket](date_field))
+        group.append('period_start')
+
+    result = {}
+    for row in queryset.order_by().values(*group).annotate(**totals).order_by(*group):
+        employee_id = row.pop(employee_field)
+        employee_totals, buckets = result.setdefault(employee_id, (zero(), []))
+        for name in totals:
+            employee_totals[name] += row[name]
+        if bucket:
+            buckets.append(row)
+    return result
+
+
+def compare_employee_performance(employee_ids, start_date=None, end_date=None, metric='both', bucket=None):
+    """
+    Route and/or call performance (`metric`: route_targets, call_targets or
+    both) of active targets within the dates, per employee in `employee_ids`
+    order; unknown ids are skipped. `bucket` ('week' or 'month') adds the
+    route_trend/call_trend breakdowns.
+    """
+    from employee_management.models import Employee
+
+    employees = Employee.objects.select_related('user').in_bulk(
+        [int(emp_id) for emp_id in employee_ids if str(emp_id).isdigit()]
+    )
+
+    route_totals = call_totals = None
+    if metric in ['route_targets', 'both']:
+        queryset = RouteTargetPeriod.objects.filter(employee__in=list(employees), is_active=True)
+        if start_date:
+            queryset = queryset.filter(start_date__gte=start_date)
+        if end_date:
+            queryset = queryset.filter(end_date__lte=end_date)
+        route_totals = _totals_by_employee(
+            queryset, 'employee', 'start_date', _totals(), _route_zero, bucket
+        )
+
+    if metric in ['call_targets', 'both']:
+        periods = CallTargetPeriod.objects.filter(employee__in=list(employees), is_active=True)
+        if start_date:
+            periods = periods.filter(start_date__gte=start_date)
+        if end_date:
+            periods = periods.filter(end_date__lte=end_date)
+        call_totals = _totals_by_employee(
+            CallDailyTarget.objects.filter(call_target_period__in=periods),
+            'call_target_period__employee', 'target_date', _call_totals(), _call_zero, bucket
+        )
+
+    comparison = []
+    for emp_id in employee_ids:
+        employee = employees.get(int(emp_id)) if str(emp_id).isdigit() else None
+        if employee is None:
+            continue
+        emp_data = {
+            'employee_id': employee.id,
+            'employee_code': employee.employee_id,
+            'name': employee.get_full_name(),
+            'designation': employee.designation,
+        }
+        if route_totals is not None:
+            totals, buckets = route_totals.get(employee.id, (_route_zero(), []))
+            emp_data['route_performance'] = _route_percentages(dict(totals))
+            if bucket:
+                emp_data['route_trend'] = [_route_percentages(dict(row)) for row in buckets]
+        if call_totals is not None:
+            totals, buckets = call_totals.get(employee.id, (_call_zero(), []))
+            emp_data['call_performance'] = _call_percentages(dict(totals))
+            if bucket:
+                emp_data['call_trend'] = [_call_percentages(dict(row)) for row in buckets]
+        comparison.append(emp_data)
+    return comparison
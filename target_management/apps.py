@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class TargetManagementConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'target_management'
+
+    def ready(self):
+        # Import signals so Django registers them
+        import target_management.signals  # noqa: F401
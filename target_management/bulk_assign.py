@@ -0,0 +1,167 @@
+# target_management/bulk_assign.py
+"""
+Bulk route/call target assignment.
+
+assign_route_targets() and assign_call_targets() give the same target to many
+employees: the shared payload is validated once, the employee ids are checked
+with a single query, and the periods plus their product details, parameters
+or daily targets are inserted with bulk_create in one transaction. Employees
+that fail validation are reported and skipped without aborting the rest.
+
+bulk_create skips signals, so the route analytics cache is invalidated here
+and the call rollups are written with the periods.
+"""
+
+from datetime import timedelta
+
+from django.db import transaction
+from rest_framework.relations import PrimaryKeyRelatedField
+
+from employee_management.models import Employee
+
+from .analytics import invalidate_route_analytics
+from .call_rollups import add_rollup_values, daily_rollup_values
+from .models import (
+    CallDailyTarget, CallTargetPeriod, RouteTargetPeriod, RouteTargetProductDetail, TargetParameters,
+)
+from .serializers import (
+    CallTargetAssignmentSerializer, CallTargetPeriodSerializer,
+    RouteTargetAssignmentSerializer, RouteTargetPeriodSerializer,
+)
+
+
+def _resolve_employees(employee_ids):
+    """
+    ([(employee id as given, Employee)], [error]) for the requested ids, in
+    request order, looked up with one query. Errors match the serializer's.
+    """
+    messages = PrimaryKeyRelatedField.default_error_messages
+    pks = []
+    for emp_id in employee_ids:
+        try:
+            pks.append(None if isinstance(emp_id, bool) else Employee._meta.pk.to_python(emp_id))
+        except Exception:
+            pks.append(None)
+
+    employees = Employee.objects.in_bulk({pk for pk in pks if pk is not None})
+    resolved = []
+    errors = []
+    for emp_id, pk in zip(employee_ids, pks):
+        if pk is None:
+            message = messages['incorrect_type'].format(data_type=type(emp_id).__name__)
+        elif pk not in employees:
+            message = messages['does_not_exist'].format(pk_value=emp_id)
+        else:
+            resolved.append((emp_id, employees[pk]))
+            continue
+        errors.append({'employee_id': emp_id, 'errors': {'employee': [str(message)]}})
+    return resolved, errors
+
+
+def _validate_shared(serializer_class, data, employee_ids, context):
+    """(validated shared payload, None) or (None, the errors reported for every employee)"""
+    serializer = serializer_class(data=data, context=context)
+    if serializer.is_valid():
+        return serializer.validated_data, None
+    return None, [{'employee_id': emp_id, 'errors': serializer.errors} for emp_id in employee_ids]
+
+
+def assign_route_targets(data, employee_ids, assigned_by=None, context=None):
+    """
+    Create the route target in `data` for every employee in `employee_ids`.
+
+    Returns (serialized targets, per-employee errors).
+    """
+    shared, errors = _validate_shared(RouteTargetAssignmentSerializer, data, employee_ids, context)
+    if errors:
+        return [], errors
+    product_details = shared.pop('product_details', [])
+    target_parameters = shared.pop('target_parameters', [])
+    shared['assigned_by'] = assigned_by
+
+    resolved, errors = _resolve_employees(employee_ids)
+    if not resolved:
+        return [], errors
+
+    with transaction.atomic():
+        periods = RouteTargetPeriod.objects.bulk_create([
+            RouteTargetPeriod(employee=employee, **shared) for _, employee in resolved
+        ])
+        RouteTargetProductDetail.objects.bulk_create([
+            RouteTargetProductDetail(route_target_period=period, **detail)
+            for period in periods for detail in product_details
+        ])
+        TargetParameters.objects.bulk_create([
+            TargetParameters(route_target_period=period, **parameter)
+            for period in periods for parameter in target_parameters
+        ])
+    invalidate_route_analytics()
+
+    created = RouteTargetPeriod.objects.filter(pk__in=[period.pk for period in periods]).select_related(
+        'employee__user', 'route', 'assigned_by'
+    ).prefetch_related('product_details__product', 'target_parameters').order_by('pk')
+    return list(RouteTargetPeriodSerializer(created, many=True, context=context).data), errors
+
+
+def _daily_targets(period, daily_targets):
+    """CallDailyTarget rows for `period`: the given ones, or 30 calls a weekday and 20 a weekend day."""
+    if daily_targets:
+        return [
+            CallDailyTarget(
+                call_target_period=period,
+                target_date=daily['target_date'],
+                target_calls=daily.get('target_calls') or 0,
+                achieved_calls=daily.get('achieved_calls', 0),
+                productive_calls=daily.get('productive_calls', 0),
+                order_received=daily.get('order_received', 0),
+                order_amount=daily.get('order_amount', 0),
+                remarks=daily.get('remarks', ''),
+            )
+            for daily in daily_targets
+        ]
+    days = (period.end_date - period.start_date).days + 1
+    return [
+        CallDailyTarget(
+            call_target_period=period,
+            target_date=target_date,
+            target_calls=20 if target_date.weekday() in [5, 6] else 30,
+        )
+        for target_date in (period.start_date + timedelta(days=offset) for offset in range(days))
+    ]
+
+
+def assign_call_targets(data, employee_ids, assigned_by=None, context=None):
+    """
+    Create the call target in `data` for every employee in `employee_ids`.
+
+    Returns (serialized targets, per-employee errors).
+    """
+    shared, errors = _validate_shared(CallTargetAssignmentSerializer, data, employee_ids, context)
+    if errors:
+        return [], errors
+    daily_targets = shared.pop('daily_targets', [])
+    shared['assigned_by'] = assigned_by
+
+    resolved, errors = _resolve_employees(employee_ids)
+    if not resolved:
+        return [], errors
+
+    # Every period gets the same daily targets, so the rollups are known up front
+    template = CallTargetPeriod(**shared)
+    rollups = {}
+    for daily in _daily_targets(template, daily_targets):
+        add_rollup_values(rollups, None, daily_rollup_values(daily))
+    rollups = rollups.get(None, {})
+
+    with transaction.atomic():
+        periods = CallTargetPeriod.objects.bulk_create([
+            CallTargetPeriod(employee=employee, **shared, **rollups) for _, employee in resolved
+        ])
+        CallDailyTarget.objects.bulk_create([
+            daily for period in periods for daily in _daily_targets(period, daily_targets)
+        ])
+
+    created = CallTargetPeriod.objects.filter(pk__in=[period.pk for period in periods]).select_related(
+        'employee', 'assigned_by'
+    ).prefetch_related('daily_targets').order_by('pk')
+    return list(CallTargetPeriodSerializer(created, many=True, context=context).data), errors
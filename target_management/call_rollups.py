@@ -0,0 +1,67 @@
+# target_management/call_rollups.py
+"""
+Denormalized call-target rollups.
+
+CallTargetPeriod keeps the totals of its daily targets (target, achieved and
+productive calls, orders, order amount) in its own columns, so lists and
+summaries read and sort them in SQL instead of loading every daily row.
+target_management/signals.py applies each CallDailyTarget change as an F()
+increment; bulk writes skip signals, so callers doing those must call
+apply_call_target_rollups() (or rebuild_call_target_rollups()) themselves.
+"""
+
+from decimal import Decimal
+
+from django.db.models import F, IntegerField, DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import CallDailyTarget, CallTargetPeriod
+
+
+def daily_rollup_values(daily_target):
+    """{rollup field: value} contributed by one daily target."""
+    return {
+        rollup: Decimal(str(getattr(daily_target, field) or 0)) if field == 'order_amount'
+        else int(getattr(daily_target, field) or 0)
+        for field, rollup in CallTargetPeriod.ROLLUP_FIELDS.items()
+    }
+
+
+def add_rollup_values(changes, period_id, values, sign=1):
+    """Accumulate `values` (`sign=-1` removes them) into {period_id: {rollup: delta}}."""
+    period_changes = changes.setdefault(period_id, {})
+    for rollup, value in values.items():
+        period_changes[rollup] = period_changes.get(rollup, 0) + sign * value
+    return changes
+
+
+def apply_call_target_rollups(changes, period=None):
+    """
+    Apply {period_id: {rollup: delta}} as F() increments, in period id order.
+
+    `period` is an in-memory CallTargetPeriod whose fields are adjusted too,
+    so callers holding it (e.g. a serializer) see the new totals.
+    """
+    for period_id in sorted(changes):
+        deltas = {rollup: delta for rollup, delta in changes[period_id].items() if delta}
+        if not deltas:
+            continue
+        CallTargetPeriod.objects.filter(pk=period_id).update(
+            **{rollup: F(rollup) + delta for rollup, delta in deltas.items()}
+        )
+        if period is not None and period.pk == period_id:
+            for rollup, delta in deltas.items():
+                setattr(period, rollup, (getattr(period, rollup) or 0) + delta)
+
+
+def rebuild_call_target_rollups(queryset=None):
+    """Recompute the rollups of `queryset` (default: every period) from the daily targets. Returns the row count."""
+    queryset = CallTargetPeriod.objects.all() if queryset is None else queryset
+    updates = {}
+    for field, rollup in CallTargetPeriod.ROLLUP_FIELDS.items():
+        output_field = DecimalField(max_digits=14, decimal_places=2) if field == 'order_amount' else IntegerField()
+        total = CallDailyTarget.objects.filter(call_target_period=OuterRef('pk')).order_by().values(
+            'call_target_period'
+        ).annotate(total=Sum(field)).values('total')
+        updates[rollup] = Coalesce(Subquery(total, output_field=output_field), Value(0), output_field=output_field)
+    return queryset.order_by().update(**updates)
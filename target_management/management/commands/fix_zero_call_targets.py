@@ -33,12 +33,7 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS('🔍 Finding call targets with zero target calls...'))
 
         # Find all call target periods that have zero total target calls
-        zero_targets = []
-        all_targets = CallTargetPeriod.objects.all()
-        
-        for target in all_targets:
-            if target.total_target_calls == 0:
-                zero_targets.append(target)
+        zero_targets = list(CallTargetPeriod.objects.filter(total_target_calls=0))
 
         self.stdout.write(f'Found {len(zero_targets)} call targets with zero target calls:')
         
@@ -72,7 +67,8 @@ class Command(BaseCommand):
                     
                     updated_count += 1
                     
-                    # Verify the fix
+                    # Verify the fix (the rollup was updated in the database)
+                    target.refresh_from_db(fields=['total_target_calls'])
                     new_total = target.total_target_calls
                     self.stdout.write(f'   ✅ Fixed! New total: {new_total} calls')
                 else:
@@ -0,0 +1,28 @@
+# target_management/management/commands/rebuild_call_target_rollups.py
+"""
+Management command to recompute the call-target rollup columns.
+
+Rollups are updated incrementally on every CallDailyTarget write; run this
+to repair them after raw SQL changes or queryset.update()/bulk_create()
+calls that bypass the signals.
+
+Usage: python manage.py rebuild_call_target_rollups [--period 12 --period 15]
+"""
+
+from django.core.management.base import BaseCommand
+from target_management.call_rollups import rebuild_call_target_rollups
+from target_management.models import CallTargetPeriod
+
+
+class Command(BaseCommand):
+    help = 'Recompute CallTargetPeriod call/order totals from their daily targets'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--period', type=int, action='append', help='Only this CallTargetPeriod id (repeatable)')
+
+    def handle(self, *args, **options):
+        queryset = CallTargetPeriod.objects.all()
+        if options['period']:
+            queryset = queryset.filter(pk__in=options['period'])
+        rows = rebuild_call_target_rollups(queryset)
+        self.stdout.write(self.style.SUCCESS(f'✓ Rebuilt rollups for {rows} call target period(s)'))
@@ -0,0 +1,146 @@
+# target_management/marketing_achievements.py
+"""
+Marketing target achievements.
+
+recalculate_marketing_achievements() recomputes the parameters of marketing
+target periods (total boxes, shops visited, new shops) from their employee's
+achievement logs within the period dates. The sums run in SQL per batch of
+periods and the parameters are written with bulk_create/bulk_update.
+
+Incremental runs only pick periods never recalculated or with logs created
+after their achievement_log_watermark, so a nightly run costs in proportion
+to new activity rather than total history. The watermark trails the run's
+start by LOG_WATERMARK_OVERLAP, so a log whose transaction was still open
+when a run started is picked up by the next one. Logs edited or deleted
+after being counted are only picked up by a full run.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import (
+    DateField, DecimalField, Exists, IntegerField, OuterRef, Q, Subquery, Sum, Value,
+)
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.utils import timezone
+
+from .models import MarketingTargetParameter, MarketingTargetPeriod, TargetAchievementLog
+
+BATCH_SIZE = 500
+
+# Logs created this long before a run started are re-scanned by the next one;
+# covers log transactions still uncommitted when the run read them
+LOG_WATERMARK_OVERLAP = timedelta(hours=1)
+
+# Parameter -> (log field summed, extra log filter); focus_category is not numeric and stays 0
+LOG_TOTALS = {
+    'total_boxes': ('achievement_value', {'route_target__isnull': False}),
+    'shops_visited': ('shops_visited', {}),
+    'new_shops': ('new_shops', {}),
+}
+RECALCULATED_PARAMETERS = (*LOG_TOTALS, 'focus_category')
+
+
+def periods_to_recalculate(queryset):
+    """Periods of `queryset` never recalculated or with logs created after their watermark."""
+    new_logs = TargetAchievementLog.objects.filter(
+        employee=OuterRef('employee'),
+        achievement_date__gte=OuterRef('start_date'),
+        achievement_date__lte=OuterRef('end_date'),
+        created_at__gt=OuterRef('achievement_log_watermark'),
+    )
+    return queryset.filter(Q(achievement_log_watermark__isnull=True) | Exists(new_logs))
+
+
+def _log_total(field, start, end, filters):
+    if field == 'achievement_value':
+        output_field = DecimalField(max_digits=14, decimal_places=2)
+    else:
+        output_field = IntegerField()
+    total = TargetAchievementLog.objects.filter(
+        employee=OuterRef('employee'), achievement_date__gte=start, achievement_date__lte=end, **filters
+    ).order_by().values('employee').annotate(total=Sum(field)).values('total')
+    return Coalesce(Subquery(total, output_field=output_field), Value(0), output_field=output_field)
+
+
+def _recalculate_batch(period_ids, start, end, watermark, dry_run):
+    # `start`/`end` narrow the period's own dates, never widen them
+    lower = OuterRef('start_date')
+    if start is not None:
+        lower = Greatest(Value(start, output_field=DateField()), lower)
+    upper = OuterRef('end_date')
+    if end is not None:
+        upper = Least(Value(end, output_field=DateField()), upper)
+    periods = MarketingTargetPeriod.objects.filter(pk__in=period_ids).select_related('employee').annotate(**{
+        f'achieved_{parameter_type}': _log_total(field, lower, upper, filters)
+        for parameter_type, (field, filters) in LOG_TOTALS.items()
+    }).order_by('pk')
+    existing = {
+        (parameter.marketing_target_period_id, parameter.parameter_type): parameter
+        for parameter in MarketingTargetParameter.objects.filter(
+            marketing_target_period_id__in=period_ids, parameter_type__in=RECALCULATED_PARAMETERS
+        )
+    }
+    labels = dict(MarketingTargetParameter.PARAMETER_CHOICES)
+    now = timezone.now()
+
+    created, updated, changes = [], [], []
+    for period in periods:
+        for parameter_type in RECALCULATED_PARAMETERS:
+            value = Decimal(getattr(period, f'achieved_{parameter_type}', 0))
+            parameter = existing.get((period.pk, parameter_type))
+            if parameter is None:
+                parameter = MarketingTargetParameter(
+                    marketing_target_period=period,
+                    parameter_type=parameter_type,
+                    parameter_label=labels.get(parameter_type, parameter_type),
+                    target_value=0,
+                    incentive_value=0,
+                    achieved_value=value,
+                )
+                created.append(parameter)
+                changes.append((period, parameter_type, None, value))
+            elif abs(Decimal(str(parameter.achieved_value or 0)) - value) > Decimal('0.0001'):
+                changes.append((period, parameter_type, parameter.achieved_value, value))
+                parameter.achieved_value = value
+                parameter.updated_at = now
+                updated.append(parameter)
+            else:
+                continue
+            parameter.refresh_achievement_percentage()
+
+    if not dry_run:
+        MarketingTargetParameter.objects.bulk_create(created)
+        MarketingTargetParameter.objects.bulk_update(
+            updated, ['achieved_value', 'achievement_percentage', 'updated_at']
+        )
+        if watermark is not None:
+            MarketingTargetPeriod.objects.filter(pk__in=period_ids).update(achievement_log_watermark=watermark)
+    return changes
+
+
+def recalculate_marketing_achievements(queryset=None, incremental=True, start=None, end=None, dry_run=False):
+    """
+    Recalculate the achievements of `queryset` (default: every period); with
+    `incremental` only of periods_to_recalculate(). Logs count from the
+    period's start to end date; `start`/`end` narrow that window (runs using
+    them leave the watermarks alone).
+
+    Returns (periods recalculated, [(period, parameter type, old value or None if created, new value)]).
+    """
+    queryset = MarketingTargetPeriod.objects.all() if queryset is None else queryset
+    if incremental:
+        queryset = periods_to_recalculate(queryset)
+    # Taken first and trailing the start: logs committed during or shortly
+    # before the run are picked up by the next one
+    watermark = None
+    if start is None and end is None:
+        watermark = timezone.now() - LOG_WATERMARK_OVERLAP
+
+    period_ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+    changes = []
+    for offset in range(0, len(period_ids), BATCH_SIZE):
+        with transaction.atomic():
+            changes += _recalculate_batch(period_ids[offset:offset + BATCH_SIZE], start, end, watermark, dry_run)
+    return len(period_ids), changes
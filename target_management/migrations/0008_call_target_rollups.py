@@ -0,0 +1,65 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:07
+
+from django.db import migrations, models
+from django.db.models import DecimalField, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+ROLLUP_FIELDS = {
+    'target_calls': 'total_target_calls',
+    'achieved_calls': 'total_achieved_calls',
+    'productive_calls': 'total_productive_calls',
+    'order_received': 'total_orders',
+    'order_amount': 'total_order_amount',
+}
+
+
+def backfill_call_target_rollups(apps, schema_editor):
+    """Seed the rollups from existing daily targets"""
+    CallTargetPeriod = apps.get_model('target_management', 'CallTargetPeriod')
+    CallDailyTarget = apps.get_model('target_management', 'CallDailyTarget')
+
+    updates = {}
+    for field, rollup in ROLLUP_FIELDS.items():
+        output_field = DecimalField(max_digits=14, decimal_places=2) if field == 'order_amount' else IntegerField()
+        total = CallDailyTarget.objects.filter(call_target_period=OuterRef('pk')).order_by().values(
+            'call_target_period'
+        ).annotate(total=Sum(field)).values('total')
+        updates[rollup] = Coalesce(Subquery(total, output_field=output_field), Value(0), output_field=output_field)
+    CallTargetPeriod.objects.update(**updates)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('target_management', '0007_free_form_parameter_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calltargetperiod',
+            name='total_achieved_calls',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='calltargetperiod',
+            name='total_order_amount',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='calltargetperiod',
+            name='total_orders',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='calltargetperiod',
+            name='total_productive_calls',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='calltargetperiod',
+            name='total_target_calls',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_call_target_rollups, migrations.RunPython.noop),
+    ]
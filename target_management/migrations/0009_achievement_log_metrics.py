@@ -0,0 +1,53 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:15
+
+import re
+
+from django.db import migrations, models
+
+
+REMARK_METRIC_PATTERNS = {
+    'shops_visited': re.compile(r'shops[_\s]?visited[:=\s]+(\d+)', re.I),
+    'new_shops': re.compile(r'new[_\s]?shops[:=\s]+(\d+)', re.I),
+}
+# PositiveIntegerField range; larger numbers are skipped
+REMARK_METRIC_MAX = 2147483647
+
+
+def backfill_log_metrics(apps, schema_editor):
+    """Read the counters out of existing log remarks"""
+    TargetAchievementLog = apps.get_model('target_management', 'TargetAchievementLog')
+
+    logs = []
+    for log in TargetAchievementLog.objects.filter(remarks__icontains='shops').only('id', 'remarks').iterator():
+        for field, pattern in REMARK_METRIC_PATTERNS.items():
+            match = pattern.search(log.remarks)
+            if match and int(match.group(1)) <= REMARK_METRIC_MAX:
+                setattr(log, field, int(match.group(1)))
+        logs.append(log)
+    TargetAchievementLog.objects.bulk_update(logs, list(REMARK_METRIC_PATTERNS), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('target_management', '0008_call_target_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='marketingtargetperiod',
+            name='achievement_log_watermark',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='targetachievementlog',
+            name='new_shops',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='targetachievementlog',
+            name='shops_visited',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_log_metrics, migrations.RunPython.noop),
+    ]
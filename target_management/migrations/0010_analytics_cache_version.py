@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('target_management', '0009_achievement_log_metrics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsCacheVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, unique=True)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Analytics Cache Version',
+                'verbose_name_plural': 'Analytics Cache Versions',
+                'db_table': 'target_management_analytics_cache_version',
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    The watermark changes from a log id to a creation time. Ids do not cast to
+    datetimes, so the column is recreated; every period is recalculated once
+    by the next incremental run.
+    """
+
+    dependencies = [
+        ('target_management', '0010_analytics_cache_version'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='marketingtargetperiod',
+            name='achievement_log_watermark',
+        ),
+        migrations.AddField(
+            model_name='marketingtargetperiod',
+            name='achievement_log_watermark',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
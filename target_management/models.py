@@ -5,6 +5,7 @@ from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 from decimal import Decimal, InvalidOperation
 from datetime import timedelta
+import re
 
 
 class Route(models.Model):
@@ -298,7 +299,15 @@ class CallTargetPeriod(models.Model):
     
     notes = models.TextField(null=True, blank=True)
     is_active = models.BooleanField(default=True)
-    
+
+    # Rollups of the daily targets, kept current by target_management/signals.py
+    # (rebuild with `manage.py rebuild_call_target_rollups`)
+    total_target_calls = models.IntegerField(default=0, editable=False)
+    total_achieved_calls = models.IntegerField(default=0, editable=False)
+    total_productive_calls = models.IntegerField(default=0, editable=False)
+    total_orders = models.IntegerField(default=0, editable=False)
+    total_order_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False)
+
     assigned_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.SET_NULL,
@@ -310,6 +319,15 @@ class CallTargetPeriod(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # CallDailyTarget field -> rollup field
+    ROLLUP_FIELDS = {
+        'target_calls': 'total_target_calls',
+        'achieved_calls': 'total_achieved_calls',
+        'productive_calls': 'total_productive_calls',
+        'order_received': 'total_orders',
+        'order_amount': 'total_order_amount',
+    }
+
     class Meta:
         db_table = 'target_management_call_target_period'
         verbose_name = 'Call Target Period'
@@ -322,6 +340,16 @@ class CallTargetPeriod(models.Model):
             if self.end_date < self.start_date:
                 raise ValidationError('End date must be after start date')
 
+    def save(self, *args, **kwargs):
+        # Rollups only change through F() updates; a full save of an existing
+        # row must not write back the values it was loaded with
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.ROLLUP_FIELDS.values()
+            ]
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.employee.get_full_name()} - {self.start_date} to {self.end_date}"
     
@@ -337,14 +365,6 @@ class CallTargetPeriod(models.Model):
         """Display formatted period"""
         return f"{self.start_date.strftime('%d %b %Y')} - {self.end_date.strftime('%d %b %Y')}"
     
-    @property
-    def total_target_calls(self):
-        return sum([dt.target_calls for dt in self.daily_targets.all()])
-    
-    @property
-    def total_achieved_calls(self):
-        return sum([dt.achieved_calls for dt in self.daily_targets.all()])
-    
     @property
     def achievement_percentage(self):
         total_target = self.total_target_calls
@@ -515,6 +535,11 @@ class TargetAchievementLog(models.Model):
         help_text='Achievement value (quantity/amount/calls)'
     )
     remarks = models.TextField(null=True, blank=True)
+
+    # Marketing counters, summed by recalc_marketing_achievements
+    # (filled from remarks such as "shops visited: 12, new shops: 3" when not given)
+    shops_visited = models.PositiveIntegerField(default=0)
+    new_shops = models.PositiveIntegerField(default=0)
     
     recorded_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -525,12 +550,36 @@ class TargetAchievementLog(models.Model):
     )
     created_at = models.DateTimeField(default=timezone.now)
 
+    # Counter field -> pattern reading it from free-text remarks
+    REMARK_METRIC_PATTERNS = {
+        'shops_visited': re.compile(r'shops[_\s]?visited[:=\s]+(\d+)', re.I),
+        'new_shops': re.compile(r'new[_\s]?shops[:=\s]+(\d+)', re.I),
+    }
+    # Largest value the counter columns hold; bigger numbers in remarks are ignored
+    COUNTER_MAX = 2147483647
+
     class Meta:
         db_table = 'target_management_achievement_log'
         verbose_name = 'Target Achievement Log'
         verbose_name_plural = 'Target Achievement Logs'
         ordering = ['-achievement_date', '-created_at']
 
+    @classmethod
+    def metrics_from_remarks(cls, remarks):
+        """{counter field: value} found in `remarks`, skipping values out of the column's range"""
+        metrics = {}
+        for field, pattern in cls.REMARK_METRIC_PATTERNS.items():
+            match = pattern.search(remarks or '')
+            if match and int(match.group(1)) <= cls.COUNTER_MAX:
+                metrics[field] = int(match.group(1))
+        return metrics
+
+    def save(self, *args, **kwargs):
+        if not (self.shops_visited or self.new_shops):
+            for field, value in self.metrics_from_remarks(self.remarks).items():
+                setattr(self, field, value)
+        super().save(*args, **kwargs)
+
     def __str__(self):
                 return f"{self.employee.get_full_name()} - {self.log_type} - {self.achievement_date}"
 
@@ -555,6 +604,10 @@ class MarketingTargetPeriod(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Logs created up to this time were included in the last recalculation of
+    # this period's achievements (null: never recalculated)
+    achievement_log_watermark = models.DateTimeField(null=True, blank=True, editable=False)
+
     class Meta:
         db_table = 'target_management_marketing_target_period'
         verbose_name = 'Marketing Target Period'
@@ -602,7 +655,7 @@ class MarketingTargetParameter(models.Model):
     def __str__(self):
         return f"{self.marketing_target_period} - {self.get_parameter_type_display()}"
 
-    def save(self, *args, **kwargs):
+    def refresh_achievement_percentage(self):
         try:
             achieved = Decimal(str(self.achieved_value or 0))
             target = Decimal(str(self.target_value or 0))
@@ -613,4 +666,23 @@ class MarketingTargetParameter(models.Model):
         except (InvalidOperation, TypeError):
             self.achievement_percentage = Decimal('0')
 
-        super().save(*args, **kwargs)
\ No newline at end of file
+    def save(self, *args, **kwargs):
+        self.refresh_achievement_percentage()
+        super().save(*args, **kwargs)
+
+
+class AnalyticsCacheVersion(models.Model):
+    """
+    Version counter for a cached analytics result set, kept in the database
+    so every worker sees a bump whatever the cache backend.
+    """
+    name = models.CharField(max_length=64, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'target_management_analytics_cache_version'
+        verbose_name = 'Analytics Cache Version'
+        verbose_name_plural = 'Analytics Cache Versions'
+
+    def __str__(self):
+        return f"{self.name} (v{self.version})"
@@ -453,6 +453,23 @@ class RouteTargetPeriodDetailSerializer(RouteTargetPeriodSerializer):
     pass
 
 
+class RouteTargetAssignmentSerializer(RouteTargetPeriodSerializer):
+    """Payload shared by every employee of a bulk route target assignment"""
+
+    class Meta(RouteTargetPeriodSerializer.Meta):
+        fields = [field for field in RouteTargetPeriodSerializer.Meta.fields if field != 'employee']
+
+    def validate(self, data):
+        # Caught here once instead of as an IntegrityError per employee
+        products = [detail['product'].pk for detail in data.get('product_details', [])]
+        if len(products) != len(set(products)):
+            raise serializers.ValidationError({'product_details': 'Each product can only be listed once'})
+        parameter_types = [parameter['parameter_type'] for parameter in data.get('target_parameters', [])]
+        if len(parameter_types) != len(set(parameter_types)):
+            raise serializers.ValidationError({'target_parameters': 'Each parameter can only be listed once'})
+        return data
+
+
 # ==================== CALL DAILY TARGET SERIALIZERS ====================
 
 class CallDailyTargetSerializer(serializers.ModelSerializer):
@@ -601,6 +618,19 @@ class CallTargetPeriodDetailSerializer(CallTargetPeriodSerializer):
     pass
 
 
+class CallTargetAssignmentSerializer(CallTargetPeriodSerializer):
+    """Payload shared by every employee of a bulk call target assignment"""
+
+    class Meta(CallTargetPeriodSerializer.Meta):
+        fields = [field for field in CallTargetPeriodSerializer.Meta.fields if field != 'employee']
+
+    def validate(self, data):
+        target_dates = [daily['target_date'] for daily in data.get('daily_targets', [])]
+        if len(target_dates) != len(set(target_dates)):
+            raise serializers.ValidationError({'daily_targets': 'Each date can only be listed once'})
+        return data
+
+
 # ==================== ACHIEVEMENT LOG SERIALIZERS ====================
 
 class TargetAchievementLogSerializer(serializers.ModelSerializer):
@@ -614,6 +644,7 @@ class TargetAchievementLogSerializer(serializers.ModelSerializer):
             'id', 'log_type', 'employee', 'employee_name', 'employee_id_display',
             'route_target', 'call_daily_target',
             'achievement_date', 'achievement_value', 'remarks',
+            'shops_visited', 'new_shops',
             'recorded_by', 'recorded_by_name', 'created_at'
         ]
         read_only_fields = ['created_at']
@@ -696,6 +727,9 @@ class UpdateRouteAchievementSerializer(serializers.Serializer):
         help_text="List of {product_id, achieved_quantity}"
     )
     notes = serializers.CharField(required=False, allow_blank=True)
+    # Logged on the achievement log; read from notes when omitted
+    shops_visited = serializers.IntegerField(required=False, min_value=0, max_value=TargetAchievementLog.COUNTER_MAX)
+    new_shops = serializers.IntegerField(required=False, min_value=0, max_value=TargetAchievementLog.COUNTER_MAX)
     
     def validate_product_achievements(self, value):
         """Validate product achievements structure"""
@@ -723,6 +757,9 @@ class UpdateCallDailyAchievementSerializer(serializers.Serializer):
         min_value=0
     )
     remarks = serializers.CharField(required=False, allow_blank=True)
+    # Logged on the achievement log; read from remarks when omitted
+    shops_visited = serializers.IntegerField(required=False, min_value=0, max_value=TargetAchievementLog.COUNTER_MAX)
+    new_shops = serializers.IntegerField(required=False, min_value=0, max_value=TargetAchievementLog.COUNTER_MAX)
     
     def validate(self, data):
         """Validate that productive calls <= achieved calls"""
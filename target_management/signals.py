@@ -0,0 +1,77 @@
+# target_management/signals.py
+"""
+Target Management Signals
+
+Route targets/product details/parameters, routes or products changed →
+drop cached route performance summaries
+Call daily target saved or deleted → update its period's call rollups
+"""
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .analytics import invalidate_route_analytics
+from .call_rollups import add_rollup_values, apply_call_target_rollups, daily_rollup_values
+from .models import (
+    CallDailyTarget, Product, Route, RouteTargetPeriod, RouteTargetProductDetail, TargetParameters,
+)
+
+
+# ============================================================================
+# ROUTE ANALYTICS CACHE INVALIDATION
+# ============================================================================
+# Bulk operations (queryset.update / bulk_create) bypass these signals;
+# callers doing those must call invalidate_route_analytics() themselves.
+
+@receiver(post_save, sender=RouteTargetPeriod)
+@receiver(post_delete, sender=RouteTargetPeriod)
+@receiver(post_save, sender=RouteTargetProductDetail)
+@receiver(post_delete, sender=RouteTargetProductDetail)
+@receiver(post_save, sender=TargetParameters)
+@receiver(post_delete, sender=TargetParameters)
+@receiver(post_save, sender=Route)
+@receiver(post_delete, sender=Route)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_route_analytics_cache(sender, instance, **kwargs):
+    invalidate_route_analytics()
+
+
+# ============================================================================
+# CALL TARGET ROLLUPS
+# ============================================================================
+# Bulk operations (queryset.update / bulk_create) bypass these signals;
+# callers doing those must call apply_call_target_rollups() themselves.
+
+def _cached_period(instance):
+    field = CallDailyTarget._meta.get_field('call_target_period')
+    return field.get_cached_value(instance) if field.is_cached(instance) else None
+
+
+@receiver(pre_save, sender=CallDailyTarget)
+def remember_daily_target_rollup(sender, instance, raw=False, **kwargs):
+    instance._rollup_before = None
+    if raw or instance.pk is None:
+        return
+    previous = CallDailyTarget.objects.filter(pk=instance.pk).first()
+    if previous is not None:
+        instance._rollup_before = (previous.call_target_period_id, daily_rollup_values(previous))
+
+
+@receiver(post_save, sender=CallDailyTarget)
+def update_rollup_on_daily_target_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    changes = {}
+    before = getattr(instance, '_rollup_before', None)
+    if before is not None:
+        add_rollup_values(changes, before[0], before[1], sign=-1)
+    add_rollup_values(changes, instance.call_target_period_id, daily_rollup_values(instance))
+    apply_call_target_rollups(changes, period=_cached_period(instance))
+    instance._rollup_before = None
+
+
+@receiver(post_delete, sender=CallDailyTarget)
+def update_rollup_on_daily_target_delete(sender, instance, **kwargs):
+    changes = add_rollup_values({}, instance.call_target_period_id, daily_rollup_values(instance), sign=-1)
+    apply_call_target_rollups(changes, period=_cached_period(instance))
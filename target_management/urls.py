@@ -52,6 +52,9 @@ urlpatterns = [
     path('performance/comparative/',
          views.comparative_performance_report,
          name='comparative-performance-report'),
+    path('performance/route-summary/',
+         views.route_performance_summary,
+         name='route-performance-summary'),
 
     # ==================== EMPLOYEE SELF-SERVICE ====================
     path('employee/my-targets/', views.employee_my_targets, name='employee-my-targets'),
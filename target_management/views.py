@@ -9,6 +9,7 @@ from django.shortcuts import get_object_or_404
 from datetime import datetime, timedelta
 from django.utils import timezone
 from django.db.models import Q, Sum, Avg, Count, F, Case, When, DecimalField, IntegerField
+from django.db.models import ExpressionWrapper, FloatField, Value
 from django.db.models.functions import Coalesce
 from django.shortcuts import get_object_or_404
 from datetime import datetime, timedelta
@@ -19,6 +20,10 @@ from .models import (
     Route, Product, RouteTargetPeriod, RouteTargetProductDetail,
     CallTargetPeriod, CallDailyTarget, TargetAchievementLog, TargetParameters
 )
+from .analytics import (
+    COMPARISON_BUCKETS, ROUTE_FILTER_PARAMS, compare_employee_performance, get_route_performance_summary,
+)
+from .bulk_assign import assign_call_targets, assign_route_targets
 from .serializers import (
     RouteSerializer, RouteDetailSerializer,
     ProductSerializer, ProductDetailSerializer,
@@ -170,6 +175,23 @@ class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ProductDetailSerializer
 
 
+# Achieved / target calls in percent, from the CallTargetPeriod rollups
+CALL_ACHIEVEMENT_PERCENTAGE = Case(
+    When(total_target_calls__gt=0, then=ExpressionWrapper(
+        F('total_achieved_calls') * 100.0 / F('total_target_calls'), output_field=FloatField()
+    )),
+    default=Value(0.0),
+    output_field=FloatField(),
+)
+
+CALL_TARGET_ORDERING = {
+    f'{direction}{field}'
+    for field in ('created_at', 'start_date', 'end_date', 'call_achievement', 'total_target_calls',
+                  'total_achieved_calls', 'total_productive_calls', 'total_orders', 'total_order_amount')
+    for direction in ('', '-')
+}
+
+
 # ==================== ROUTE TARGET VIEWS ====================
 
 class RouteTargetPeriodListCreateView(generics.ListCreateAPIView):
@@ -287,30 +309,11 @@ def bulk_create_route_targets(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    created_targets = []
-    errors = []
-    
-    for emp_id in employee_ids:
-        try:
-            data = request.data.copy()
-            data['employee'] = emp_id
-            
-            serializer = RouteTargetPeriodSerializer(data=data, context={'request': request})
-            if serializer.is_valid():
-                target = serializer.save(
-                    assigned_by=request.user if request.user.is_authenticated else None
-                )
-                created_targets.append(serializer.data)
-            else:
-                errors.append({
-                    'employee_id': emp_id,
-                    'errors': serializer.errors
-                })
-        except Exception as e:
-            errors.append({
-                'employee_id': emp_id,
-                'errors': str(e)
-            })
+    created_targets, errors = assign_route_targets(
+        request.data, employee_ids,
+        assigned_by=request.user if request.user.is_authenticated else None,
+        context={'request': request}
+    )
     
     return Response({
         'created': len(created_targets),
@@ -377,7 +380,23 @@ class CallTargetPeriodListCreateView(generics.ListCreateAPIView):
         if end_date:
             queryset = queryset.filter(end_date__lte=end_date)
         
-        return queryset.order_by('-created_at')
+        # Filter/sort on the rollup columns: ?min_achievement=80&ordering=-total_achieved_calls
+        min_achievement = self.request.query_params.get('min_achievement', None)
+        max_achievement = self.request.query_params.get('max_achievement', None)
+        ordering = self.request.query_params.get('ordering', None)
+        if ordering not in CALL_TARGET_ORDERING:
+            ordering = '-created_at'
+        if min_achievement or max_achievement or ordering.lstrip('-') == 'call_achievement':
+            queryset = queryset.annotate(call_achievement=CALL_ACHIEVEMENT_PERCENTAGE)
+            try:
+                if min_achievement:
+                    queryset = queryset.filter(call_achievement__gte=float(min_achievement))
+                if max_achievement:
+                    queryset = queryset.filter(call_achievement__lte=float(max_achievement))
+            except ValueError:
+                raise ValidationError({'detail': 'min_achievement and max_achievement must be numbers'})
+        
+        return queryset.order_by(ordering)
     
     def perform_create(self, serializer):
         if self.request.user.is_authenticated:
@@ -419,30 +438,11 @@ def bulk_create_call_targets(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    created_targets = []
-    errors = []
-    
-    for emp_id in employee_ids:
-        try:
-            data = request.data.copy()
-            data['employee'] = emp_id
-            
-            serializer = CallTargetPeriodSerializer(data=data, context={'request': request})
-            if serializer.is_valid():
-                target = serializer.save(
-                    assigned_by=request.user if request.user.is_authenticated else None
-                )
-                created_targets.append(serializer.data)
-            else:
-                errors.append({
-                    'employee_id': emp_id,
-                    'errors': serializer.errors
-                })
-        except Exception as e:
-            errors.append({
-                'employee_id': emp_id,
-                'errors': str(e)
-            })
+    created_targets, errors = assign_call_targets(
+        request.data, employee_ids,
+        assigned_by=request.user if request.user.is_authenticated else None,
+        context={'request': request}
+    )
     
     return Response({
         'created': len(created_targets),
@@ -665,15 +665,14 @@ def call_target_summary(request):
     if end_date:
         queryset = queryset.filter(end_date__lte=end_date)
     
-    # Get daily targets
-    daily_targets = CallDailyTarget.objects.filter(
-        call_target_period__in=queryset
-    ).aggregate(
-        total_target_calls=Sum('target_calls'),
-        total_achieved_calls=Sum('achieved_calls'),
-        total_productive_calls=Sum('productive_calls'),
-        total_orders=Sum('order_received'),
-        total_order_amount=Sum('order_amount'),
+    # Totals from the periods' rollup columns, in one query
+    daily_targets = queryset.aggregate(
+        total_periods=Count('id'),
+        total_target_calls=Sum('total_target_calls'),
+        total_achieved_calls=Sum('total_achieved_calls'),
+        total_productive_calls=Sum('total_productive_calls'),
+        total_orders=Sum('total_orders'),
+        total_order_amount=Sum('total_order_amount'),
     )
     
     # Calculate percentages
@@ -691,10 +690,7 @@ def call_target_summary(request):
     else:
         daily_targets['productivity_percentage'] = 0
     
-    return Response({
-        'total_periods': queryset.count(),
-        **daily_targets
-    })
+    return Response(daily_targets)
 
 
 @api_view(['GET'])
@@ -792,7 +788,7 @@ def target_achievement_logs(request):
 
 
 @api_view(['GET'])
-@permission_classes([permissions.AllowAny])
+@permission_classes([permissions.IsAuthenticated])
 def route_performance_summary(request):
     """
     Comprehensive Route Target Performance Summary
@@ -803,206 +799,21 @@ def route_performance_summary(request):
     - start_date: Filter targets starting from this date
     - end_date: Filter targets ending before this date
     - period: Quick filter (today, week, month, quarter, year)
-    """
-    
-    # Base queryset
-    queryset = RouteTargetPeriod.objects.filter(is_active=True).select_related(
-        'employee', 'route', 'assigned_by'
-    ).prefetch_related('product_details__product')
-    
-    # Apply filters
-    employee_id = request.query_params.get('employee')
-    if employee_id:
-        queryset = queryset.filter(employee_id=employee_id)
     
-    route_id = request.query_params.get('route')
-    if route_id:
-        queryset = queryset.filter(route_id=route_id)
-    
-    # Date range filters
-    start_date = request.query_params.get('start_date')
-    end_date = request.query_params.get('end_date')
-    
-    # Quick period filter
-    period = request.query_params.get('period')
-    if period:
-        today = datetime.now().date()
-        if period == 'today':
-            queryset = queryset.filter(start_date__lte=today, end_date__gte=today)
-        elif period == 'week':
-            week_start = today - timedelta(days=today.weekday())
-            week_end = week_start + timedelta(days=6)
-            queryset = queryset.filter(
-                Q(start_date__range=[week_start, week_end]) |
-                Q(end_date__range=[week_start, week_end]) |
-                Q(start_date__lte=week_start, end_date__gte=week_end)
-            )
-        elif period == 'month':
-            month_start = today.replace(day=1)
-            next_month = month_start.replace(day=28) + timedelta(days=4)
-            month_end = next_month - timedelta(days=next_month.day)
-            queryset = queryset.filter(
-                Q(start_date__range=[month_start, month_end]) |
-                Q(end_date__range=[month_start, month_end]) |
-                Q(start_date__lte=month_start, end_date__gte=month_end)
-            )
-        elif period == 'quarter':
-            quarter = (today.month - 1) // 3
-            quarter_start = datetime(today.year, quarter * 3 + 1, 1).date()
-            quarter_end = (quarter_start + timedelta(days=92)).replace(day=1) - timedelta(days=1)
-            queryset = queryset.filter(
-                Q(start_date__range=[quarter_start, quarter_end]) |
-                Q(end_date__range=[quarter_start, quarter_end]) |
-                Q(start_date__lte=quarter_start, end_date__gte=quarter_end)
-            )
-        elif period == 'year':
-            year_start = datetime(today.year, 1, 1).date()
-            year_end = datetime(today.year, 12, 31).date()
-            queryset = queryset.filter(
-                Q(start_date__range=[year_start, year_end]) |
-                Q(end_date__range=[year_start, year_end]) |
-                Q(start_date__lte=year_start, end_date__gte=year_end)
-            )
-    else:
-        if start_date:
-            queryset = queryset.filter(start_date__gte=start_date)
-        if end_date:
-            queryset = queryset.filter(end_date__lte=end_date)
-    
-    # Overall Summary
-    overall_summary = queryset.aggregate(
-        total_targets=Count('id'),
-        total_employees=Count('employee', distinct=True),
-        total_routes=Count('route', distinct=True),
-        total_target_boxes=Coalesce(Sum('target_boxes'), Decimal('0')),
-        total_target_amount=Coalesce(Sum('target_amount'), Decimal('0')),
-        total_achieved_boxes=Coalesce(Sum('achieved_boxes'), Decimal('0')),
-        total_achieved_amount=Coalesce(Sum('achieved_amount'), Decimal('0')),
-    )
-    
-    # Calculate overall percentages
-    if overall_summary['total_target_boxes'] > 0:
-        overall_summary['boxes_achievement_percentage'] = float(
-            (overall_summary['total_achieved_boxes'] / overall_summary['total_target_boxes']) * 100
-        )
-    else:
-        overall_summary['boxes_achievement_percentage'] = 0.0
-    
-    if overall_summary['total_target_amount'] > 0:
-        overall_summary['amount_achievement_percentage'] = float(
-            (overall_summary['total_achieved_amount'] / overall_summary['total_target_amount']) * 100
-        )
-    else:
-        overall_summary['amount_achievement_percentage'] = 0.0
-    
-    # Performance by Employee
-    employee_performance = queryset.values(
-        'employee__id',
-        'employee__employee_id',
-        'employee__first_name',
-        'employee__last_name',
-        'employee__designation'
-    ).annotate(
-        total_targets=Count('id'),
-        target_boxes=Coalesce(Sum('target_boxes'), Decimal('0')),
-        target_amount=Coalesce(Sum('target_amount'), Decimal('0')),
-        achieved_boxes=Coalesce(Sum('achieved_boxes'), Decimal('0')),
-        achieved_amount=Coalesce(Sum('achieved_amount'), Decimal('0')),
-    ).order_by('-achieved_amount')
-    
-    # Calculate percentages for each employee
-    for emp in employee_performance:
-        emp['employee_name'] = f"{emp['employee__first_name']} {emp['employee__last_name']}"
-        emp['boxes_achievement_percentage'] = float(
-            (emp['achieved_boxes'] / emp['target_boxes'] * 100) if emp['target_boxes'] > 0 else 0
-        )
-        emp['amount_achievement_percentage'] = float(
-            (emp['achieved_amount'] / emp['target_amount'] * 100) if emp['target_amount'] > 0 else 0
-        )
-    
-    # Performance by Route
-    route_performance = queryset.values(
-        'route__id',
-        'route__origin',
-        'route__destination',
-        'route__route_code'
-    ).annotate(
-        total_targets=Count('id'),
-        target_boxes=Coalesce(Sum('target_boxes'), Decimal('0')),
-        target_amount=Coalesce(Sum('target_amount'), Decimal('0')),
-        achieved_boxes=Coalesce(Sum('achieved_boxes'), Decimal('0')),
-        achieved_amount=Coalesce(Sum('achieved_amount'), Decimal('0')),
-    ).order_by('-achieved_amount')
-    
-    # Calculate percentages for each route
-    for route in route_performance:
-        route['route_name'] = f"{route['route__origin']} → {route['route__destination']}"
-        route['boxes_achievement_percentage'] = float(
-            (route['achieved_boxes'] / route['target_boxes'] * 100) if route['target_boxes'] > 0 else 0
-        )
-        route['amount_achievement_percentage'] = float(
-            (route['achieved_amount'] / route['target_amount'] * 100) if route['target_amount'] > 0 else 0
-        )
-    
-    # Product-wise Performance
-    product_performance = RouteTargetProductDetail.objects.filter(
-        route_target_period__in=queryset
-    ).values(
-        'product__id',
-        'product__product_name',
-        'product__product_code',
-        'product__unit'
-    ).annotate(
-        target_quantity=Coalesce(Sum('target_quantity'), Decimal('0')),
-        achieved_quantity=Coalesce(Sum('achieved_quantity'), Decimal('0')),
-    ).order_by('-achieved_quantity')
-    
-    # Calculate percentages for each product
-    for product in product_performance:
-        product['achievement_percentage'] = float(
-            (product['achieved_quantity'] / product['target_quantity'] * 100) 
-            if product['target_quantity'] > 0 else 0
-        )
-    
-    # Achievement Status Distribution
-    achievement_distribution = {
-        'excellent': queryset.filter(
-            achieved_amount__gte=F('target_amount') * 0.9
-        ).count(),  # 90%+
-        'good': queryset.filter(
-            achieved_amount__gte=F('target_amount') * 0.75,
-            achieved_amount__lt=F('target_amount') * 0.9
-        ).count(),  # 75-89%
-        'average': queryset.filter(
-            achieved_amount__gte=F('target_amount') * 0.5,
-            achieved_amount__lt=F('target_amount') * 0.75
-        ).count(),  # 50-74%
-        'poor': queryset.filter(
-            achieved_amount__lt=F('target_amount') * 0.5
-        ).count(),  # <50%
-    }
-    
-    # Recent Targets
-    recent_targets = queryset.order_by('-created_at')[:10]
-    recent_targets_data = RouteTargetPeriodSerializer(recent_targets, many=True).data
+    Served from a cache per filter set until route targets change
+    (see target_management/analytics.py).
+    """
+    filters = {name: request.query_params.get(name) for name in ROUTE_FILTER_PARAMS}
+    summary = get_route_performance_summary(filters)
     
     return Response({
-        'summary': {
-            'overall': overall_summary,
-            'achievement_distribution': achievement_distribution,
-        },
-        'performance': {
-            'by_employee': list(employee_performance),
-            'by_route': list(route_performance),
-            'by_product': list(product_performance),
-        },
-        'recent_targets': recent_targets_data,
+        **summary,
         'filters_applied': {
-            'employee_id': employee_id,
-            'route_id': route_id,
-            'start_date': start_date,
-            'end_date': end_date,
-            'period': period,
+            'employee_id': filters['employee'],
+            'route_id': filters['route'],
+            'start_date': filters['start_date'],
+            'end_date': filters['end_date'],
+            'period': filters['period'],
         }
     })
 
@@ -1399,6 +1210,7 @@ def comparative_performance_report(request):
     - start_date: Start date for comparison
     - end_date: End date for comparison
     - metric: route_targets, call_targets, or both (default: both)
+    - group_by: week or month - adds per-period route_trend / call_trend
     """
     
     employee_ids = request.query_params.get('employees', '').split(',')
@@ -1412,88 +1224,16 @@ def comparative_performance_report(request):
     start_date = request.query_params.get('start_date')
     end_date = request.query_params.get('end_date')
     metric = request.query_params.get('metric', 'both')
+    group_by = request.query_params.get('group_by') or None
     
-    comparison_data = []
-    
-    from employee_management.models import Employee
+    if group_by is not None and group_by not in COMPARISON_BUCKETS:
+        return Response({
+            'error': f"group_by must be one of: {', '.join(COMPARISON_BUCKETS)}"
+        }, status=status.HTTP_400_BAD_REQUEST)
     
-    for emp_id in employee_ids:
-        try:
-            employee = Employee.objects.get(pk=emp_id)
-            emp_data = {
-                'employee_id': employee.id,
-                'employee_code': employee.employee_id,
-                'name': employee.get_full_name(),
-                'designation': employee.designation,
-            }
-            
-            # Route Targets
-            if metric in ['route_targets', 'both']:
-                route_queryset = RouteTargetPeriod.objects.filter(
-                    employee=employee,
-                    is_active=True
-                )
-                if start_date:
-                    route_queryset = route_queryset.filter(start_date__gte=start_date)
-                if end_date:
-                    route_queryset = route_queryset.filter(end_date__lte=end_date)
-                
-                route_data = route_queryset.aggregate(
-                    target_boxes=Coalesce(Sum('target_boxes'), Decimal('0')),
-                    target_amount=Coalesce(Sum('target_amount'), Decimal('0')),
-                    achieved_boxes=Coalesce(Sum('achieved_boxes'), Decimal('0')),
-                    achieved_amount=Coalesce(Sum('achieved_amount'), Decimal('0')),
-                )
-                
-                route_data['boxes_achievement_percentage'] = float(
-                    (route_data['achieved_boxes'] / route_data['target_boxes'] * 100) 
-                    if route_data['target_boxes'] > 0 else 0
-                )
-                route_data['amount_achievement_percentage'] = float(
-                    (route_data['achieved_amount'] / route_data['target_amount'] * 100) 
-                    if route_data['target_amount'] > 0 else 0
-                )
-                
-                emp_data['route_performance'] = route_data
-            
-            # Call Targets
-            if metric in ['call_targets', 'both']:
-                call_queryset = CallTargetPeriod.objects.filter(
-                    employee=employee,
-                    is_active=True
-                )
-                if start_date:
-                    call_queryset = call_queryset.filter(start_date__gte=start_date)
-                if end_date:
-                    call_queryset = call_queryset.filter(end_date__lte=end_date)
-                
-                call_daily = CallDailyTarget.objects.filter(
-                    call_target_period__in=call_queryset
-                )
-                
-                call_data = call_daily.aggregate(
-                    target_calls=Coalesce(Sum('target_calls'), 0),
-                    achieved_calls=Coalesce(Sum('achieved_calls'), 0),
-                    productive_calls=Coalesce(Sum('productive_calls'), 0),
-                    total_orders=Coalesce(Sum('order_received'), 0),
-                    total_order_amount=Coalesce(Sum('order_amount'), Decimal('0')),
-                )
-                
-                call_data['achievement_percentage'] = float(
-                    (call_data['achieved_calls'] / call_data['target_calls'] * 100) 
-                    if call_data['target_calls'] > 0 else 0
-                )
-                call_data['productivity_percentage'] = float(
-                    (call_data['productive_calls'] / call_data['achieved_calls'] * 100) 
-                    if call_data['achieved_calls'] > 0 else 0
-                )
-                
-                emp_data['call_performance'] = call_data
-            
-            comparison_data.append(emp_data)
-            
-        except Employee.DoesNotExist:
-            continue
+    comparison_data = compare_employee_performance(
+        employee_ids, start_date=start_date, end_date=end_date, metric=metric, bucket=group_by
+    )
     
     return Response({
         'comparison': comparison_data,
@@ -1502,6 +1242,7 @@ def comparative_performance_report(request):
             'start_date': start_date,
             'end_date': end_date,
             'metric': metric,
+            'group_by': group_by,
         }
     })
 
@@ -1686,6 +1427,8 @@ def update_route_achievement(request, target_id):
         achievement_date=timezone.now().date(),
         achievement_value=data.get('achieved_amount', route_target.achieved_amount),
         remarks=data.get('notes', ''),
+        shops_visited=data.get('shops_visited', 0),
+        new_shops=data.get('new_shops', 0),
         recorded_by=request.user if request.user.is_authenticated else None
     )
     
@@ -1756,6 +1499,8 @@ def update_call_daily_achievement(request, daily_target_id):
         achievement_date=daily_target.target_date,
         achievement_value=data.get('achieved_calls', daily_target.achieved_calls),
         remarks=data.get('remarks', ''),
+        shops_visited=data.get('shops_visited', 0),
+        new_shops=data.get('new_shops', 0),
         recorded_by=request.user if request.user.is_authenticated else None
     )
     